@@ -0,0 +1,656 @@
+"""
+Benchmark the site checkers on a synthetic site, so that checker changes can
+be compared across commits.
+
+Example:
+    python scripts/benchmark_checks.py --output before.json
+    # ...change a checker...
+    python scripts/benchmark_checks.py --output after.json \
+        --baseline before.json --threshold 0.2
+"""
+
+import argparse
+import copy
+import functools
+import inspect
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, NamedTuple
+
+from bs4 import BeautifulSoup
+
+# Add the project root to sys.path
+# pylint: disable=C0413
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts import built_site_checks, scss_cache, source_file_checks
+from scripts import utils as script_utils
+
+Timings = Dict[str, float]
+
+_SCRIPTS_DIR = Path(__file__).parent
+
+# Timings below this are too noisy to flag as regressions
+DEFAULT_MIN_SECONDS = 0.005
+DEFAULT_THRESHOLD = 0.2
+# How many `@font-face` rules the synthetic stylesheet declares
+_FONT_FACES = 20
+
+# Functions named check_* which aren't checks of a single page or file
+_NOT_PER_FILE_CHECKS = {
+    "check_pages",
+    "check_pages_with_cache",
+    "check_files",
+    "check_rss_file_for_issues",
+    # Site-wide, so timed once in `benchmark_site_checks`
+    "check_css_issues",
+    "check_robots_txt_location",
+    # Helpers of other checks, which are timed through their callers
+    "check_spacing",
+    "check_post_titles",
+    # Need a compiled stylesheet
+    "check_font_files",
+    "check_font_families",
+    "check_scss_font_files",
+}
+
+
+class SiteConfig(NamedTuple):
+    """
+    Shape of a synthetic site.
+    """
+
+    pages: int = 200
+    links_per_page: int = 10
+    paragraphs_per_page: int = 20
+    # Images under quartz/static, every tenth of which git ignores
+    assets: int = 1000
+    seed: int = 0
+
+
+_VIDEO_HTML = (
+    '<video autoplay loop muted playsinline width="1280" height="720">'
+    '<source src="https://assets.turntrout.com/static/video.mp4" '
+    'type="video/mp4; codecs=hvc1">'
+    '<source src="https://assets.turntrout.com/static/video.webm" '
+    'type="video/webm"></video>'
+)
+
+
+def _slug(index: int) -> str:
+    return f"page-{index}"
+
+
+def _page_markdown(index: int, config: SiteConfig, rng: random.Random) -> str:
+    lines = [
+        "---",
+        f"title: Page {index}",
+        f"description: A synthetic page, number {index}.",
+        "tags: [benchmark]",
+        f"permalink: /{_slug(index)}",
+        "---",
+        f"# Page {index}",
+    ]
+    for paragraph in range(config.paragraphs_per_page):
+        lines.append(
+            f"Paragraph {paragraph} says that $x^{paragraph}$ grows, "
+            f"see [this page](/{_slug(rng.randrange(config.pages))}).[^"
+            f"{paragraph}]"
+        )
+    lines.append("$$\n\\int_0^1 x \\, dx = \\frac{1}{2}\n$$")
+    lines.append(_VIDEO_HTML)
+    for paragraph in range(config.paragraphs_per_page):
+        lines.append(f"[^{paragraph}]: Footnote {paragraph}.")
+    return "\n\n".join(lines) + "\n"
+
+
+def _page_html(index: int, config: SiteConfig, rng: random.Random) -> str:
+    body: list[str] = [f'<h1 id="page-{index}">Page {index}</h1>']
+    links = [
+        f'<a class="internal" href="/{_slug(rng.randrange(config.pages))}'
+        f'#section-{rng.randrange(config.paragraphs_per_page)}">link</a>'
+        for _ in range(config.links_per_page)
+    ]
+    for paragraph in range(config.paragraphs_per_page):
+        link = links[paragraph % len(links)] if links else ""
+        body.append(
+            f'<h2 id="section-{paragraph}">Section {paragraph}</h2>'
+            f"<p>Paragraph {paragraph} says that "
+            '<span class="katex"><span class="katex-html">x</span></span> '
+            f"grows, see {link}."
+            f'<sup><a href="#user-content-fn-{paragraph}" '
+            f'id="user-content-fnref-{paragraph}" data-footnote-ref>'
+            f"{paragraph}</a></sup></p>"
+        )
+    body.append(
+        '<span class="katex-display"><span class="katex">'
+        '<span class="katex-html">integral</span></span></span>'
+    )
+    body.append(_VIDEO_HTML)
+    footnotes = "".join(
+        f'<li id="user-content-fn-{paragraph}"><p>Footnote {paragraph}. '
+        f'<a href="#user-content-fnref-{paragraph}" data-footnote-backref>'
+        "↩</a></p></li>"
+        for paragraph in range(config.paragraphs_per_page)
+    )
+    body.append(
+        f'<section data-footnotes class="footnotes"><ol>{footnotes}</ol>'
+        "</section>"
+    )
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>Page {index}</title>"
+        '<meta name="description" content="A synthetic page for '
+        'benchmarking the site checkers, long enough to pass.">'
+        '<link rel="icon" href="/static/images/favicon.ico">'
+        '<style id="critical-css">body { color: black; }</style>'
+        f'</head><body><article>{"".join(body)}</article></body></html>'
+    )
+
+
+def generate_site(root: Path, config: SiteConfig) -> None:
+    """
+    Write a synthetic git repository with `content/` and `public/` trees,
+    and images and a font stylesheet under `quartz/`.
+
+    Each markdown page has a matching built page, with internal links,
+    KaTeX, a video and footnotes.
+    """
+    rng = random.Random(config.seed)
+    content_dir = root / "content"
+    public_dir = root / "public"
+    content_dir.mkdir(parents=True)
+    public_dir.mkdir()
+
+    for index in range(config.pages):
+        (content_dir / f"{_slug(index)}.md").write_text(
+            _page_markdown(index, config, rng), encoding="utf-8"
+        )
+        (public_dir / f"{_slug(index)}.html").write_text(
+            _page_html(index, config, rng), encoding="utf-8"
+        )
+    (public_dir / "index.css").write_text(
+        "@supports (initial-letter: 4) { p::first-letter { color: red; } }\n"
+    )
+    (public_dir / "robots.txt").write_text("User-agent: *\n")
+
+    asset_dir = root / "quartz" / "static" / "images"
+    asset_dir.mkdir(parents=True)
+    for index in range(config.assets):
+        suffix = ".draft.png" if index % 10 == 0 else ".png"
+        (asset_dir / f"asset-{index}{suffix}").write_bytes(b"\x89PNG")
+    (root / ".gitignore").write_text("*.draft.png\n")
+
+    styles_dir = root / "quartz" / "styles"
+    styles_dir.mkdir()
+    (styles_dir / "variables.scss").write_text(
+        '$font-dir: "/static/styles/fonts";\n'
+    )
+    (styles_dir / "fonts.scss").write_text(
+        '@use "variables" as *;\n\n'
+        + "".join(
+            "@font-face {\n"
+            f'  font-family: "Font {index}";\n'
+            f'  src: url("#{{$font-dir}}/font-{index}.woff2") '
+            'format("woff2");\n'
+            "}\n"
+            for index in range(_FONT_FACES)
+        )
+    )
+
+    subprocess.run(
+        ["git", "init", "--quiet", str(root)], check=True, capture_output=True
+    )
+
+
+def time_call(function: Callable[[], Any], repeat: int) -> float:
+    """
+    Time a function, returning the fastest of `repeat` runs in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _per_file_checks(module: Any) -> Dict[str, Callable[..., Any]]:
+    return {
+        name: function
+        for name, function in inspect.getmembers(module, inspect.isfunction)
+        if name.startswith("check_")
+        and function.__module__ == module.__name__
+        and name not in _NOT_PER_FILE_CHECKS
+    }
+
+
+def _bind(function: Callable[..., Any], args: Dict[str, Any]) -> Any:
+    """
+    Call a check with the arguments it takes, leaving optional ones which
+    aren't in `args` at their defaults.
+    """
+    return function(
+        **{
+            name: args[name]
+            for name, param in inspect.signature(function).parameters.items()
+            if name in args or param.default is inspect.Parameter.empty
+        }
+    )
+
+
+def _run_on_all(
+    check: Callable[..., Any], files_args: list[Dict[str, Any]]
+) -> None:
+    for args in files_args:
+        _bind(check, args)
+
+
+def _fresh_args(files_args: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """
+    Copy each file's parsed document, since some checks modify it in place.
+    """
+    return [
+        {
+            name: (
+                copy.copy(value) if isinstance(value, BeautifulSoup) else value
+            )
+            for name, value in args.items()
+        }
+        for args in files_args
+    ]
+
+
+def _time_checks(
+    checks: Dict[str, Callable[..., Any]],
+    files_args: list[Dict[str, Any]],
+    prefix: str,
+    repeat: int,
+) -> Timings:
+    """
+    Time each check over all files, taking the fastest of `repeat` passes.
+    Each pass gets its own copies of the parsed documents, made outside the
+    timed region, so that no check runs on a tree another check changed.
+    """
+    timings: Timings = {}
+    for name, check in sorted(checks.items()):
+        timings[f"{prefix}.{name}"] = min(
+            time_call(
+                functools.partial(_run_on_all, check, _fresh_args(files_args)),
+                1,
+            )
+            for _ in range(repeat)
+        )
+    return timings
+
+
+def benchmark_page_checks(site_root: Path, repeat: int) -> Timings:
+    """
+    Time parsing and each built-site check over every page of the site.
+    """
+    public_dir = site_root / "public"
+    md_map = script_utils.build_html_to_md_map(site_root / "content")
+    pages = built_site_checks.collect_pages_to_check(public_dir, md_map, set())
+
+    timings: Timings = {
+        "built_site_checks.parse_html_file": time_call(
+            lambda: [
+                script_utils.parse_html_file(page.file_path) for page in pages
+            ],
+            repeat,
+        ),
+        "built_site_checks.scan_head": time_call(
+            lambda: [
+                built_site_checks.scan_head(page.file_path) for page in pages
+            ],
+            repeat,
+        ),
+        "built_site_checks.build_site_index": time_call(
+            lambda: built_site_checks.build_site_index(public_dir), repeat
+        ),
+    }
+    site_index = built_site_checks.build_site_index(public_dir)
+    pages_args = [
+        {
+            "soup": script_utils.parse_html_file(page.file_path),
+            "head": built_site_checks.scan_head(page.file_path),
+            "file_path": page.file_path,
+            "base_dir": public_dir,
+            "md_path": page.md_path,
+            "should_check_fonts": False,
+            "anchor_index": site_index.anchor_index,
+            "manifest": site_index.manifest,
+            "site_index": site_index,
+        }
+        for page in pages
+    ]
+    timings.update(
+        _time_checks(
+            _per_file_checks(built_site_checks),
+            pages_args,
+            "built_site_checks",
+            repeat,
+        )
+    )
+    return timings
+
+
+def benchmark_site_checks(site_root: Path, repeat: int) -> Timings:
+    """
+    Time the built-site checks which run once per site.
+    """
+    public_dir = site_root / "public"
+    return {
+        "built_site_checks.check_css_issues": time_call(
+            lambda: built_site_checks.check_css_issues(
+                public_dir / "index.css"
+            ),
+            repeat,
+        ),
+        "built_site_checks.check_robots_txt_location": time_call(
+            lambda: built_site_checks.check_robots_txt_location(public_dir),
+            repeat,
+        ),
+    }
+
+
+def benchmark_file_listing(site_root: Path, repeat: int) -> Timings:
+    """
+    Time listing the site's assets, which filters out the gitignored ones.
+    """
+    static_dir = site_root / "quartz" / "static"
+    return {
+        "utils.get_files": time_call(
+            lambda: script_utils.get_files(static_dir, (".png",)), repeat
+        )
+    }
+
+
+def benchmark_frontmatter_index(site_root: Path, repeat: int) -> Timings:
+    """
+    Time reading every markdown file's frontmatter through an index which is
+    built from scratch, and through one loaded from disk.
+    """
+    md_files = sorted((site_root / "content").glob("*.md"))
+    cache_path = site_root / "tmp" / "frontmatter_index.json"
+
+    def _read_all(cold: bool) -> None:
+        if cold:
+            cache_path.unlink(missing_ok=True)
+        index = script_utils.FrontmatterIndex(cache_path)
+        for md_path in md_files:
+            index.get(md_path)
+        index.save()
+
+    return {
+        "utils.FrontmatterIndex.cold": time_call(
+            lambda: _read_all(cold=True), repeat
+        ),
+        "utils.FrontmatterIndex.warm": time_call(
+            lambda: _read_all(cold=False), repeat
+        ),
+    }
+
+
+def benchmark_scss_compilation(site_root: Path, repeat: int) -> Timings:
+    """
+    Time checking the font stylesheet with an empty compiled SCSS cache, and
+    with one which already holds it.
+    """
+    fonts_scss = site_root / "quartz" / "styles" / "fonts.scss"
+    cache_dir = site_root / "tmp" / "compiled_scss"
+    previous_cache = scss_cache.get_scss_cache()
+
+    def _check(cold: bool) -> None:
+        if cold:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        scss_cache.set_scss_cache(scss_cache.ScssCache(cache_dir))
+        source_file_checks.check_scss_font_files(fonts_scss, site_root)
+
+    try:
+        return {
+            "source_file_checks.check_scss_font_files.cold": time_call(
+                lambda: _check(cold=True), repeat
+            ),
+            "source_file_checks.check_scss_font_files.warm": time_call(
+                lambda: _check(cold=False), repeat
+            ),
+        }
+    finally:
+        scss_cache.set_scss_cache(previous_cache)
+
+
+def benchmark_source_checks(site_root: Path, repeat: int) -> Timings:
+    """
+    Time each source-file check over every markdown file of the site.
+    """
+    md_files = sorted((site_root / "content").glob("*.md"))
+    all_metadata = [
+        (md_path, script_utils.read_frontmatter(md_path))
+        for md_path in md_files
+    ]
+    sequence_data = source_file_checks.sequence_data_from_metadata(
+        metadata for _, metadata in all_metadata
+    )
+    url_owners = source_file_checks.collect_url_owners(all_metadata)
+    files_args = []
+    for md_path, metadata in all_metadata:
+        files_args.append(
+            {
+                "text": md_path.read_text(encoding="utf-8"),
+                "file_path": md_path,
+                "source_path": md_path,
+                "metadata": metadata,
+                "permalink": metadata["permalink"],
+                "sequence_data": sequence_data,
+                "all_posts_metadata": sequence_data,
+                "urls": source_file_checks.get_all_urls(metadata),
+                "url_owners": url_owners,
+            }
+        )
+
+    timings = _time_checks(
+        _per_file_checks(source_file_checks),
+        files_args,
+        "source_file_checks",
+        repeat,
+    )
+    timings["source_file_checks.split_yaml"] = time_call(
+        lambda: [script_utils.split_yaml(path) for path in md_files], repeat
+    )
+    timings["source_file_checks.read_frontmatter"] = time_call(
+        lambda: [script_utils.read_frontmatter(path) for path in md_files],
+        repeat,
+    )
+    return timings
+
+
+# Exit statuses of a checker which passed, or which found issues
+_EXPECTED_EXIT_STATUSES = frozenset({0, 1})
+_TRACEBACK_HEADER = "Traceback (most recent call last):"
+
+
+def time_script_main(
+    script: str, site_root: Path, args: Iterable[str] = ()
+) -> float:
+    """
+    Time a checker's whole `main()`, run as a script inside the site.
+
+    Finding issues is fine, since the synthetic site needn't pass every
+    check. The script keeps its caches in the site's `tmp` directory, so
+    that it neither reuses nor overwrites those of real runs.
+
+    Raises:
+        RuntimeError: If the script crashed or rejected its arguments, so
+            that its timing would be meaningless.
+    """
+    temp_dir = site_root / "tmp"
+    temp_dir.mkdir(exist_ok=True)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(_SCRIPTS_DIR / script), *args],
+        cwd=site_root,
+        env={**os.environ, "TMPDIR": str(temp_dir)},
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    seconds = time.perf_counter() - start
+    # Uncaught exceptions also exit with status 1, so look for a traceback
+    if (
+        result.returncode not in _EXPECTED_EXIT_STATUSES
+        or _TRACEBACK_HEADER in result.stderr
+    ):
+        raise RuntimeError(
+            f"{script} exited with status {result.returncode}:\n"
+            f"{result.stderr}"
+        )
+    return seconds
+
+
+def run_benchmarks(site_root: Path, repeat: int) -> Timings:
+    """
+    Run every benchmark against the site at `site_root`.
+    """
+    timings = benchmark_page_checks(site_root, repeat)
+    timings.update(benchmark_site_checks(site_root, repeat))
+    timings.update(benchmark_source_checks(site_root, repeat))
+    timings.update(benchmark_file_listing(site_root, repeat))
+    timings.update(benchmark_frontmatter_index(site_root, repeat))
+    timings.update(benchmark_scss_compilation(site_root, repeat))
+    timings["built_site_checks.main"] = time_script_main(
+        "built_site_checks.py", site_root
+    )
+    timings["source_file_checks.main"] = time_script_main(
+        "source_file_checks.py", site_root
+    )
+    return timings
+
+
+def compare_timings(
+    baseline: Timings,
+    current: Timings,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> list[str]:
+    """
+    Find benchmarks which got slower than `baseline` by more than
+    `threshold`, ignoring those faster than `min_seconds` in both runs.
+
+    Returns:
+        A message for each regression
+    """
+    regressions = []
+    for name, seconds in sorted(current.items()):
+        before = baseline.get(name)
+        if before is None or max(before, seconds) < min_seconds:
+            continue
+        if seconds > before * (1 + threshold):
+            regressions.append(
+                f"{name}: {before:.4f}s -> {seconds:.4f}s "
+                f"(+{(seconds / before - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the site checkers on a synthetic site."
+    )
+    parser.add_argument("--pages", type=int, default=SiteConfig().pages)
+    parser.add_argument(
+        "--links-per-page", type=int, default=SiteConfig().links_per_page
+    )
+    parser.add_argument(
+        "--paragraphs-per-page",
+        type=int,
+        default=SiteConfig().paragraphs_per_page,
+    )
+    parser.add_argument("--assets", type=int, default=SiteConfig().assets)
+    parser.add_argument("--seed", type=int, default=SiteConfig().seed)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Report the fastest of this many runs of each benchmark",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("benchmark_results.json"),
+        help="Where to write the timings as JSON",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Results of an earlier run to compare against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail if a benchmark is slower than the baseline by more than "
+        "this fraction",
+    )
+    parser.add_argument(
+        "--site-dir",
+        type=Path,
+        default=None,
+        help="Generate the site here and keep it, instead of a temporary "
+        "directory",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Generate a site, benchmark the checkers on it and compare against a
+    baseline.
+    """
+    args = _parse_args(argv)
+    config = SiteConfig(
+        pages=args.pages,
+        links_per_page=args.links_per_page,
+        paragraphs_per_page=args.paragraphs_per_page,
+        assets=args.assets,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        site_root = args.site_dir or Path(temp_dir) / "site"
+        generate_site(site_root, config)
+        timings = run_benchmarks(site_root, args.repeat)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(
+            {"config": config._asdict(), "timings": timings}, f, indent=2
+        )
+    print(f"Wrote {len(timings)} timings to {args.output}")
+
+    if args.baseline is None:
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["config"] != config._asdict():
+        print("Warning: the baseline was run on a differently shaped site")
+    if regressions := compare_timings(
+        baseline["timings"], timings, args.threshold
+    ):
+        print(
+            f"Slower than {args.baseline} by more than {args.threshold:.0%}:"
+        )
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
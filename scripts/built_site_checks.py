@@ -4,25 +4,50 @@ Script to check the built static site for common issues and errors.
 """
 
 import argparse
+import functools
+import json
 import os
 import re
 import subprocess
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import Dict, Literal, NamedTuple, Set
-from urllib.parse import urlparse
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    Set,
+)
+from urllib.parse import urljoin, urlparse
 
-import requests  # type: ignore[import]
 import tqdm
 import validators  # type: ignore[import]
-from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4 import BeautifulSoup, Comment, NavigableString, PageElement, Tag
 
 # Add the project root to sys.path
 # pylint: disable=C0413
 sys.path.append(str(Path(__file__).parent.parent))
 
-from scripts import compress, source_file_checks
+from scripts import (
+    check_profiler,
+    check_shards,
+    compress,
+    inline_payloads,
+    markdown_segments,
+    page_check_cache,
+    page_weight,
+    precompress,
+    resource_hints,
+    source_file_checks,
+    url_prober,
+)
 from scripts import utils as script_utils
 
 _GIT_ROOT = script_utils.get_git_root()
@@ -41,6 +66,97 @@ parser.add_argument(
     default=False,
     help="Enable checking for preloaded fonts",
 )
+parser.add_argument(
+    "--check-media-dimensions",
+    action="store_true",
+    default=False,
+    help="Report images and videos which don't reserve their space with a "
+    "width and height or an aspect-ratio",
+)
+parser.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Number of worker processes for checking pages (default: CPU count)",
+)
+parser.add_argument(
+    "--html-parser",
+    choices=script_utils.HTML_PARSERS,
+    default=None,
+    help="BeautifulSoup parser backend (default: "
+    f"${script_utils.HTML_PARSER_ENV_VAR} or html.parser)",
+)
+parser.add_argument(
+    "--cache",
+    action="store_true",
+    default=False,
+    help="Reuse results for pages whose HTML, markdown source and linked "
+    "pages haven't changed since the last cached run",
+)
+parser.add_argument(
+    "--cache-path",
+    type=Path,
+    default=page_check_cache.DEFAULT_CACHE_PATH,
+    help="Where to store cached results",
+)
+parser.add_argument(
+    "--changed-since",
+    metavar="GIT_REF",
+    default=None,
+    help="Only check pages whose markdown source changed since GIT_REF, "
+    "along with the pages which link into them",
+)
+parser.add_argument(
+    "--shard",
+    type=check_shards.parse_shard,
+    metavar="I/N",
+    default=None,
+    help="Only check the I-th of N slices of the pages, split by a hash of "
+    "each page's path. Site-wide checks run in the first shard.",
+)
+parser.add_argument(
+    "--report",
+    type=Path,
+    default=None,
+    help="Also write the issues found to a JSON report, for --merge",
+)
+parser.add_argument(
+    "--merge",
+    type=Path,
+    nargs="+",
+    metavar="REPORT",
+    default=None,
+    help="Instead of checking the site, print the issues in the reports "
+    "written by each shard, failing if any shard found issues or is missing",
+)
+parser.add_argument(
+    "--save-site-data",
+    type=Path,
+    metavar="PATH",
+    default=None,
+    help="Compute the permalink map, aliases and site index, write them to "
+    "PATH and exit, so that shards can share them through --site-data",
+)
+parser.add_argument(
+    "--site-data",
+    type=Path,
+    metavar="PATH",
+    default=None,
+    help="Load the permalink map, aliases and site index from PATH, as "
+    "written by --save-site-data for the same build",
+)
+parser.add_argument(
+    "--check-precompressed",
+    action="store_true",
+    default=False,
+    help="Check that every compressible file has Brotli and zstd copies "
+    "newer than it, as written by precompress.py",
+)
+check_profiler.add_arguments(parser, "built_site_checks")
+page_weight.add_arguments(parser)
+resource_hints.add_arguments(parser)
+inline_payloads.add_arguments(parser)
 
 
 def check_localhost_links(soup: BeautifulSoup) -> list[str]:
@@ -97,18 +213,583 @@ def check_invalid_internal_links(soup: BeautifulSoup) -> list[Tag]:
     return invalid_internal_links
 
 
-def check_invalid_anchors(soup: BeautifulSoup, base_dir: Path) -> list[str]:
+# Maps each page's path (relative to the site root, POSIX-style) to the set
+# of element IDs on that page
+AnchorIndex = Dict[str, frozenset[str]]
+
+
+class _PageTokenizer(HTMLParser):  # pylint: disable=R0902
+    """
+    Tokenize an HTML document, recording the `id` of every element, the
+    pages which its cross-page anchor links point into, its remote iframe
+    sources, the stylesheets, scripts and media which it loads, its `<link>`
+    tags and critical CSS, and, if `collect_payloads` is set, the markup of
+    its inline `<style>`, `<script>` and `<svg>` blocks.
+    """
+
+    def __init__(self, collect_payloads: bool = False) -> None:
+        super().__init__(convert_charrefs=True)
+        self.collect_payloads = collect_payloads
+        self.ids: set[str] = set()
+        self.anchor_targets: set[str] = set()
+        self.iframe_sources: set[str] = set()
+        self.resources: list[tuple[str, str]] = []
+        # Whether the open `<video>` already has a source to play, or None
+        # outside videos
+        self.video_has_source: bool | None = None
+        # Attributes of each `<link>` tag
+        self.links: list[Dict[str, str]] = []
+        # Contents of the critical CSS blocks, and whether one is open
+        self.critical_css: list[str] = []
+        self.in_critical_css = False
+        self.payloads: list[tuple[str, str]] = []
+        # Tag and markup so far of the inline block being read, if any
+        self.open_payload: tuple[str, list[str]] | None = None
+        # How many `<svg>` elements inside the open block are unclosed
+        self.nested_svgs = 0
+
+    def handle_starttag(
+        self, tag: str, attrs: list[tuple[str, str | None]]
+    ) -> None:
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "video":
+            self.video_has_source = False
+        is_external = self._record_resource(tag, attributes)
+        if tag == "link":
+            self.links.append(attributes)
+        elif tag == "style" and attributes.get("id") == "critical-css":
+            self.in_critical_css = True
+        self._record_payload_start(tag, is_external)
+        for name, value in attrs:
+            if value is None:
+                continue
+            if name == "id":
+                self.ids.add(value)
+            elif name == "href" and tag == "a":
+                if value.startswith(("/", ".")) and "#" in value:
+                    key = _anchor_target_key(value.split("#", 1)[0])
+                    if key is not None:
+                        self.anchor_targets.add(key)
+            elif name == "src" and tag == "iframe":
+                src = _remote_iframe_source(value)
+                if src is not None:
+                    self.iframe_sources.add(src)
+
+    def _record_resource(self, tag: str, attributes: Dict[str, str]) -> bool:
+        """
+        Record the resource which a tag loads, and return whether it loads
+        one.
+        """
+        resource = _page_resource(tag, attributes)
+        if resource is None:
+            return False
+        if tag == "video":
+            self.video_has_source = True
+        elif tag == "source" and self.video_has_source is not None:
+            # Later sources are alternatives, which the browser doesn't
+            # load if it can play the first
+            if self.video_has_source:
+                return True
+            self.video_has_source = True
+        self.resources.append(resource)
+        return True
+
+    def _record_payload_start(self, tag: str, is_external: bool) -> None:
+        if not self.collect_payloads:
+            return
+        start_tag = self.get_starttag_text() or f"<{tag}>"
+        if self.open_payload is not None:
+            self.open_payload[1].append(start_tag)
+            if tag == "svg":
+                self.nested_svgs += 1
+        elif tag in inline_payloads.PAYLOAD_TAGS and not is_external:
+            self.open_payload = (tag, [start_tag])
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "style":
+            self.in_critical_css = False
+        elif tag == "video":
+            self.video_has_source = None
+        if self.open_payload is None:
+            return
+        payload_tag, markup = self.open_payload
+        markup.append(f"</{tag}>")
+        if tag == "svg" and self.nested_svgs:
+            self.nested_svgs -= 1
+        elif tag == payload_tag:
+            self.payloads.append((payload_tag, "".join(markup)))
+            self.open_payload = None
+
+    def handle_data(self, data: str) -> None:
+        if self.in_critical_css:
+            self.critical_css.append(data)
+        if self.open_payload is not None:
+            self.open_payload[1].append(data)
+
+
+def _tokenize_page(
+    file_path: Path, collect_payloads: bool = False
+) -> _PageTokenizer:
+    tokenizer = _PageTokenizer(collect_payloads)
+    with open(file_path, encoding="utf-8") as f:
+        tokenizer.feed(f.read())
+    tokenizer.close()
+    return tokenizer
+
+
+def collect_page_ids(file_path: Path) -> frozenset[str]:
+    """
+    Collect the element IDs of an HTML page without building a tree.
+    """
+    return frozenset(_tokenize_page(file_path).ids)
+
+
+class SiteManifest(NamedTuple):
+    """
+    Every file under a site's base directory, so that checks can tell whether
+    a path exists without a syscall per path.
+    """
+
+    # Absolute path of the base directory
+    root: str
+    # POSIX-style paths relative to the base directory
+    files: frozenset[str]
+
+    @staticmethod
+    def normalize(path: Path) -> Path:
+        """
+        Make `path` absolute and collapse any `..`, like `Path.resolve()`
+        but without touching the disk.
+        """
+        return Path(os.path.abspath(path))
+
+    def is_file(self, path: Path) -> bool:
+        """
+        Whether `path` is a file. Paths outside the site are checked on disk.
+        """
+        key = os.path.relpath(self.normalize(path), self.root)
+        if key == os.pardir or key.startswith(os.pardir + os.sep):
+            return path.is_file()
+        return Path(key).as_posix() in self.files
+
+
+def _resolve_site_path(path: Path, manifest: SiteManifest | None) -> Path:
+    return path.resolve() if manifest is None else manifest.normalize(path)
+
+
+def _is_site_file(path: Path, manifest: SiteManifest | None) -> bool:
+    return path.is_file() if manifest is None else manifest.is_file(path)
+
+
+class SiteIndex(NamedTuple):
+    """
+    Site-wide link data and file listing, built in one pass over the site.
+    """
+
+    anchor_index: AnchorIndex
+    # Maps each page to the pages which its cross-page anchors point into
+    anchor_links: Dict[str, frozenset[str]]
+    # Maps each page to its remote iframe sources
+    iframe_sources: Dict[str, frozenset[str]]
+    manifest: SiteManifest
+    # Maps each page to the type ("css", "js" or "media") and source of each
+    # resource it loads, as written in the page
+    resources: Dict[str, tuple[tuple[str, str], ...]]
+    # How many pages each inline `<style>`, `<script>` and `<svg>` is on
+    inline_payloads: inline_payloads.PayloadIndex
+    # Maps each page to its preload, prefetch and preconnect hints
+    hints: Dict[str, tuple[resource_hints.ResourceHint, ...]]
+    # Maps each page to the fonts which its critical CSS declares
+    critical_fonts: Dict[str, frozenset[str]]
+
+
+def build_site_index(
+    base_dir: Path, collect_payloads: bool = False
+) -> SiteIndex:
+    """
+    Index every file under `base_dir` and tokenize every HTML page, so that
+    cross-page anchors and asset references can be checked without
+    re-parsing the target pages or checking each path on disk.
+
+    Inline payloads are only collected if `collect_payloads` is set, since
+    only `--duplicate-payloads` reports them.
+    """
+    files: set[str] = set()
+    site_index = SiteIndex(
+        anchor_index={},
+        anchor_links={},
+        iframe_sources={},
+        manifest=SiteManifest(os.path.abspath(base_dir), frozenset()),
+        resources={},
+        inline_payloads={},
+        hints={},
+        critical_fonts={},
+    )
+    for root, _, filenames in os.walk(base_dir):
+        for file in filenames:
+            file_path = Path(root) / file
+            key = file_path.relative_to(base_dir).as_posix()
+            files.add(key)
+            if file.endswith(".html"):
+                tokenizer = _tokenize_page(file_path, collect_payloads)
+                site_index.anchor_index[key] = frozenset(tokenizer.ids)
+                site_index.anchor_links[key] = frozenset(
+                    tokenizer.anchor_targets
+                )
+                site_index.iframe_sources[key] = frozenset(
+                    tokenizer.iframe_sources
+                )
+                site_index.resources[key] = tuple(tokenizer.resources)
+                inline_payloads.add_page(
+                    site_index.inline_payloads, key, tokenizer.payloads
+                )
+                site_index.hints[key] = resource_hints.hints_from_links(
+                    tokenizer.links, f"/{key}"
+                )
+                site_index.critical_fonts[key] = resource_hints.font_face_urls(
+                    "".join(tokenizer.critical_css), f"/{key}"
+                )
+    return site_index._replace(
+        manifest=site_index.manifest._replace(files=frozenset(files))
+    )
+
+
+# Bump when the format of saved site data changes
+SITE_DATA_FORMAT_VERSION = 4
+
+
+class SiteData(NamedTuple):
+    """
+    Site-wide data which every page's checks depend on. It can be computed
+    once per build and shared between shards.
+    """
+
+    permalink_to_md_path: Dict[str, Path]
+    # Slugs of alias pages, which aren't checked
+    aliases: Set[str]
+    site_index: SiteIndex
+
+
+def compute_site_data(
+    md_dir: Path, public_dir: Path, collect_payloads: bool = False
+) -> SiteData:
+    """
+    Map permalinks to their markdown sources, collect aliases and index the
+    built site. See `build_site_index` for `collect_payloads`.
+    """
+    return SiteData(
+        permalink_to_md_path=script_utils.build_html_to_md_map(md_dir),
+        aliases=script_utils.collect_aliases(md_dir),
+        site_index=build_site_index(public_dir, collect_payloads),
+    )
+
+
+def _sorted_sets(mapping: Dict[str, frozenset[str]]) -> Dict[str, list[str]]:
+    return {key: sorted(values) for key, values in sorted(mapping.items())}
+
+
+def _frozen_sets(mapping: Dict[str, list[str]]) -> Dict[str, frozenset[str]]:
+    return {key: frozenset(values) for key, values in mapping.items()}
+
+
+def save_site_data(
+    site_data: SiteData, output_path: Path, repo_root: Path
+) -> None:
+    """
+    Write site data as JSON, with markdown paths relative to `repo_root` so
+    that it can be loaded from another checkout of the same build.
+    """
+    site_index = site_data.site_index
+    data = {
+        "version": SITE_DATA_FORMAT_VERSION,
+        "permalink_to_md_path": {
+            permalink: Path(os.path.relpath(md_path, repo_root)).as_posix()
+            for permalink, md_path in sorted(
+                site_data.permalink_to_md_path.items()
+            )
+        },
+        "aliases": sorted(site_data.aliases),
+        "anchor_index": _sorted_sets(site_index.anchor_index),
+        "anchor_links": _sorted_sets(site_index.anchor_links),
+        "iframe_sources": _sorted_sets(site_index.iframe_sources),
+        "files": sorted(site_index.manifest.files),
+        "resources": dict(sorted(site_index.resources.items())),
+        "inline_payloads": inline_payloads.to_json(site_index.inline_payloads),
+        "hints": {
+            page: [list(hint) for hint in hints]
+            for page, hints in sorted(site_index.hints.items())
+        },
+        "critical_fonts": _sorted_sets(site_index.critical_fonts),
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_site_data(
+    input_path: Path, repo_root: Path, public_dir: Path
+) -> SiteData:
+    """
+    Read site data written by `save_site_data`.
+
+    Raises:
+        ValueError: If the file wasn't written by `save_site_data`.
+    """
+    with open(input_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != (
+        SITE_DATA_FORMAT_VERSION
+    ):
+        raise ValueError(f"{input_path} does not contain site data")
+
+    return SiteData(
+        permalink_to_md_path={
+            permalink: repo_root / md_path
+            for permalink, md_path in data["permalink_to_md_path"].items()
+        },
+        aliases=set(data["aliases"]),
+        site_index=SiteIndex(
+            anchor_index=_frozen_sets(data["anchor_index"]),
+            anchor_links=_frozen_sets(data["anchor_links"]),
+            iframe_sources=_frozen_sets(data["iframe_sources"]),
+            manifest=SiteManifest(
+                os.path.abspath(public_dir), frozenset(data["files"])
+            ),
+            resources={
+                page: tuple(
+                    (resource_type, src) for resource_type, src in resources
+                )
+                for page, resources in data["resources"].items()
+            },
+            inline_payloads=inline_payloads.from_json(data["inline_payloads"]),
+            hints={
+                page: tuple(
+                    resource_hints.ResourceHint(*hint) for hint in hints
+                )
+                for page, hints in data["hints"].items()
+            },
+            critical_fonts=_frozen_sets(data["critical_fonts"]),
+        ),
+    )
+
+
+# NOTE that this is in bytes, not characters
+MAX_META_HEAD_SIZE = 9 * 1024  # 9 instead of 10 to avoid splitting tags
+_HEAD_END = b"</head>"
+_HEAD_READ_SIZE = 16 * 1024
+
+
+class HeadMetadata(NamedTuple):
+    """
+    Metadata from a page's `<head>`, gathered without parsing its body.
+    """
+
+    # Attributes of each `<meta>` tag
+    meta_tags: tuple[Dict[str, str], ...]
+    critical_css_blocks: int
+    # Contents of the critical CSS blocks
+    critical_css: str
+    # Attributes of each `<link>` tag
+    links: tuple[Dict[str, str], ...]
+    # Attributes of each `<link rel="preload">` tag
+    preloads: tuple[Dict[str, str], ...]
+    # Attributes of each `<link rel="stylesheet">` tag
+    stylesheets: tuple[Dict[str, str], ...]
+    # Attributes of each `<script>` tag
+    scripts: tuple[Dict[str, str], ...]
+    is_redirect: bool
+    # `<meta>` and `<title>` tags which start after MAX_META_HEAD_SIZE bytes
+    late_tags: tuple[str, ...]
+
+
+class _HeadTokenizer(HTMLParser):
+    """
+    Tokenize a document until its `<head>` closes, recording the tags which
+    the head checks need.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.in_head = False
+        self.done = False
+        # Where to record the text of the open critical CSS block
+        self.text_target: list[str] | None = None
+        self.meta_tags: list[Dict[str, str]] = []
+        self.critical_css_blocks: list[list[str]] = []
+        # Name and attributes of each `<link>` and `<script>` tag
+        self.resource_tags: list[tuple[str, Dict[str, str]]] = []
+
+    def handle_starttag(
+        self, tag: str, attrs: list[tuple[str, str | None]]
+    ) -> None:
+        if tag == "head":
+            self.in_head = not self.done
+            return
+        if tag == "body":
+            self.done = True
+        if not self.in_head or self.done:
+            return
+
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "meta":
+            self.meta_tags.append(attributes)
+        elif tag == "style" and attributes.get("id") == "critical-css":
+            self.text_target = []
+            self.critical_css_blocks.append(self.text_target)
+        elif tag in ("link", "script"):
+            self.resource_tags.append((tag, attributes))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "head":
+            self.in_head = False
+            self.done = True
+        elif tag == "style":
+            self.text_target = None
+
+    def handle_data(self, data: str) -> None:
+        if self.text_target is not None:
+            self.text_target.append(data)
+
+
+def _is_refresh_redirect(meta: Dict[str, str]) -> bool:
+    return (
+        meta.get("http-equiv", "").lower() == "refresh"
+        and "url=" in meta.get("content", "").lower()
+    )
+
+
+def _find_late_head_tags(head_bytes: bytes) -> tuple[str, ...]:
+    if not head_bytes.endswith(_HEAD_END):
+        return ()
+
+    # Tags split by the boundary start before it, so they're not late
+    remainder = head_bytes[MAX_META_HEAD_SIZE:].decode(
+        "utf-8", errors="ignore"
+    )
+    return tuple(
+        f"<{tag}> tag found after first "
+        f"{MAX_META_HEAD_SIZE // 1024}KB: {match.group(0)}"
+        for tag in ("meta", "title")
+        for match in re.finditer(rf"<{tag}[^>]*>", remainder)
+    )
+
+
+def parse_head(html: str | bytes) -> HeadMetadata:
+    """
+    Extract the metadata of a document's `<head>`, ignoring everything after
+    the first `</head>`.
+    """
+    html_bytes = html.encode("utf-8") if isinstance(html, str) else html
+    head_end = html_bytes.find(_HEAD_END)
+    if head_end != -1:
+        html_bytes = html_bytes[: head_end + len(_HEAD_END)]
+
+    tokenizer = _HeadTokenizer()
+    tokenizer.feed(html_bytes.decode("utf-8"))
+    tokenizer.close()
+
+    def links_with_rel(rel: str) -> tuple[Dict[str, str], ...]:
+        return tuple(
+            attributes
+            for tag, attributes in tokenizer.resource_tags
+            if tag == "link" and rel in attributes.get("rel", "").split()
+        )
+
+    return HeadMetadata(
+        meta_tags=tuple(tokenizer.meta_tags),
+        critical_css_blocks=len(tokenizer.critical_css_blocks),
+        critical_css="\n".join(
+            "".join(parts) for parts in tokenizer.critical_css_blocks
+        ),
+        links=tuple(
+            attributes
+            for tag, attributes in tokenizer.resource_tags
+            if tag == "link"
+        ),
+        preloads=links_with_rel("preload"),
+        stylesheets=links_with_rel("stylesheet"),
+        scripts=tuple(
+            attributes
+            for tag, attributes in tokenizer.resource_tags
+            if tag == "script"
+        ),
+        is_redirect=any(map(_is_refresh_redirect, tokenizer.meta_tags)),
+        late_tags=_find_late_head_tags(html_bytes),
+    )
+
+
+def scan_head(file_path: Path) -> HeadMetadata:
+    """
+    Extract the metadata of an HTML file's `<head>`, reading the file only as
+    far as the first `</head>`.
+    """
+    head_bytes = b""
+    with open(file_path, "rb") as f:
+        while chunk := f.read(_HEAD_READ_SIZE):
+            # Search the overlap too, in case the tag spans two chunks
+            search_start = max(0, len(head_bytes) - len(_HEAD_END))
+            head_bytes += chunk
+            if head_bytes.find(_HEAD_END, search_start) != -1:
+                break
+    return parse_head(head_bytes)
+
+
+def _anchor_target_key(page_path: str) -> str | None:
+    """
+    Convert the page part of an internal link into an `AnchorIndex` key.
+
+    Returns None if the link can't point to a page within the site.
+    """
+    # Remove leading ".." from page_path
+    page_path = page_path.lstrip("./")
+    if not page_path:
+        return None
+    target = Path(page_path)
+    if target.suffix != ".html":
+        target = target.with_suffix(".html")
+    key = os.path.normpath(target).replace(os.sep, "/")
+    return None if key.startswith("..") else key
+
+
+def _target_page_ids(
+    page_path: str, base_dir: Path, anchor_index: AnchorIndex | None
+) -> frozenset[str] | None:
+    """
+    Get the IDs on the linked page, or None if the page doesn't exist.
+    """
+    key = _anchor_target_key(page_path)
+    if key is None:
+        return None
+    if anchor_index is not None:
+        return anchor_index.get(key)
+
+    full_path = base_dir / key
+    return collect_page_ids(full_path) if full_path.is_file() else None
+
+
+def check_invalid_anchors(
+    soup: BeautifulSoup,
+    base_dir: Path,
+    anchor_index: AnchorIndex | None = None,
+) -> list[str]:
     """
     Check for invalid internal anchor links in the HTML.
+
+    Args:
+        soup: The page to check
+        base_dir: Path to the base directory of the site
+        anchor_index: IDs of every page in the site. If not provided, linked
+            pages are read from disk.
     """
     invalid_anchors: list[str] = []
+    page_ids = {element["id"] for element in soup.find_all(id=True)}
     links = soup.find_all("a", href=True)
     for link in links:
         href = link["href"]
         if href.startswith("#"):
             # Check anchor in current page
             anchor_id = href[1:]
-            if not soup.find(id=anchor_id):
+            if anchor_id not in page_ids:
                 _append_to_list(
                     invalid_anchors,
                     href,
@@ -117,27 +798,14 @@ def check_invalid_anchors(soup: BeautifulSoup, base_dir: Path) -> list[str]:
         elif (href.startswith("/") or href.startswith(".")) and "#" in href:
             # Check anchor in other internal page
             page_path, anchor = href.split("#", 1)
-            # Remove leading ".." from page_path
-            page_path = page_path.lstrip("./")
-            full_path = base_dir / page_path
-            if not full_path.suffix == ".html":
-                full_path = full_path.with_suffix(".html")
-
-            if full_path.is_file():
-                with open(full_path, encoding="utf-8") as f:
-                    page_soup = BeautifulSoup(f.read(), "html.parser")
-                if not page_soup.find(id=anchor):
-                    _append_to_list(
-                        invalid_anchors,
-                        href,
-                        prefix="Invalid anchor: ",
-                    )
-            else:
+            target_ids = _target_page_ids(page_path, base_dir, anchor_index)
+            # Also invalid if the page doesn't exist
+            if target_ids is None or anchor not in target_ids:
                 _append_to_list(
                     invalid_anchors,
                     href,
                     prefix="Invalid anchor: ",
-                )  # Page doesn't exist
+                )
     return invalid_anchors
 
 
@@ -163,6 +831,25 @@ def check_blockquote_elements(soup: BeautifulSoup) -> list[str]:
     return problematic_blockquotes
 
 
+# Basic HTML tag pattern
+_UNRENDERED_TAG_PATTERN = re.compile(r"(</?[a-zA-Z][a-zA-Z0-9]*(?: |/?>))")
+
+
+def _find_unrendered_html(
+    element: NavigableString, problematic_texts: list[str]
+) -> None:
+    text = element.strip()
+    if text:
+        # Look for HTML-like patterns
+        matches = _UNRENDERED_TAG_PATTERN.findall(text)
+        if matches:
+            _append_to_list(
+                problematic_texts,
+                text,
+                prefix=f"Unrendered HTML {matches}: ",
+            )
+
+
 def check_unrendered_html(soup: BeautifulSoup) -> list[str]:
     """
     Check for unrendered HTML in the page.
@@ -170,25 +857,9 @@ def check_unrendered_html(soup: BeautifulSoup) -> list[str]:
     Looks for text content containing HTML-like patterns (<tag>, </tag>, or
     <tag/>) that should have been rendered by the markdown processor.
     """
-    problematic_texts: list[str] = []
-
-    # Basic HTML tag pattern
-    tag_pattern = r"(</?[a-zA-Z][a-zA-Z0-9]*(?: |/?>))"
-
-    for element in soup.find_all(string=True):
-        if not should_skip(element):  # Reuse existing skip logic
-            text = element.strip()
-            if text:
-                # Look for HTML-like patterns
-                matches = re.findall(tag_pattern, text)
-                if matches:
-                    _append_to_list(
-                        problematic_texts,
-                        text,
-                        prefix=f"Unrendered HTML {matches}: ",
-                    )
-
-    return problematic_texts
+    return run_text_node_checks(
+        soup, {"unrendered_html": _find_unrendered_html}
+    )["unrendered_html"]
 
 
 def _append_to_list(
@@ -306,25 +977,29 @@ _MEDIA_EXTENSIONS = list(compress.ALLOWED_EXTENSIONS) + [
 ]
 
 
-def resolve_media_path(src: str, base_dir: Path) -> Path:
+def resolve_media_path(
+    src: str, base_dir: Path, manifest: SiteManifest | None = None
+) -> Path:
     """
     Resolve a media file path, trying both absolute and relative paths.
 
     Args:
         src: The source path from the HTML tag
         base_dir: The base directory to resolve paths from
+        manifest: Files of the site. If not provided, paths are resolved and
+            checked on disk.
 
     Returns:
         The resolved Path object
     """
     if src.startswith("/"):
-        return (base_dir / src.lstrip("/")).resolve()
+        return _resolve_site_path(base_dir / src.lstrip("/"), manifest)
 
     # For relative paths, try both direct and with base_dir
-    full_path = (base_dir / src).resolve()
-    if not full_path.is_file():
+    full_path = _resolve_site_path(base_dir / src, manifest)
+    if not _is_site_file(full_path, manifest):
         # Try relative to base_dir
-        full_path = (base_dir / src.lstrip("./")).resolve()
+        full_path = _resolve_site_path(base_dir / src.lstrip("./"), manifest)
 
     return full_path
 
@@ -356,62 +1031,124 @@ def check_media_asset_sources(soup: BeautifulSoup) -> list[str]:
     return invalid_sources
 
 
-def check_local_media_files(soup: BeautifulSoup, base_dir: Path) -> list[str]:
+_MEDIA_TAGS = ("img", "video", "source", "svg")
+
+
+def _is_remote(src: str) -> bool:
+    return src.startswith(("http://", "https://"))
+
+
+def _page_resource(
+    tag_name: str, attrs: Mapping[str, Any]
+) -> tuple[str, str] | None:
+    """
+    Get the type ("css", "js" or "media") and source of the resource which a
+    tag loads, if any.
+
+    Args:
+        tag_name: The tag's name
+        attrs: The tag's attributes
+    """
+    if tag_name == "link":
+        rel = attrs.get("rel") or ""
+        if isinstance(rel, list):
+            rel = " ".join(rel)
+        if "stylesheet" in rel or (
+            "preload" in rel and attrs.get("as") == "style"
+        ):
+            href = attrs.get("href")
+            return ("css", href) if href else None
+    elif tag_name == "script":
+        src = attrs.get("src")
+        return ("js", src) if src else None
+    elif tag_name in _MEDIA_TAGS:
+        src = attrs.get("src") or attrs.get("href")
+        return ("media", src) if src else None
+    return None
+
+
+def _is_local_media(src: str) -> bool:
+    return not _is_remote(src) and Path(src).suffix.lower() in (
+        _MEDIA_EXTENSIONS
+    )
+
+
+def check_local_media_files(
+    soup: BeautifulSoup, base_dir: Path, manifest: SiteManifest | None = None
+) -> list[str]:
     """
     Verify the existence of local media files (images, videos, SVGs).
     """
     missing_files = []
-    media_tags = soup.find_all(["img", "video", "source", "svg"])
-
-    for tag in media_tags:
-        src = tag.get("src") or tag.get("href")
-        if src and not src.startswith(("http://", "https://")):
-            # It's a local file
-            file_extension = Path(src).suffix.lower()
-            if file_extension in _MEDIA_EXTENSIONS:
-                full_path = resolve_media_path(src, base_dir)
-                if not full_path.is_file():
-                    missing_files.append(f"{src} (resolved to {full_path})")
+    for tag in soup.find_all(_MEDIA_TAGS):
+        resource = _page_resource(tag.name, tag.attrs)
+        if resource is not None and _is_local_media(resource[1]):
+            full_path = resolve_media_path(resource[1], base_dir, manifest)
+            if not _is_site_file(full_path, manifest):
+                missing_files.append(
+                    f"{resource[1]} (resolved to {full_path})"
+                )
 
     return missing_files
 
 
+def _resolve_asset_path(
+    href: str, file_path: Path, base_dir: Path, manifest: SiteManifest | None
+) -> Path:
+    if href.startswith("/"):
+        # Absolute path within the site
+        return _resolve_site_path(base_dir / href.lstrip("/"), manifest)
+    # Relative path
+    return _resolve_site_path(file_path.parent / href, manifest)
+
+
 def check_asset_references(
-    soup: BeautifulSoup, file_path: Path, base_dir: Path
+    soup: BeautifulSoup,
+    file_path: Path,
+    base_dir: Path,
+    manifest: SiteManifest | None = None,
 ) -> list[str]:
     """
-    Check for asset references and verify their existence.
+    Check that the stylesheets (including preloaded stylesheets) and scripts
+    which a page loads exist.
     """
     missing_assets = []
+    for tag in soup.find_all(["link", "script"]):
+        resource = _page_resource(tag.name, tag.attrs)
+        if resource is not None and not _is_remote(resource[1]):
+            full_path = _resolve_asset_path(
+                resource[1], file_path, base_dir, manifest
+            )
+            if not _is_site_file(full_path, manifest):
+                missing_assets.append(
+                    f"{resource[1]} (resolved to {full_path})"
+                )
 
-    def resolve_asset_path(href: str) -> Path:
-        if href.startswith("/"):
-            # Absolute path within the site
-            return (base_dir / href.lstrip("/")).resolve()
-        # Relative path
-        return (file_path.parent / href).resolve()
-
-    def check_asset(href: str) -> None:
-        if href and not href.startswith(("http://", "https://")):
-            full_path = resolve_asset_path(href)
-            if not full_path.is_file():
-                missing_assets.append(f"{href} (resolved to {full_path})")
-
-    # Check link tags for CSS files (including preloaded stylesheets)
-    for link in soup.find_all("link"):
-        rel = link.get("rel", [])
-        if isinstance(rel, list):
-            rel = " ".join(rel)
-        if "stylesheet" in rel or (
-            "preload" in rel and link.get("as") == "style"
-        ):
-            check_asset(link.get("href"))
+    return missing_assets
 
-    # Check script tags for JS files
-    for script in soup.find_all("script", src=True):
-        check_asset(script["src"])
 
-    return missing_assets
+def page_resource_locations(
+    page_key: str, base_dir: Path, site_index: SiteIndex
+) -> Iterator[tuple[str, str]]:
+    """
+    Get the type of each resource which an indexed page loads, and where it
+    is: its URL if remote, else its path. Local media are only included if
+    `check_local_media_files` would check them.
+    """
+    file_path = base_dir / page_key
+    for resource_type, src in site_index.resources.get(page_key, ()):
+        if _is_remote(src):
+            yield resource_type, src
+        elif resource_type != "media":
+            yield resource_type, str(
+                _resolve_asset_path(
+                    src, file_path, base_dir, site_index.manifest
+                )
+            )
+        elif _is_local_media(src):
+            yield resource_type, str(
+                resolve_media_path(src, base_dir, site_index.manifest)
+            )
 
 
 def check_katex_elements_for_errors(soup: BeautifulSoup) -> list[str]:
@@ -446,15 +1183,11 @@ def katex_element_surrounded_by_blockquote(soup: BeautifulSoup) -> list[str]:
     return problematic_katex
 
 
-def check_critical_css(soup: BeautifulSoup) -> bool:
+def check_critical_css(head: HeadMetadata) -> bool:
     """
     Check if the page has exactly one critical CSS block in the head.
     """
-    head = soup.find("head")
-    if isinstance(head, Tag):
-        critical_css_blocks = head.find_all("style", {"id": "critical-css"})
-        return len(critical_css_blocks) == 1
-    return False
+    return head.critical_css_blocks == 1
 
 
 def check_duplicate_ids(soup: BeautifulSoup) -> list[str]:
@@ -543,29 +1276,104 @@ def check_unrendered_emphasis(soup: BeautifulSoup) -> list[str]:
     return problematic_texts
 
 
+_SKIP_TAGS = frozenset({"code", "pre", "script", "style"})
+_SKIP_CLASSES = frozenset({"no-formatting", "elvish", "bad-handwriting"})
+
+
+def _is_skip_tag(tag: Tag) -> bool:
+    """
+    Whether the formatter skips this tag and everything inside it.
+    """
+    return tag.name in _SKIP_TAGS or any(
+        class_ in (tag.get("class", []) or []) for class_ in _SKIP_CLASSES
+    )
+
+
 def should_skip(element: Tag | NavigableString) -> bool:
     """
     Check if element should be skipped based on formatting_improvement_html.ts
     rules.
     """
-    skip_tags = {"code", "pre", "script", "style"}
-    skip_classes = {"no-formatting", "elvish", "bad-handwriting"}
-
     # Check current element and all parents
     current: Tag | NavigableString | None = element
     while current:
         if isinstance(
             current, Tag
         ):  # Only check Tag elements, not NavigableString
-            if current.name in skip_tags or any(
-                class_ in (current.get("class", []) or [])
-                for class_ in skip_classes
-            ):
+            if _is_skip_tag(current):
                 return True
         current = current.parent if isinstance(current.parent, Tag) else None
     return False
 
 
+# Called with each text node that the formatter would process, and the list
+# of issues for that check
+TextNodeCheck = Callable[[NavigableString, list[str]], None]
+
+
+def iter_formattable_text(
+    soup: BeautifulSoup | Tag,
+) -> Iterator[NavigableString]:
+    """
+    Yield, in document order, the text nodes which `should_skip` would not
+    skip.
+
+    Walks the tree once, carrying the skip state down from each ancestor
+    instead of re-walking the ancestors of every text node.
+    """
+    stack: list[tuple[PageElement, bool]] = [(soup, should_skip(soup))]
+    while stack:
+        element, skipped = stack.pop()
+        if isinstance(element, NavigableString):
+            if not skipped:
+                yield element
+            continue
+        if not isinstance(element, Tag):  # pragma: no cover
+            continue
+
+        skipped = skipped or _is_skip_tag(element)
+        # Reverse so that children are popped in document order
+        stack.extend((child, skipped) for child in reversed(element.contents))
+
+
+def run_text_node_checks(
+    soup: BeautifulSoup | Tag,
+    checks: Dict[str, TextNodeCheck] | None = None,
+) -> Dict[str, list[str]]:
+    """
+    Run several text node checks in a single pass over the document.
+
+    Args:
+        soup: The document to check
+        checks: Maps issue names to their per-node checks. Defaults to
+            `TEXT_NODE_CHECKS`.
+
+    Returns:
+        Dictionary mapping each issue name to the issues found
+    """
+    if checks is None:
+        checks = TEXT_NODE_CHECKS
+    issues: Dict[str, list[str]] = {name: [] for name in checks}
+    for element in iter_formattable_text(soup):
+        for name, check in checks.items():
+            check(element, issues[name])
+    return issues
+
+
+def _find_unprocessed_quotes(
+    element: NavigableString, problematic_quotes: list[str]
+) -> None:
+    if element.strip():
+        # Look for straight quotes
+        straight_quotes = re.findall(r'["\']', element.string)
+        if straight_quotes:
+            _append_to_list(
+                problematic_quotes,
+                element.string,
+                prefix=f"Unprocessed quotes {straight_quotes}: ",
+            )
+
+
 def check_unprocessed_quotes(soup: BeautifulSoup) -> list[str]:
     """
     Check for text nodes containing straight quotes (" or ') that should have
@@ -575,21 +1383,21 @@ def check_unprocessed_quotes(soup: BeautifulSoup) -> list[str]:
     - Inside code, pre, script, style tags
     - Elements with classes: no-formatting, elvish, bad-handwriting
     """
-    problematic_quotes: list[str] = []
+    return run_text_node_checks(
+        soup, {"unprocessed_quotes": _find_unprocessed_quotes}
+    )["unprocessed_quotes"]
 
-    # Check all text nodes
-    for element in soup.find_all(string=True):
-        if element.strip() and not should_skip(element):
-            # Look for straight quotes
-            straight_quotes = re.findall(r'["\']', element.string)
-            if straight_quotes:
-                _append_to_list(
-                    problematic_quotes,
-                    element.string,
-                    prefix=f"Unprocessed quotes {straight_quotes}: ",
-                )
 
-    return problematic_quotes
+def _find_unprocessed_dashes(
+    element: NavigableString, problematic_dashes: list[str]
+) -> None:
+    # Look for two or more dashes in a row
+    if element.strip() and re.search(r"[~\–\—\-\–]{2,}", element.string):
+        _append_to_list(
+            problematic_dashes,
+            element.string,
+            prefix="Unprocessed dashes: ",
+        )
 
 
 def check_unprocessed_dashes(soup: BeautifulSoup) -> list[str]:
@@ -597,23 +1405,9 @@ def check_unprocessed_dashes(soup: BeautifulSoup) -> list[str]:
     Check for text nodes containing multiple dashes (-- or ---) that should
     have been processed into em dashes by formatting_improvement_html.ts.
     """
-    problematic_dashes: list[str] = []
-
-    for element in soup.find_all(string=True):
-        if element.strip() and not should_skip(element):
-            # Look for two or more dashes in a row
-            if re.search(r"[~\–\—\-\–]{2,}", element.string):
-                _append_to_list(
-                    problematic_dashes,
-                    element.string,
-                    prefix="Unprocessed dashes: ",
-                )
-
-    return problematic_dashes
-
-
-# NOTE that this is in bytes, not characters
-MAX_META_HEAD_SIZE = 9 * 1024  # 9 instead of 10 to avoid splitting tags
+    return run_text_node_checks(
+        soup, {"unprocessed_dashes": _find_unprocessed_dashes}
+    )["unprocessed_dashes"]
 
 
 def meta_tags_early(file_path: Path) -> list[str]:
@@ -627,85 +1421,75 @@ def meta_tags_early(file_path: Path) -> list[str]:
     Returns:
         list of tags found after MAX_HEAD_SIZE but before </head>
     """
-    issues: list[str] = []
-
-    # Read entire HTML content first.
-    # skipcq: PTC-W6004 - Only used for checks, not user-facing
-    with open(file_path, "rb") as f:
-        content_bytes = f.read()
-
-    # If file is smaller than MAX_META_HEAD_SIZE, no issues possible
-    if len(content_bytes) <= MAX_META_HEAD_SIZE:
-        return []
-
-    # Convert the first chunk and remainder to strings
-    content = content_bytes.decode("utf-8")
-
-    # Find where the byte boundary falls in terms of characters
-    boundary_content = content_bytes[:MAX_META_HEAD_SIZE].decode("utf-8")
-    char_boundary = len(boundary_content)
+    return list(scan_head(file_path).late_tags)
 
-    # Consider everything past the byte boundary
-    remainder = content[char_boundary:]
 
-    # If no </head>, our checks don't apply
-    if "</head>" not in remainder:
-        return []
-
-    # Only look up to the closing </head>
-    head_content = remainder.split("</head>")[0]
-
-    # Look for <meta ...> or <title ...> within that region
-    for tag in ("meta", "title"):
-        # Matches <meta ...> or </meta>, similarly for <title ...> or </title>
-        pattern = rf"<{tag}[^>]*>"
-        for match in re.finditer(pattern, head_content):
-            tag_text = match.group(0)
-            issues.append(
-                f"<{tag}> tag found after first "
-                f"{MAX_META_HEAD_SIZE // 1024}KB: {tag_text}"
-            )
-
-    return issues
+def _remote_iframe_source(src: str) -> str | None:
+    """
+    Get the URL to probe for an iframe source, or None if it is empty or
+    relative.
+    """
+    if not src:
+        return None
+    if src.startswith("//"):
+        return "https:" + src
+    if src.startswith("/") or src.startswith("."):
+        return None  # Relative paths are checked by other fns
+    return src
 
 
-def check_iframe_sources(soup: BeautifulSoup) -> list[str]:
+def check_iframe_sources(
+    soup: BeautifulSoup, prober: url_prober.UrlProber | None = None
+) -> list[str]:
     """
     Check that all iframe sources are responding with a successful status code.
-    """
-    problematic_iframes = []
-    iframes = soup.find_all("iframe")
 
-    for iframe in iframes:
-        src = iframe.get("src")
-        if not src:
+    Sources are probed concurrently through `prober`, which defaults to the
+    one shared by this process.
+    """
+    iframes: list[tuple[str, str]] = []
+    for iframe in soup.find_all("iframe"):
+        src = _remote_iframe_source(iframe.get("src", ""))
+        if src is None:
             continue
 
-        if src.startswith("//"):
-            src = "https:" + src
-        elif src.startswith("/") or src.startswith("."):
-            continue  # Skip relative paths as they're checked by other fns
-
         title: str = iframe.get("title", "")
         alt: str = iframe.get("alt", "")
-        description: str = f"{title=} ({alt=})"
-        try:
-            response = requests.head(src, timeout=10)
-            if not response.ok:
-                problematic_iframes.append(
-                    f"Iframe source {src} returned status "
-                    f"{response.status_code}. "
-                    f"Description: {description}"
-                )
-        except requests.RequestException as e:
+        iframes.append((src, f"{title=} ({alt=})"))
+
+    prober = prober or url_prober.get_default_prober()
+    results = prober.probe_all(src for src, _ in iframes)
+
+    problematic_iframes = []
+    for src, description in iframes:
+        result = results[src]
+        if result.error is not None:
+            problematic_iframes.append(
+                f"Failed to load iframe source {src}: {result.error}. "
+                f"Description: {description}"
+            )
+        elif not result.ok:
             problematic_iframes.append(
-                f"Failed to load iframe source {src}: {str(e)}. "
+                f"Iframe source {src} returned status "
+                f"{result.status_code}. "
                 f"Description: {description}"
             )
 
     return problematic_iframes
 
 
+def _find_consecutive_periods(
+    element: NavigableString, problematic_texts: list[str]
+) -> None:
+    # Look for two periods with optional quote marks between
+    if element.strip() and re.search(r'(?!\.\.\?)\.["“”]*\.', element.string):
+        _append_to_list(
+            problematic_texts,
+            element.string,
+            prefix="Consecutive periods found: ",
+        )
+
+
 def check_consecutive_periods(soup: BeautifulSoup) -> list[str]:
     """
     Check for consecutive periods in text content, including cases where
@@ -714,19 +1498,18 @@ def check_consecutive_periods(soup: BeautifulSoup) -> list[str]:
     Returns:
         list of strings containing problematic text with consecutive periods
     """
-    problematic_texts: list[str] = []
+    return run_text_node_checks(
+        soup, {"consecutive_periods": _find_consecutive_periods}
+    )["consecutive_periods"]
 
-    for element in soup.find_all(string=True):
-        if element.strip() and not should_skip(element):
-            # Look for two periods with optional quote marks between
-            if re.search(r'(?!\.\.\?)\.["“”]*\.', element.string):
-                _append_to_list(
-                    problematic_texts,
-                    element.string,
-                    prefix="Consecutive periods found: ",
-                )
 
-    return problematic_texts
+# Checks which run on every text node that the formatter processes
+TEXT_NODE_CHECKS: Dict[str, TextNodeCheck] = {
+    "unprocessed_quotes": _find_unprocessed_quotes,
+    "unprocessed_dashes": _find_unprocessed_dashes,
+    "unrendered_html": _find_unrendered_html,
+    "consecutive_periods": _find_consecutive_periods,
+}
 
 
 def check_favicon_parent_elements(soup: BeautifulSoup) -> list[str]:
@@ -754,27 +1537,174 @@ def check_favicon_parent_elements(soup: BeautifulSoup) -> list[str]:
                 info += f"<{parent.name}>: {parent.get_text()}"
             problematic_favicons.append(info)
 
-    return problematic_favicons
+    return problematic_favicons
+
+
+def check_preloaded_fonts(head: HeadMetadata) -> bool:
+    """
+    Check if the page preloads the EBGaramond font via subfont.
+
+    Returns True if at least one preload link for EBGaramond subfont is found,
+    False otherwise.
+    """
+    return any(
+        preload.get("as") == "font"
+        and "subfont/ebgaramond" in preload.get("href", "").lower()
+        for preload in head.preloads
+    )
+
+
+# Scripts and stylesheets which may block rendering, matched by the start of
+# their source after resolving it against the page's URL
+RENDER_BLOCKING_ALLOWLIST = (
+    # Applies the theme before the first paint, so that pages don't flash
+    "/static/scripts/detectDarkMode.js",
+    # Quartz's page renderer loads it before the DOM is ready, without defer
+    "/prescript.js",
+    # Styles which the inlined critical CSS doesn't cover
+    "/index.css",
+    "/static/styles/katex.min.css",
+    "https://fonts.googleapis.com/",
+)
+# Script types which don't block parsing, or which aren't run
+_NON_BLOCKING_SCRIPT_TYPES = (
+    "module",
+    "application/json",
+    "application/ld+json",
+)
+# Media queries under which a stylesheet still blocks rendering
+_BLOCKING_STYLESHEET_MEDIA = ("", "all", "screen")
+
+
+def _is_render_blocking_allowed(src: str, page_url: str) -> bool:
+    return urljoin(page_url, src).startswith(RENDER_BLOCKING_ALLOWLIST)
+
+
+def check_render_blocking_scripts(
+    head: HeadMetadata, page_url: str = "/"
+) -> list[str]:
+    """
+    Check for external scripts in the head which are neither `defer` nor
+    `async`, and so block parsing until they download and run. Inline
+    scripts can't be deferred, so they're ignored.
+
+    Args:
+        head: Metadata of the page's head
+        page_url: The page's URL within the site, e.g. "/posts/a.html",
+            against which relative sources are resolved
+    """
+    return [
+        script["src"]
+        for script in head.scripts
+        if script.get("src")
+        and "defer" not in script
+        and "async" not in script
+        and script.get("type", "").lower() not in _NON_BLOCKING_SCRIPT_TYPES
+        and not _is_render_blocking_allowed(script["src"], page_url)
+    ]
+
+
+def check_render_blocking_stylesheets(
+    head: HeadMetadata, page_url: str = "/"
+) -> list[str]:
+    """
+    Check for stylesheets in the head which block rendering. Styles needed
+    for the first paint belong in the critical CSS; others should load
+    without blocking, e.g. with a non-matching `media` swapped on load.
+
+    See `check_render_blocking_scripts` for `page_url`.
+    """
+    return [
+        stylesheet.get("href", "")
+        for stylesheet in head.stylesheets
+        if stylesheet.get("media", "").strip().lower()
+        in _BLOCKING_STYLESHEET_MEDIA
+        and "disabled" not in stylesheet
+        and not _is_render_blocking_allowed(
+            stylesheet.get("href", ""), page_url
+        )
+    ]
+
+
+# Characters of text which fill about one screen
+SCREENFUL_TEXT_CHARS = 1500
+# Media with these classes are sized by the stylesheet and too small to be
+# worth loading lazily
+MEDIA_ALLOWLISTED_CLASSES = frozenset({"favicon"})
+_INVISIBLE_TEXT_PARENTS = frozenset({"script", "style", "template"})
+
+
+def _is_allowlisted_media(tag: Tag) -> bool:
+    return not MEDIA_ALLOWLISTED_CLASSES.isdisjoint(tag.get("class") or [])
+
 
+def _media_source(tag: Tag) -> str:
+    source = tag if tag.get("src") else tag.find("source", src=True)
+    return str(source.get("src")) if isinstance(source, Tag) else ""
 
-def check_preloaded_fonts(soup: BeautifulSoup) -> bool:
+
+def check_offscreen_media_loading(soup: BeautifulSoup) -> list[str]:
     """
-    Check if the page preloads the EBGaramond font via subfont.
+    Check that images and iframes below the first screenful have
+    `loading="lazy"`, so that they don't compete with the visible content.
 
-    Returns True if at least one preload link for EBGaramond subfont is found,
-    False otherwise.
+    An element is below the first screenful if another image or iframe, or
+    more than `SCREENFUL_TEXT_CHARS` characters of text, precede it.
     """
-    head = soup.find("head")
-    if not isinstance(head, Tag):
-        return False
+    if soup.body is None:
+        return []
+    eager_media = []
+    text_chars = 0
+    media_seen = 0
+    for element in soup.body.descendants:
+        if isinstance(element, Tag):
+            if element.name not in ("img", "iframe") or _is_allowlisted_media(
+                element
+            ):
+                continue
+            if (
+                media_seen or text_chars > SCREENFUL_TEXT_CHARS
+            ) and element.get("loading") != "lazy":
+                eager_media.append(
+                    f"{element.get('src', '')} (in {element.name} tag)"
+                )
+            media_seen += 1
+        elif (
+            isinstance(element, NavigableString)
+            and not isinstance(element, Comment)
+            and element.parent is not None
+            and element.parent.name not in _INVISIBLE_TEXT_PARENTS
+        ):
+            text_chars += len(element.strip())
+    return eager_media
 
-    preload_links = head.find_all("link", {"rel": "preload", "as": "font"})
-    for link in preload_links:
-        href = link.get("href", "")
-        if "subfont/ebgaramond" in href.lower():
-            return True
 
-    return False
+_STYLE_DIMENSION_PATTERN = re.compile(r"(?:^|;)\s*(width|height)\s*:")
+
+
+def _reserves_space(tag: Tag) -> bool:
+    style = str(tag.get("style") or "")
+    if "aspect-ratio" in style:
+        return True
+    dimensions = set(_STYLE_DIMENSION_PATTERN.findall(style))
+    if tag.get("width"):
+        dimensions.add("width")
+    if tag.get("height"):
+        dimensions.add("height")
+    return dimensions == {"width", "height"}
+
+
+def check_media_dimensions(soup: BeautifulSoup) -> list[str]:
+    """
+    Check that images and videos reserve their space before they load, with
+    a width and height or an `aspect-ratio`, so that loading them doesn't
+    shift the layout.
+    """
+    return [
+        f"{_media_source(tag)} (in {tag.name} tag)"
+        for tag in soup.find_all(["img", "video"])
+        if not _is_allowlisted_media(tag) and not _reserves_space(tag)
+    ]
 
 
 def check_malformed_hrefs(soup: BeautifulSoup) -> list[str]:
@@ -816,6 +1746,7 @@ def check_file_for_issues(
     base_dir: Path,
     md_path: Path | None,
     should_check_fonts: bool,
+    site_index: SiteIndex | None = None,
 ) -> _IssuesDict:
     """
     Check a single HTML file for various issues.
@@ -825,61 +1756,169 @@ def check_file_for_issues(
         base_dir: Path to the base directory of the site
         md_path: Path to the markdown file that generated the HTML file
         should_check_fonts: Whether to check for preloaded fonts
+        site_index: IDs of every page and every file in the site, used to
+            check cross-page anchors and local assets without reading the
+            disk. Only its `anchor_index` and `manifest` are used.
 
     Returns:
         Dictionary of issues found in the HTML file
     """
-    soup = script_utils.parse_html_file(file_path)
-    if script_utils.is_redirect(soup):
+    time_check = check_profiler.timer(file_path)
+    # Redirects have nothing to check, so don't parse their bodies
+    head = time_check("scan_head", scan_head, file_path)
+    if head.is_redirect:
         return {}
+    soup = time_check("parse_html", script_utils.parse_html_file, file_path)
+    anchor_index, manifest = (
+        (None, None)
+        if site_index is None
+        else (site_index.anchor_index, site_index.manifest)
+    )
+    page_url = "/" + Path(os.path.relpath(file_path, base_dir)).as_posix()
 
     issues: _IssuesDict = {
-        "localhost_links": check_localhost_links(soup),
-        "invalid_internal_links": check_invalid_internal_links(soup),
-        "invalid_anchors": check_invalid_anchors(soup, base_dir),
-        "malformed_hrefs": check_malformed_hrefs(soup),
-        "problematic_paragraphs": paragraphs_contain_canary_phrases(soup),
-        "missing_media_files": check_local_media_files(soup, base_dir),
-        "trailing_blockquotes": check_blockquote_elements(soup),
-        "missing_assets": check_asset_references(soup, file_path, base_dir),
-        "problematic_katex": check_katex_elements_for_errors(soup),
-        "unrendered_subtitles": check_unrendered_subtitles(soup),
-        "unrendered_footnotes": check_unrendered_footnotes(soup),
-        "missing_critical_css": not check_critical_css(soup),
-        "empty_body": script_utils.body_is_empty(soup),
-        "duplicate_ids": check_duplicate_ids(soup),
-        "unrendered_spoilers": check_unrendered_spoilers(soup),
-        "unrendered_emphasis": check_unrendered_emphasis(soup),
-        "katex_outside_blockquote": katex_element_surrounded_by_blockquote(
-            soup
+        "localhost_links": time_check(
+            "localhost_links", check_localhost_links, soup
+        ),
+        "invalid_internal_links": time_check(
+            "invalid_internal_links", check_invalid_internal_links, soup
+        ),
+        "invalid_anchors": time_check(
+            "invalid_anchors",
+            check_invalid_anchors,
+            soup,
+            base_dir,
+            anchor_index,
+        ),
+        "malformed_hrefs": time_check(
+            "malformed_hrefs", check_malformed_hrefs, soup
+        ),
+        "problematic_paragraphs": time_check(
+            "problematic_paragraphs", paragraphs_contain_canary_phrases, soup
+        ),
+        "missing_media_files": time_check(
+            "missing_media_files",
+            check_local_media_files,
+            soup,
+            base_dir,
+            manifest,
+        ),
+        "trailing_blockquotes": time_check(
+            "trailing_blockquotes", check_blockquote_elements, soup
+        ),
+        "missing_assets": time_check(
+            "missing_assets",
+            check_asset_references,
+            soup,
+            file_path,
+            base_dir,
+            manifest,
+        ),
+        "render_blocking_scripts": time_check(
+            "render_blocking_scripts",
+            check_render_blocking_scripts,
+            head,
+            page_url,
+        ),
+        "render_blocking_stylesheets": time_check(
+            "render_blocking_stylesheets",
+            check_render_blocking_stylesheets,
+            head,
+            page_url,
+        ),
+        "eager_offscreen_media": time_check(
+            "eager_offscreen_media", check_offscreen_media_loading, soup
+        ),
+        "media_without_dimensions": time_check(
+            "media_without_dimensions", check_media_dimensions, soup
+        ),
+        "problematic_katex": time_check(
+            "problematic_katex", check_katex_elements_for_errors, soup
         ),
-        "unprocessed_quotes": check_unprocessed_quotes(soup),
-        "unprocessed_dashes": check_unprocessed_dashes(soup),
-        "unrendered_html": check_unrendered_html(soup),
-        "emphasis_spacing": check_emphasis_spacing(soup),
-        "link_spacing": check_link_spacing(soup),
-        "long_description": check_description_length(soup),
-        "late_header_tags": meta_tags_early(file_path),
-        "problematic_iframes": check_iframe_sources(soup),
-        "consecutive_periods": check_consecutive_periods(soup),
-        "invalid_favicon_parents": check_favicon_parent_elements(soup),
-        "invalid_media_asset_sources": check_media_asset_sources(soup),
-        "video_source_order_and_match": check_video_source_order_and_match(
-            soup
+        "unrendered_subtitles": time_check(
+            "unrendered_subtitles", check_unrendered_subtitles, soup
+        ),
+        "unrendered_footnotes": time_check(
+            "unrendered_footnotes", check_unrendered_footnotes, soup
+        ),
+        "missing_critical_css": not time_check(
+            "missing_critical_css", check_critical_css, head
+        ),
+        "empty_body": time_check(
+            "empty_body", script_utils.body_is_empty, soup
+        ),
+        "duplicate_ids": time_check(
+            "duplicate_ids", check_duplicate_ids, soup
+        ),
+        "unrendered_spoilers": time_check(
+            "unrendered_spoilers", check_unrendered_spoilers, soup
+        ),
+        "unrendered_emphasis": time_check(
+            "unrendered_emphasis", check_unrendered_emphasis, soup
+        ),
+        "katex_outside_blockquote": time_check(
+            "katex_outside_blockquote",
+            katex_element_surrounded_by_blockquote,
+            soup,
         ),
     }
 
+    # NOTE check_unrendered_emphasis removes code and KaTeX from emphasized
+    # elements, so the text node checks must run after it
+    text_node_issues = time_check(
+        "text_node_checks", run_text_node_checks, soup
+    )
+    issues.update(
+        {
+            "unprocessed_quotes": text_node_issues["unprocessed_quotes"],
+            "unprocessed_dashes": text_node_issues["unprocessed_dashes"],
+            "unrendered_html": text_node_issues["unrendered_html"],
+            "emphasis_spacing": time_check(
+                "emphasis_spacing", check_emphasis_spacing, soup
+            ),
+            "link_spacing": time_check(
+                "link_spacing", check_link_spacing, soup
+            ),
+            "long_description": time_check(
+                "long_description", check_description_length, soup
+            ),
+            "late_header_tags": list(head.late_tags),
+            "problematic_iframes": time_check(
+                "problematic_iframes", check_iframe_sources, soup
+            ),
+            "consecutive_periods": text_node_issues["consecutive_periods"],
+            "invalid_favicon_parents": time_check(
+                "invalid_favicon_parents", check_favicon_parent_elements, soup
+            ),
+            "invalid_media_asset_sources": time_check(
+                "invalid_media_asset_sources", check_media_asset_sources, soup
+            ),
+            "video_source_order_and_match": time_check(
+                "video_source_order_and_match",
+                check_video_source_order_and_match,
+                soup,
+            ),
+        }
+    )
+
     if should_check_fonts:
-        issues["missing_preloaded_font"] = not check_preloaded_fonts(soup)
+        issues["missing_preloaded_font"] = not time_check(
+            "missing_preloaded_font", check_preloaded_fonts, head
+        )
 
     # Only check markdown assets if md_path exists and is a file
     if md_path and md_path.is_file():
-        issues["missing_markdown_assets"] = check_markdown_assets_in_html(
-            soup, md_path
+        issues["missing_markdown_assets"] = time_check(
+            "missing_markdown_assets",
+            check_markdown_assets_in_html,
+            soup,
+            md_path,
         )
 
     if file_path.name == "about.html":  # Not all pages need to be checked
-        issues["missing_favicon"] = check_favicons_missing(soup)
+        issues["missing_favicon"] = time_check(
+            "missing_favicon", check_favicons_missing, soup
+        )
     return issues
 
 
@@ -951,7 +1990,7 @@ def get_md_asset_counts(md_path: Path) -> Counter[str]:
     with open(md_path, encoding="utf-8") as f:
         content = f.read()
 
-    trimmed_content = source_file_checks.remove_code_and_math(content)
+    trimmed_content = markdown_segments.strip_code_and_math(content)
 
     # Match ![alt](src) pattern, capturing the src
     md_pattern_assets = re.findall(r"!\[.*?\]\((.*?)\)", trimmed_content)
@@ -1385,60 +2424,777 @@ def check_robots_txt_location(base_dir: Path) -> list[str]:
     return issues
 
 
-def main() -> None:
+def check_precompressed_files(base_dir: Path) -> list[str]:
     """
-    Check all HTML files in the public directory for issues.
+    Check that every compressible file has compressed copies written after
+    it last changed.
     """
-    args = parser.parse_args()
-    issues_found: bool = False
+    return [
+        f"{path.relative_to(base_dir)}: compressed copies missing or stale"
+        for path in precompress.stale_files(base_dir)
+    ]
+
+
+class PageToCheck(NamedTuple):
+    """
+    An HTML page to check, along with the markdown file that generated it.
+    """
+
+    file_path: Path
+    md_path: Path | None
+
+
+def collect_pages_to_check(
+    public_dir: Path,
+    permalink_to_md_path_map: Dict[str, Path],
+    files_to_skip: Set[str],
+) -> list[PageToCheck]:
+    """
+    Collect the HTML pages under `public_dir` which should be checked, sorted
+    by path so that results are reported in a deterministic order.
+
+    Raises:
+        FileNotFoundError: If a page should have a markdown source but none
+            was found.
+    """
+    pages: list[PageToCheck] = []
+    for root, _, files in os.walk(public_dir):
+        if "drafts" in root:
+            continue
+        for file in files:
+            if not file.endswith(".html") or Path(file).stem in files_to_skip:
+                continue
+            file_path = Path(root) / file
+
+            # Only derive md_path for public_dir files
+            md_path = None
+            if root.endswith("public"):
+                md_path = permalink_to_md_path_map.get(
+                    file_path.stem
+                ) or permalink_to_md_path_map.get(file_path.stem.lower())
+                if not md_path and script_utils.should_have_md(file_path):
+                    raise FileNotFoundError(
+                        f"Markdown file for {file_path.stem} not found"
+                    )
+            pages.append(PageToCheck(file_path, md_path))
+
+    return sorted(pages, key=lambda page: page.file_path)
+
+
+def select_changed_pages(
+    pages: Sequence[PageToCheck],
+    base_dir: Path,
+    changed_files: Set[Path],
+    site_index: SiteIndex,
+) -> list[PageToCheck]:
+    """
+    Select the pages whose markdown sources changed, along with the pages
+    whose anchors point into them, since their anchor checks depend on the
+    changed pages' IDs.
+
+    Args:
+        pages: Pages to select from, each with its markdown source
+        base_dir: Path to the base directory of the site
+        changed_files: Resolved paths of the changed files
+        site_index: Index of the whole site, giving each page's anchor links
+
+    Returns:
+        The selected pages, in the same order as `pages`
+    """
+    changed_keys = {
+        _page_key(page, base_dir)
+        for page in pages
+        if page.md_path is not None and page.md_path.resolve() in changed_files
+    }
+    return [
+        page
+        for page in pages
+        if (key := _page_key(page, base_dir)) in changed_keys
+        or not changed_keys.isdisjoint(site_index.anchor_links.get(key, ()))
+    ]
+
+
+def _select_pages_changed_since(
+    since_ref: str, pages: list[PageToCheck], site_index: SiteIndex
+) -> list[PageToCheck]:
+    try:
+        changed_files = script_utils.get_changed_files(since_ref, _GIT_ROOT)
+    except ValueError as e:
+        parser.error(str(e))
+    changed_pages = select_changed_pages(
+        pages, _PUBLIC_DIR, changed_files, site_index
+    )
+    print(
+        f"Checking {len(changed_pages)} of {len(pages)} pages changed since "
+        f"{since_ref}."
+    )
+    return changed_pages
+
+
+def _make_picklable(issues: _IssuesDict) -> _IssuesDict:
+    """
+    Replace `Tag` issues with their HTML so that results can be sent between
+    processes without pickling entire documents.
+    """
+    return {
+        name: (
+            [str(item) for item in value] if isinstance(value, list) else value
+        )
+        for name, value in issues.items()
+    }
+
+
+def _page_key(page: PageToCheck, base_dir: Path) -> str:
+    return page.file_path.relative_to(base_dir).as_posix()
+
+
+# Site-wide data which `_init_worker` ships to each worker process once,
+# rather than with every page
+_WORKER_SITE_DATA: Dict[str, SiteIndex | None] = {"site_index": None}
+
+
+def _init_worker(
+    site_index: SiteIndex | None,
+    probe_results: Dict[str, url_prober.ProbeResult],
+    profile: bool = False,
+) -> None:
+    """
+    Store site-wide data in a newly started worker process.
+    """
+    _WORKER_SITE_DATA["site_index"] = site_index
+    url_prober.get_default_prober().seed(probe_results)
+    if profile:
+        check_profiler.set_active_profiler(check_profiler.CheckProfiler())
+
+
+def _check_page_in_worker(
+    page: PageToCheck, base_dir: Path, should_check_fonts: bool
+) -> tuple[_IssuesDict, list[check_profiler.Span]]:
+    """
+    Check a single page inside a worker process.
+
+    Returns:
+        The page's issues, and the spans recorded while checking it if
+        profiling
+    """
+    issues = check_file_for_issues(
+        page.file_path,
+        base_dir,
+        page.md_path,
+        should_check_fonts=should_check_fonts,
+        site_index=_WORKER_SITE_DATA["site_index"],
+    )
+    profiler = check_profiler.get_active_profiler()
+    spans = profiler.drain() if profiler is not None else []
+    return _make_picklable(issues), spans
+
+
+def check_pages(
+    pages: Sequence[PageToCheck],
+    base_dir: Path,
+    should_check_fonts: bool,
+    jobs: int,
+    site_index: SiteIndex | None = None,
+) -> Iterator[tuple[PageToCheck, _IssuesDict]]:
+    """
+    Check pages, fanning out to a process pool when `jobs > 1`.
+
+    Given a `site_index`, cross-page anchors and local assets are checked
+    against it and the remote iframe sources of all `pages` are probed up
+    front, so that each distinct URL is requested once rather than once per
+    page or per worker.
+
+    Results are yielded in the same order as `pages`, regardless of which
+    worker finishes first. Spans recorded by workers are added to this
+    process's active profiler.
+    """
+    if site_index is not None:
+        url_prober.get_default_prober().probe_all(
+            src
+            for page in pages
+            for src in site_index.iframe_sources.get(
+                _page_key(page, base_dir), ()
+            )
+        )
+
+    if jobs <= 1 or len(pages) <= 1:
+        for page in pages:
+            yield page, check_file_for_issues(
+                page.file_path,
+                base_dir,
+                page.md_path,
+                should_check_fonts=should_check_fonts,
+                site_index=site_index,
+            )
+        return
+
+    worker = functools.partial(
+        _check_page_in_worker,
+        base_dir=base_dir,
+        should_check_fonts=should_check_fonts,
+    )
+    chunksize = max(1, len(pages) // (jobs * 4))
+    profiler = check_profiler.get_active_profiler()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            # Workers only need the anchor IDs and the file listing
+            (
+                None
+                if site_index is None
+                else site_index._replace(
+                    anchor_links={},
+                    iframe_sources={},
+                    resources={},
+                    inline_payloads={},
+                    hints={},
+                    critical_fonts={},
+                )
+            ),
+            url_prober.get_default_prober().results,
+            profiler is not None,
+        ),
+    ) as executor:
+        for page, (issues, spans) in zip(
+            pages, executor.map(worker, pages, chunksize=chunksize)
+        ):
+            if profiler is not None:
+                profiler.extend(spans)
+            yield page, issues
+
+
+# Modules whose code determines the check results
+_CHECKER_SOURCES = (
+    Path(__file__),
+    Path(script_utils.__file__),
+    Path(source_file_checks.__file__),
+    Path(markdown_segments.__file__),
+    Path(compress.__file__),
+    Path(url_prober.__file__),
+)
+
+
+def checker_fingerprint(base_dir: Path, should_check_fonts: bool) -> str:
+    """
+    Fingerprint everything which can change every page's results: the
+    checker code, its options and which non-HTML files the site contains.
+    """
+    site_files = [
+        (Path(root) / file).relative_to(base_dir).as_posix()
+        for root, _, files in os.walk(base_dir)
+        for file in files
+        if not file.endswith(".html")
+    ]
+    return page_check_cache.hash_bytes(
+        *(source.read_bytes() for source in _CHECKER_SOURCES),
+        script_utils.get_html_parser(),
+        str(should_check_fonts),
+        page_check_cache.hash_strings(site_files),
+    )
+
+
+def get_page_inputs(
+    page: PageToCheck, base_dir: Path, site_index: SiteIndex
+) -> page_check_cache.PageInputs:
+    """
+    Hash the page, its markdown source and the IDs of each page which its
+    anchors point into.
+    """
+    dependencies: Dict[str, str | None] = {}
+    for target in site_index.anchor_links.get(_page_key(page, base_dir), ()):
+        target_ids = site_index.anchor_index.get(target)
+        dependencies[target] = (
+            None
+            if target_ids is None
+            else page_check_cache.hash_strings(target_ids)
+        )
+
+    md_hash = None
+    if page.md_path and page.md_path.is_file():
+        md_hash = page_check_cache.hash_file(page.md_path)
+
+    return page_check_cache.PageInputs(
+        html_hash=page_check_cache.hash_file(page.file_path),
+        md_hash=md_hash,
+        dependencies=dependencies,
+    )
+
+
+# Checks pages in order, as `check_pages` does
+PageChecker = Callable[
+    [Sequence[PageToCheck]], Iterator[tuple[PageToCheck, _IssuesDict]]
+]
+
+
+def _recheck_iframe_sources(
+    page: PageToCheck, base_dir: Path, site_index: SiteIndex
+) -> list[str]:
+    if not site_index.iframe_sources.get(_page_key(page, base_dir)):
+        return []
+    return check_iframe_sources(script_utils.parse_html_file(page.file_path))
+
+
+def check_pages_with_cache(
+    pages: Sequence[PageToCheck],
+    base_dir: Path,
+    site_index: SiteIndex,
+    cache: page_check_cache.PageCheckCache,
+    check_fresh_pages: PageChecker,
+) -> Iterator[tuple[PageToCheck, _IssuesDict]]:
+    """
+    Like `check_pages`, but only check pages whose inputs changed since
+    their results were cached.
+
+    Iframe sources are probed again on every run, since a probe may fail
+    only for a while; their issues are never cached.
+
+    Args:
+        pages: Pages to check
+        base_dir: Path to the base directory of the site
+        site_index: Index of the whole site, used to hash linked pages
+        cache: Results of earlier runs, updated with fresh results
+        check_fresh_pages: Checks the pages which missed the cache
+
+    Returns:
+        Each page with its issues, in the same order as `pages`
+    """
+    page_inputs = {
+        page: get_page_inputs(page, base_dir, site_index) for page in pages
+    }
+    cached_issues = {}
+    for page, inputs in page_inputs.items():
+        issues = cache.get(_page_key(page, base_dir), inputs)
+        if issues is not None:
+            cached_issues[page] = issues
+
+    # Probe every cached page's iframes at once, as `check_pages` does
+    url_prober.get_default_prober().probe_all(
+        src
+        for page in cached_issues
+        for src in site_index.iframe_sources.get(_page_key(page, base_dir), ())
+    )
+    for page, issues in cached_issues.items():
+        if "problematic_iframes" in issues:
+            # Copy the issues, so that the cache keeps none for the iframes
+            cached_issues[page] = {
+                **issues,
+                "problematic_iframes": _recheck_iframe_sources(
+                    page, base_dir, site_index
+                ),
+            }
+
+    position = 0
+    fresh_pages = [page for page in pages if page not in cached_issues]
+    for page, issues in check_fresh_pages(fresh_pages):
+        # Interleave cached results to preserve the order of `pages`
+        while pages[position] in cached_issues:
+            yield pages[position], cached_issues[pages[position]]
+            position += 1
+        issues = _make_picklable(issues)
+        cache.put(
+            _page_key(page, base_dir),
+            page_inputs[page],
+            (
+                {**issues, "problematic_iframes": []}
+                if "problematic_iframes" in issues
+                else issues
+            ),
+        )
+        yield page, issues
+        position += 1
+
+    for page in pages[position:]:
+        yield page, cached_issues[page]
+
+
+def audit_page_weights(
+    pages: Sequence[PageToCheck],
+    base_dir: Path,
+    site_index: SiteIndex,
+    look_up_remote: bool = False,
+) -> list[page_weight.PageWeight]:
+    """
+    Total the bytes which each page and its resources weigh.
+
+    Args:
+        pages: The pages to weigh
+        base_dir: Path to the base directory of the site
+        site_index: Index of the site, which lists each page's resources
+        look_up_remote: Whether to look up the sizes of remote resources
+            with HEAD requests. Otherwise they are left unsized.
+    """
+    locations = {
+        _page_key(page, base_dir): list(
+            page_resource_locations(
+                _page_key(page, base_dir), base_dir, site_index
+            )
+        )
+        for page in pages
+    }
+    remote_sizes: Dict[str, int | None] = {}
+    if look_up_remote:
+        remote_sizes = {
+            url: result.content_length
+            for url, result in url_prober.get_default_prober()
+            .probe_all(
+                location
+                for page_locations in locations.values()
+                for _, location in page_locations
+                if _is_remote(location)
+            )
+            .items()
+        }
+
+    @functools.cache
+    def size_of(location: str) -> int | None:
+        if _is_remote(location):
+            return remote_sizes.get(location)
+        try:
+            return os.path.getsize(location)
+        except OSError:
+            # Missing files are reported by the other checks
+            return 0
+
+    return [
+        page_weight.measure_page(
+            key, os.path.getsize(base_dir / key), page_locations, size_of
+        )
+        for key, page_locations in locations.items()
+    ]
+
+
+def _check_page_weights(
+    args: argparse.Namespace, pages: list[PageToCheck], site_index: SiteIndex
+) -> list[tuple[Path, _IssuesDict]]:
+    """
+    Report the heaviest pages and write the weight of every page.
+
+    Returns:
+        Each page over budget, and the budgets it exceeds
+    """
+    weights = audit_page_weights(
+        pages, _PUBLIC_DIR, site_index, args.page_weight_remote
+    )
+    print(page_weight.summary(weights, args.page_weight_top))
+    page_weight.write_report(args.page_weight_output, weights)
+    print(f"Wrote {len(weights)} page weights to {args.page_weight_output}")
+
+    budgets = page_weight.budgets_from_args(args)
+    return [
+        (_PUBLIC_DIR / weight.path, {"over_weight_budget": over})
+        for weight in weights
+        if (over := page_weight.over_budget(weight, budgets))
+    ]
+
+
+def collect_resource_use(
+    pages: Sequence[PageToCheck], base_dir: Path, site_index: SiteIndex
+) -> list[resource_hints.PageResources]:
+    """
+    Gather each page's resource hints from the site index, and the
+    resources which the page uses, including the fonts which its critical
+    CSS and local stylesheets declare.
+    """
+
+    @functools.cache
+    def stylesheet_fonts(url: str) -> frozenset[str]:
+        path = base_dir / urlparse(url).path.lstrip("/")
+        if resource_hints.origin(url) or not site_index.manifest.is_file(path):
+            return frozenset()
+        return resource_hints.font_face_urls(
+            path.read_text(encoding="utf-8"), url
+        )
+
+    page_resources = []
+    for page in pages:
+        key = _page_key(page, base_dir)
+        page_url = f"/{key}"
+        resources = [
+            (resource_type, urljoin(page_url, src))
+            for resource_type, src in site_index.resources.get(key, ())
+        ]
+        critical_fonts = site_index.critical_fonts.get(key, frozenset())
+        used = critical_fonts.union(
+            (url for _, url in resources),
+            *(
+                stylesheet_fonts(url)
+                for resource_type, url in resources
+                if resource_type == "css"
+            ),
+        )
+        page_resources.append(
+            resource_hints.PageResources(
+                key,
+                site_index.hints.get(key, ()),
+                used,
+                critical_fonts,
+            )
+        )
+    return page_resources
+
+
+def _check_resource_hints(
+    args: argparse.Namespace,
+    all_pages: list[PageToCheck],
+    pages: list[PageToCheck],
+    site_index: SiteIndex,
+) -> list[tuple[Path, _IssuesDict]]:
+    """
+    Flag hints which nothing uses, and hot resources which aren't hinted.
+    Resource use is compared across `all_pages`, even if only some `pages`
+    are being checked.
+
+    Returns:
+        Each of `pages` with wasted hints, and the site if hot resources
+        aren't hinted
+    """
+    page_resources = collect_resource_use(all_pages, _PUBLIC_DIR, site_index)
+    site_used = frozenset().union(*(page.used for page in page_resources))
+    selected = {_page_key(page, _PUBLIC_DIR) for page in pages}
+    found_issues: list[tuple[Path, _IssuesDict]] = [
+        (_PUBLIC_DIR / page.path, {"wasted_resource_hints": wasted})
+        for page in page_resources
+        if page.path in selected
+        and (wasted := resource_hints.wasted_hints(page, site_used))
+    ]
+    # The comparison covers the whole site, so one shard reports it
+    missing = (
+        resource_hints.missing_hints(page_resources)
+        if _is_first_shard(args)
+        else []
+    )
+    if missing:
+        found_issues.append((_PUBLIC_DIR, {"missing_resource_hints": missing}))
+    return found_issues
 
+
+def _is_first_shard(args: argparse.Namespace) -> bool:
+    """
+    Whether this run reports site-wide results, i.e. it is unsharded or the
+    first shard.
+    """
+    return args.shard is None or args.shard.number == 1
+
+
+def _audit_site(
+    args: argparse.Namespace,
+    all_pages: list[PageToCheck],
+    pages: list[PageToCheck],
+    site_index: SiteIndex,
+) -> list[tuple[Path, _IssuesDict]]:
+    """
+    Run the requested audits which compare pages across the site, and print
+    the requested site-wide reports.
+
+    Args:
+        args: The parsed command-line arguments
+        all_pages: Every page which could be checked
+        pages: The pages selected for this run
+        site_index: Index of the whole site
+    """
+    found_issues = []
+    if args.page_weight:
+        found_issues.extend(_check_page_weights(args, pages, site_index))
+    if args.resource_hints:
+        found_issues.extend(
+            _check_resource_hints(args, all_pages, pages, site_index)
+        )
+    # The index covers the whole site, so one shard reports it
+    if args.duplicate_payloads and _is_first_shard(args):
+        print(
+            inline_payloads.summary(
+                site_index.inline_payloads, args.duplicate_payloads_min_pages
+            )
+        )
+    return found_issues
+
+
+def _check_site_wide(
+    check_precompressed: bool = False,
+) -> list[tuple[Path, _IssuesDict]]:
+    """
+    Run the checks which cover the whole site rather than one page.
+
+    Args:
+        check_precompressed: Whether to check that the compressed copies of
+            files are fresh
+
+    Returns:
+        Each file with issues, and its issues
+    """
+    site_issues: list[tuple[Path, _IssuesDict]] = []
     # check_rss_file_for_issues(git_root)
     css_issues = check_css_issues(_PUBLIC_DIR / "index.css")
     if css_issues:
-        _print_issues(_PUBLIC_DIR / "index.css", {"CSS_issues": css_issues})
-        issues_found = True
+        site_issues.append(
+            (_PUBLIC_DIR / "index.css", {"CSS_issues": css_issues})
+        )
 
     # Check robots.txt location
     robots_issues = check_robots_txt_location(_PUBLIC_DIR)
     if robots_issues:
-        _print_issues(_PUBLIC_DIR, {"robots_txt_issues": robots_issues})
-        issues_found = True
+        site_issues.append((_PUBLIC_DIR, {"robots_txt_issues": robots_issues}))
 
-    md_dir: Path = _GIT_ROOT / "content"
-    permalink_to_md_path_map = script_utils.build_html_to_md_map(md_dir)
-    files_to_skip: Set[str] = script_utils.collect_aliases(md_dir)
+    if check_precompressed:
+        stale_issues = check_precompressed_files(_PUBLIC_DIR)
+        if stale_issues:
+            site_issues.append(
+                (_PUBLIC_DIR, {"stale_precompressed_files": stale_issues})
+            )
+    return site_issues
 
-    for root, _, files in os.walk(_PUBLIC_DIR):
-        if "drafts" in root:
-            continue
-        for file in tqdm.tqdm(files, desc="Webpages checked"):
-            if file.endswith(".html") and Path(file).stem not in files_to_skip:
-                file_path = Path(root) / file
-
-                # Only derive md_path for public_dir files
-                md_path = None
-                if root.endswith("public"):
-                    md_path = permalink_to_md_path_map.get(
-                        file_path.stem
-                    ) or permalink_to_md_path_map.get(file_path.stem.lower())
-                    if not md_path and script_utils.should_have_md(file_path):
-                        raise FileNotFoundError(
-                            f"Markdown file for {file_path.stem} not found"
-                        )
-
-                issues = check_file_for_issues(
-                    file_path,
-                    _PUBLIC_DIR,
-                    md_path,
-                    # pylint: disable=possibly-used-before-assignment
-                    should_check_fonts=args.check_fonts,
-                )
 
-                if any(lst for lst in issues.values()):
-                    _print_issues(file_path, issues)
-                    issues_found = True
+def _select_pages(
+    args: argparse.Namespace, pages: list[PageToCheck], site_index: SiteIndex
+) -> list[PageToCheck]:
+    if args.changed_since:
+        pages = _select_pages_changed_since(
+            args.changed_since, pages, site_index
+        )
+    if args.shard is not None:
+        pages = [
+            page
+            for page in pages
+            if check_shards.in_shard(_page_key(page, _PUBLIC_DIR), args.shard)
+        ]
+    return pages
+
+
+def _check_selected_pages(
+    args: argparse.Namespace, pages: list[PageToCheck], site_index: SiteIndex
+) -> tuple[
+    Iterator[tuple[PageToCheck, _IssuesDict]],
+    page_check_cache.PageCheckCache | None,
+]:
+    """
+    Check pages, reusing cached results if `--cache` was given.
+
+    Returns:
+        Each page with its issues, and the cache if one was used
+    """
+    check_fresh_pages = functools.partial(
+        check_pages,
+        base_dir=_PUBLIC_DIR,
+        should_check_fonts=args.check_fonts,
+        jobs=args.jobs,
+        site_index=site_index,
+    )
+    if not args.cache:
+        return check_fresh_pages(pages), None
+
+    cache = page_check_cache.PageCheckCache.load(
+        args.cache_path,
+        checker_fingerprint(_PUBLIC_DIR, args.check_fonts),
+    )
+    results = check_pages_with_cache(
+        pages,
+        _PUBLIC_DIR,
+        site_index=site_index,
+        cache=cache,
+        check_fresh_pages=check_fresh_pages,
+    )
+    return results, cache
+
+
+# Issues which are only reported when opted into, since most of the site's
+# media don't reserve their space yet
+_OPT_IN_ISSUES = {"media_without_dimensions": "check_media_dimensions"}
+
+
+def _reported_issues(
+    args: argparse.Namespace, issues: _IssuesDict
+) -> _IssuesDict:
+    """
+    Drop the issues of opt-in checks which weren't enabled. Those checks
+    still run, so that cached results don't depend on the options.
+    """
+    return {
+        name: value
+        for name, value in issues.items()
+        if name not in _OPT_IN_ISSUES or getattr(args, _OPT_IN_ISSUES[name])
+    }
+
+
+def _write_report(
+    args: argparse.Namespace, found_issues: list[tuple[Path, _IssuesDict]]
+) -> None:
+    check_shards.write_report(
+        args.report,
+        args.shard,
+        [
+            (Path(os.path.relpath(file_path, _GIT_ROOT)).as_posix(), issues)
+            for file_path, issues in found_issues
+        ],
+    )
+
+
+def main() -> None:
+    """
+    Check all HTML files in the public directory for issues.
+    """
+    args = parser.parse_args()
+    if args.merge:
+        sys.exit(check_shards.merge_reports(args.merge, _print_issues))
+
+    profiler = check_profiler.start(args)
+    if args.html_parser:
+        # Set in the environment so that worker processes inherit it
+        os.environ[script_utils.HTML_PARSER_ENV_VAR] = args.html_parser
+
+    site_data = (
+        load_site_data(args.site_data, _GIT_ROOT, _PUBLIC_DIR)
+        if args.site_data
+        else compute_site_data(
+            _GIT_ROOT / "content",
+            _PUBLIC_DIR,
+            # Shards which load saved data may report duplicated payloads
+            collect_payloads=args.duplicate_payloads
+            or bool(args.save_site_data),
+        )
+    )
+    script_utils.get_frontmatter_index().save()
+    if args.save_site_data:
+        save_site_data(site_data, args.save_site_data, _GIT_ROOT)
+        print(f"Wrote site data to {args.save_site_data}")
+        return
+
+    # Site-wide checks only need to run in one shard
+    found_issues = (
+        _check_site_wide(args.check_precompressed)
+        if _is_first_shard(args)
+        else []
+    )
+    for file_path, issues in found_issues:
+        _print_issues(file_path, issues)
 
-    if issues_found:
+    all_pages = collect_pages_to_check(
+        _PUBLIC_DIR, site_data.permalink_to_md_path, site_data.aliases
+    )
+    pages = _select_pages(args, all_pages, site_data.site_index)
+    results, cache = _check_selected_pages(args, pages, site_data.site_index)
+    for page, issues in tqdm.tqdm(
+        results, total=len(pages), desc="Webpages checked"
+    ):
+        issues = _reported_issues(args, issues)
+        if any(lst for lst in issues.values()):
+            _print_issues(page.file_path, issues)
+            found_issues.append((page.file_path, _make_picklable(issues)))
+    for file_path, issues in _audit_site(
+        args, all_pages, pages, site_data.site_index
+    ):
+        _print_issues(file_path, issues)
+        found_issues.append((file_path, issues))
+
+    url_prober.get_default_prober().save()
+    if cache is not None:
+        cache.save({_page_key(page, _PUBLIC_DIR) for page in all_pages})
+        print(f"Reused cached results for {cache.hits} of {len(pages)} pages.")
+    check_profiler.report(profiler, args, "built_site_checks")
+    if args.report:
+        _write_report(args, found_issues)
+
+    if found_issues:
         sys.exit(1)
 
 
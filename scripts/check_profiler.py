@@ -0,0 +1,218 @@
+"""
+Record how long each check takes on each file, for the `--profile` mode of
+the site checkers.
+
+Both `built_site_checks.py` and `source_file_checks.py` record spans in the
+same format, so their exports can be analyzed with the same tools.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, NamedTuple, TypeVar
+
+_T = TypeVar("_T")
+
+DEFAULT_TOP_N = 10
+# skipcq: BAN-B108
+_DEFAULT_OUTPUT_DIR = Path(tempfile.gettempdir()) / "quartz_checks"
+
+
+class Span(NamedTuple):
+    """
+    One run of one check on one file.
+    """
+
+    check: str
+    path: str
+    seconds: float
+
+
+class Totals(NamedTuple):
+    """
+    Time spent and number of spans for a check or a file.
+    """
+
+    seconds: float
+    calls: int
+
+
+class CheckProfiler:
+    """
+    Collects spans, and summarizes them by check and by file.
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def run(
+        self, check: str, path: str, function: Callable[..., _T], *args: Any
+    ) -> _T:
+        """
+        Call `function(*args)`, recording its wall time as a span.
+        """
+        started_at = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.spans.append(
+                Span(check, path, time.perf_counter() - started_at)
+            )
+
+    def extend(self, spans: Iterable[Span]) -> None:
+        """
+        Add spans recorded elsewhere, e.g. by a worker process.
+        """
+        self.spans.extend(Span(*span) for span in spans)
+
+    def drain(self) -> list[Span]:
+        """
+        Remove and return the spans recorded so far.
+        """
+        spans, self.spans = self.spans, []
+        return spans
+
+    def _totals(self, field: str) -> Dict[str, Totals]:
+        seconds: Dict[str, float] = defaultdict(float)
+        calls: Dict[str, int] = defaultdict(int)
+        for span in self.spans:
+            key = getattr(span, field)
+            seconds[key] += span.seconds
+            calls[key] += 1
+        return {key: Totals(seconds[key], calls[key]) for key in seconds}
+
+    def check_totals(self) -> Dict[str, Totals]:
+        """
+        Total time and calls of each check, over all files.
+        """
+        return self._totals("check")
+
+    def path_totals(self) -> Dict[str, Totals]:
+        """
+        Total time and checks run for each file.
+        """
+        return self._totals("path")
+
+    def summary(self, top_n: int = DEFAULT_TOP_N) -> str:
+        """
+        Describe the `top_n` slowest checks and files.
+        """
+        lines = []
+        for title, totals in (
+            ("checks", self.check_totals()),
+            ("files", self.path_totals()),
+        ):
+            lines.append(f"Slowest {title}:")
+            slowest = sorted(
+                totals.items(), key=lambda item: item[1].seconds, reverse=True
+            )[:top_n]
+            for name, (seconds, calls) in slowest:
+                lines.append(f"  {seconds:9.3f}s {calls:7} calls  {name}")
+        return "\n".join(lines)
+
+    def export(self, output_path: Path, script: str) -> None:
+        """
+        Write every span to a JSON file.
+        """
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "script": script,
+                    "spans": [span._asdict() for span in self.spans],
+                },
+                f,
+            )
+
+
+_ACTIVE_PROFILER: Dict[str, CheckProfiler] = {}
+
+
+def get_active_profiler() -> CheckProfiler | None:
+    """
+    Get the profiler recording spans in this process, if profiling.
+    """
+    return _ACTIVE_PROFILER.get("profiler")
+
+
+def set_active_profiler(profiler: CheckProfiler | None) -> None:
+    """
+    Start recording spans with `profiler`, or stop profiling if None.
+    """
+    if profiler is None:
+        _ACTIVE_PROFILER.pop("profiler", None)
+    else:
+        _ACTIVE_PROFILER["profiler"] = profiler
+
+
+def timer(path: Path) -> Callable[..., Any]:
+    """
+    Get a function which runs a named check on `path`, timing it if a
+    profiler is active.
+
+    Example:
+        time_check = timer(file_path)
+        issues = {"links": time_check("links", check_links, soup)}
+    """
+    profiler = get_active_profiler()
+    if profiler is None:
+        return _run_untimed
+    return lambda check, function, *args: profiler.run(
+        check, str(path), function, *args
+    )
+
+
+def _run_untimed(_check: str, function: Callable[..., _T], *args: Any) -> _T:
+    return function(*args)
+
+
+def add_arguments(parser: argparse.ArgumentParser, script: str) -> None:
+    """
+    Add the `--profile` options to a checker's argument parser.
+    """
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Time each check on each file, then print the slowest checks "
+        "and files and export every span as JSON",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_TOP_N,
+        help="How many of the slowest checks and files to print",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        default=_DEFAULT_OUTPUT_DIR / f"{script}_profile.json",
+        help="Where to export the spans",
+    )
+
+
+def start(args: argparse.Namespace) -> CheckProfiler | None:
+    """
+    Start profiling this process if `--profile` was given.
+    """
+    if not args.profile:
+        return None
+    profiler = CheckProfiler()
+    set_active_profiler(profiler)
+    return profiler
+
+
+def report(
+    profiler: CheckProfiler | None, args: argparse.Namespace, script: str
+) -> None:
+    """
+    Print the slowest checks and files and export the spans, if profiling.
+    """
+    if profiler is None:
+        return
+    print(profiler.summary(args.profile_top))
+    profiler.export(args.profile_output, script)
+    print(f"Wrote {len(profiler.spans)} spans to {args.profile_output}")
@@ -0,0 +1,142 @@
+"""
+Split the built-site checks across several machines, and merge the partial
+reports which each shard writes.
+
+Pages are assigned to shards by a hash of their path, so every shard of
+the same build agrees on the split without coordinating.
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Sequence
+
+from scripts import utils as script_utils
+
+# Bump when the format of the report files changes
+REPORT_FORMAT_VERSION = 1
+
+ReportedIssues = Dict[str, Any]
+
+
+class Shard(NamedTuple):
+    """
+    The `number`th of `total` slices of the site, counting from 1.
+    """
+
+    number: int
+    total: int
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.total}"
+
+
+def parse_shard(value: str) -> Shard:
+    """
+    Parse a shard given as "i/N", for use as an argparse `type`.
+    """
+    try:
+        number, total = (int(part) for part in value.split("/"))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            f"Shard must look like 'i/N', not '{value}'"
+        ) from e
+    if not 1 <= number <= total:
+        raise argparse.ArgumentTypeError(
+            f"Shard number must be between 1 and {total}, not {number}"
+        )
+    return Shard(number, total)
+
+
+def in_shard(key: str, shard: Shard) -> bool:
+    """
+    Whether the item with the given key, e.g. a page's path, belongs to
+    `shard`.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard.total == shard.number - 1
+
+
+def write_report(
+    report_path: Path,
+    shard: Shard | None,
+    issues: Sequence[tuple[str, ReportedIssues]],
+) -> None:
+    """
+    Write the issues found by one shard.
+
+    Args:
+        report_path: Where to write the report
+        shard: Which shard found the issues, or None if the whole site was
+            checked
+        issues: Each file with issues, and its issues
+    """
+    script_utils.write_json_atomically(
+        report_path,
+        {
+            "version": REPORT_FORMAT_VERSION,
+            "shard": None if shard is None else list(shard),
+            "issues": [
+                {"path": path, "issues": file_issues}
+                for path, file_issues in issues
+            ],
+        },
+    )
+
+
+def _read_report(report_path: Path) -> Dict[str, Any]:
+    with open(report_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != (
+        REPORT_FORMAT_VERSION
+    ):
+        raise ValueError(f"{report_path} is not a shard report")
+    return data
+
+
+def _missing_shards(shards: list[Shard | None]) -> list[str]:
+    """
+    Describe the shards of the site which no report covers.
+    """
+    if None in shards:
+        # One report covers the whole site
+        return []
+    totals = {shard.total for shard in shards if shard is not None}
+    if len(totals) != 1:
+        return [f"reports disagree on the shard count: {sorted(totals)}"]
+    total = totals.pop()
+    seen = {shard.number for shard in shards if shard is not None}
+    return [
+        f"shard {number}/{total}"
+        for number in range(1, total + 1)
+        if number not in seen
+    ]
+
+
+def merge_reports(
+    report_paths: Sequence[Path],
+    print_issues: Callable[[Path, ReportedIssues], None],
+) -> int:
+    """
+    Print the issues from every shard's report.
+
+    Returns:
+        The exit code of the whole check: 1 if any shard found issues or any
+        shard's report is missing, otherwise 0.
+    """
+    shards: list[Shard | None] = []
+    issues_found = False
+    for report_path in report_paths:
+        report = _read_report(report_path)
+        shards.append(
+            None if report["shard"] is None else Shard(*report["shard"])
+        )
+        for entry in report["issues"]:
+            print_issues(Path(entry["path"]), entry["issues"])
+            issues_found = True
+
+    missing = _missing_shards(shards)
+    if missing:
+        print(f"Missing reports for {', '.join(missing)}")
+    return int(issues_found or bool(missing))
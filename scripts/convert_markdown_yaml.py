@@ -15,6 +15,7 @@ import shutil
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import TypeGuard
 from urllib import parse
 
 import requests
@@ -183,6 +184,19 @@ def _setup_and_store_image(png_path: Path, png_filename: str) -> Path:
     return local_png_path
 
 
+def needs_card_image_conversion(
+    card_image_url: str | None,
+) -> TypeGuard[str]:
+    """
+    Whether a card image is in a format to convert and not yet uploaded.
+    """
+    if not card_image_url:
+        return False
+    return any(
+        card_image_url.endswith(ext) for ext in _CAN_CONVERT_EXTENSIONS
+    ) and not card_image_url.startswith("https://assets.turntrout.com/")
+
+
 def process_card_image_in_markdown(md_file: Path) -> None:
     """
     Process the 'card_image' in the YAML frontmatter of the given md file.
@@ -199,13 +213,7 @@ def process_card_image_in_markdown(md_file: Path) -> None:
 
     # Check if we need to process this file
     card_image_url = data.get("card_image")
-    if (
-        not card_image_url
-        or not any(
-            card_image_url.endswith(ext) for ext in _CAN_CONVERT_EXTENSIONS
-        )
-        or card_image_url.startswith("https://assets.turntrout.com/")
-    ):
+    if not needs_card_image_conversion(card_image_url):
         return
 
     # Process and store the image
@@ -256,8 +264,12 @@ def main() -> None:
         use_git_ignore=True,
     )
 
+    index = script_utils.get_frontmatter_index()
     for md_file in markdown_files:
-        process_card_image_in_markdown(md_file)
+        # Only parse round-trip the files which will be rewritten
+        if needs_card_image_conversion(index.get(md_file).get("card_image")):
+            process_card_image_in_markdown(md_file)
+    index.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+"""
+Find inline `<style>`, `<script>` and `<svg>` blocks which are repeated
+across many pages, and so might be cheaper as cacheable external files.
+
+`built_site_checks.py` collects each page's blocks while indexing the site;
+this module counts and reports them.
+"""
+
+import argparse
+import hashlib
+from typing import Any, Dict, Iterable, NamedTuple
+
+from scripts import page_weight
+
+PAYLOAD_TAGS = ("style", "script", "svg")
+DEFAULT_MIN_PAGES = 10
+# Long enough that distinct payloads practically never collide
+_DIGEST_SIZE = 8
+
+
+class PayloadStats(NamedTuple):
+    """
+    How often one distinct payload appears.
+    """
+
+    tag: str
+    # Size of the block's markup in bytes
+    size: int
+    pages: int
+    # The first page, in path order, which contains the payload
+    example_page: str
+
+    @property
+    def wasted_bytes(self) -> int:
+        """
+        Bytes shipped in every copy after the first.
+        """
+        return self.size * (self.pages - 1)
+
+
+# Maps a short hash of each distinct payload to its stats, so that memory
+# grows with the number of distinct payloads rather than with their size or
+# the number of pages
+PayloadIndex = Dict[bytes, PayloadStats]
+
+
+def add_page(
+    index: PayloadIndex, page: str, payloads: Iterable[tuple[str, str]]
+) -> None:
+    """
+    Count the payloads of a page, each at most once.
+
+    Args:
+        index: The index to update
+        page: Page path, relative to the site root
+        payloads: The tag and markup of each inline block on the page
+    """
+    page_payloads = {}
+    for tag, markup in payloads:
+        markup_bytes = markup.encode("utf-8")
+        digest = hashlib.blake2b(
+            markup_bytes, digest_size=_DIGEST_SIZE
+        ).digest()
+        page_payloads[digest] = (tag, len(markup_bytes))
+
+    for digest, (tag, size) in page_payloads.items():
+        stats = index.get(digest)
+        index[digest] = (
+            PayloadStats(tag, size, 1, page)
+            if stats is None
+            else stats._replace(
+                pages=stats.pages + 1,
+                example_page=min(stats.example_page, page),
+            )
+        )
+
+
+def duplicated_payloads(
+    index: PayloadIndex, min_pages: int = DEFAULT_MIN_PAGES
+) -> list[PayloadStats]:
+    """
+    The payloads on at least `min_pages` pages, most wasteful first.
+    """
+    return sorted(
+        (stats for stats in index.values() if stats.pages >= min_pages),
+        key=lambda stats: stats.wasted_bytes,
+        reverse=True,
+    )
+
+
+def summary(index: PayloadIndex, min_pages: int = DEFAULT_MIN_PAGES) -> str:
+    """
+    Describe the payloads on at least `min_pages` pages, and the bytes they
+    waste in total.
+    """
+    duplicates = duplicated_payloads(index, min_pages)
+    lines = [
+        f"Inline payloads on at least {min_pages} pages, by bytes wasted:"
+    ]
+    for stats in duplicates:
+        lines.append(
+            f"  {page_weight.format_size(stats.wasted_bytes):>9} wasted  "
+            f"<{stats.tag}> of {page_weight.format_size(stats.size)} on "
+            f"{stats.pages} pages, e.g. {stats.example_page}"
+        )
+    total = sum(stats.wasted_bytes for stats in duplicates)
+    lines.append(f"Total: {page_weight.format_size(total)} wasted")
+    return "\n".join(lines)
+
+
+def to_json(index: PayloadIndex) -> Dict[str, list[Any]]:
+    """
+    Convert an index to a form which `json` can write.
+    """
+    return {digest.hex(): list(stats) for digest, stats in index.items()}
+
+
+def from_json(data: Dict[str, list[Any]]) -> PayloadIndex:
+    """
+    Convert an index written by `to_json` back.
+    """
+    return {
+        bytes.fromhex(digest): PayloadStats(*stats)
+        for digest, stats in data.items()
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the `--duplicate-payloads` options to a checker's argument parser.
+    """
+    parser.add_argument(
+        "--duplicate-payloads",
+        action="store_true",
+        default=False,
+        help="Report inline <style>, <script> and <svg> blocks repeated "
+        "across many pages, and the bytes they waste",
+    )
+    parser.add_argument(
+        "--duplicate-payloads-min-pages",
+        type=int,
+        default=DEFAULT_MIN_PAGES,
+        help="How many pages a block must be on to be reported",
+    )
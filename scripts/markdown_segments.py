@@ -0,0 +1,82 @@
+"""
+Split markdown into prose, code and math in one pass, so that checks which
+should only see prose share one segmentation of each file.
+"""
+
+import functools
+import re
+from typing import Literal, NamedTuple
+
+SegmentKind = Literal[
+    "prose", "fenced_code", "inline_code", "display_math", "inline_math"
+]
+
+# Tried in order at each backtick or dollar sign, so fences win over inline
+# code and display math over inline math
+_SEGMENT_PATTERN = re.compile(
+    r"(?P<fenced_code>(?s:```.*?```))"
+    r"|(?P<display_math>(?s:\$\$.*?\$\$))"
+    r"|(?P<inline_code>(?<!\\)`[^`]*(?<!\\)`)"
+    r"|(?P<inline_math>(?<!\\)\$[^$]*?(?<!\\)\$)"
+)
+# Every segment other than prose starts with one of these
+_DELIMITER_PATTERN = re.compile(r"[`$]")
+# How many texts to keep segmentations of; checks of one file share them
+_CACHE_SIZE = 64
+
+
+class Segment(NamedTuple):
+    """
+    A span of markdown, e.g. `Segment("inline_code", 10, 15)`.
+    """
+
+    kind: SegmentKind
+    # Offsets into the original text
+    start: int
+    end: int
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def segment_markdown(text: str) -> tuple[Segment, ...]:
+    """
+    Split `text` into consecutive segments which cover all of it. Empty
+    prose segments are left out.
+
+    Results are cached by the text's contents, so each check of a file
+    reuses the first one's segmentation.
+    """
+    segments: list[Segment] = []
+    prose_start = search_start = 0
+    while delimiter := _DELIMITER_PATTERN.search(text, search_start):
+        match = _SEGMENT_PATTERN.match(text, delimiter.start())
+        if match is None:
+            search_start = delimiter.start() + 1
+            continue
+        if prose_start < match.start():
+            segments.append(Segment("prose", prose_start, match.start()))
+        segments.append(
+            Segment(
+                match.lastgroup,  # type: ignore[arg-type]
+                match.start(),
+                match.end(),
+            )
+        )
+        prose_start = search_start = match.end()
+    if prose_start < len(text):
+        segments.append(Segment("prose", prose_start, len(text)))
+    return tuple(segments)
+
+
+def strip_code_and_math(text: str, replacement: str = "") -> str:
+    """
+    The prose of `text`, with each code or math segment replaced by
+    `replacement`.
+    """
+    return "".join(
+        (
+            text[segment.start : segment.end]
+            if segment.kind == "prose"
+            else replacement
+        )
+        for segment in segment_markdown(text)
+    )
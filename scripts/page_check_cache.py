@@ -0,0 +1,165 @@
+"""
+Persistent cache of built-site check results, so that pages whose inputs
+haven't changed aren't checked again.
+"""
+
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterable, NamedTuple
+
+from scripts import utils as script_utils
+
+# Bump when the format of the cache file changes
+CACHE_FORMAT_VERSION = 1
+
+# skipcq: BAN-B108
+DEFAULT_CACHE_PATH = (
+    Path(tempfile.gettempdir()) / "quartz_checks" / "built_site_checks.json"
+)
+
+CachedIssues = Dict[str, Any]
+
+
+def hash_bytes(*parts: bytes | str) -> str:
+    """
+    Hash several strings or byte strings into one hex digest.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        # Prefix each part with its length so that parts can't run together
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_file(file_path: Path) -> str:
+    """
+    Hash the contents of a file.
+    """
+    return hash_bytes(file_path.read_bytes())
+
+
+def hash_strings(strings: Iterable[str]) -> str:
+    """
+    Hash a collection of strings, ignoring their order.
+    """
+    return hash_bytes(*sorted(strings))
+
+
+class PageInputs(NamedTuple):
+    """
+    Everything that a page's check results depend on, besides the checker
+    itself.
+    """
+
+    html_hash: str
+    md_hash: str | None
+    # Maps each page that this page's anchors point into to a hash of that
+    # page's IDs, or None if it doesn't exist
+    dependencies: Dict[str, str | None]
+
+
+class PageCheckCache:
+    """
+    On-disk store of each page's issues, keyed by the page's path.
+
+    An entry is only used if the page's current `PageInputs` equal those it
+    was stored with. The whole cache is discarded when the checker
+    fingerprint changes.
+    """
+
+    def __init__(self, cache_path: Path, fingerprint: str) -> None:
+        self.cache_path = cache_path
+        self.fingerprint = fingerprint
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Pages whose entries were stored during this run
+        self._stored: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, cache_path: Path, fingerprint: str) -> "PageCheckCache":
+        """
+        Load the cache, starting afresh if it is missing, unreadable or was
+        written by a different checker.
+        """
+        cache = cls(cache_path, fingerprint)
+        cache._entries = cache._read_entries()
+        return cache
+
+    def _read_entries(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if (
+            isinstance(data, dict)
+            and data.get("version") == CACHE_FORMAT_VERSION
+            and data.get("fingerprint") == self.fingerprint
+        ):
+            return data.get("pages", {})
+        return {}
+
+    def get(self, page_key: str, inputs: PageInputs) -> CachedIssues | None:
+        """
+        Get the cached issues for a page, or None if its inputs changed.
+        """
+        entry = self._entries.get(page_key)
+        if entry is not None and entry["inputs"] == _inputs_to_json(inputs):
+            self.hits += 1
+            return entry["issues"]
+        self.misses += 1
+        return None
+
+    def put(
+        self, page_key: str, inputs: PageInputs, issues: CachedIssues
+    ) -> None:
+        """
+        Store the issues found for a page.
+        """
+        self._stored.add(page_key)
+        self._entries[page_key] = {
+            "inputs": _inputs_to_json(inputs),
+            "issues": issues,
+        }
+
+    def save(self, existing_pages: Collection[str]) -> None:
+        """
+        Write the cache to disk, keeping the entries of pages which this run
+        didn't check, e.g. those outside its shard.
+
+        Entries which other runs saved since this cache was loaded are merged
+        in, so that shards sharing a cache file don't drop each other's
+        results.
+
+        Args:
+            existing_pages: Keys of every page in the site. Entries of other
+                pages are dropped, since those pages were deleted.
+        """
+        entries = {**self._entries, **self._read_entries()}
+        entries.update((key, self._entries[key]) for key in self._stored)
+        script_utils.write_json_atomically(
+            self.cache_path,
+            {
+                "version": CACHE_FORMAT_VERSION,
+                "fingerprint": self.fingerprint,
+                "pages": {
+                    key: entries[key]
+                    for key in sorted(entries)
+                    if key in existing_pages
+                },
+            },
+        )
+
+
+def _inputs_to_json(inputs: PageInputs) -> Dict[str, Any]:
+    return {
+        "html_hash": inputs.html_hash,
+        "md_hash": inputs.md_hash,
+        "dependencies": dict(sorted(inputs.dependencies.items())),
+    }
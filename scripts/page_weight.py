@@ -0,0 +1,214 @@
+"""
+Total the bytes each built page ships, by type of resource, and flag pages
+which exceed a budget.
+
+`built_site_checks.py` finds each page's resources; this module sizes and
+reports them.
+"""
+
+import argparse
+import re
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Sequence
+
+from scripts import utils as script_utils
+
+RESOURCE_TYPES = ("html", "css", "js", "media")
+_KIB = 1024
+_MIB = 1024 * _KIB
+# Per-page budgets for each resource type, and for all resources together
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "html": 2 * _MIB,
+    "css": 512 * _KIB,
+    "js": 1 * _MIB,
+    "media": 10 * _MIB,
+    "total": 12 * _MIB,
+}
+DEFAULT_TOP_N = 10
+# skipcq: BAN-B108
+_DEFAULT_OUTPUT_PATH = (
+    Path(tempfile.gettempdir()) / "quartz_checks" / "page_weights.json"
+)
+_SIZE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([kmg]?i?b?)$", re.IGNORECASE)
+_UNIT_BYTES = {"": 1, "k": _KIB, "m": _MIB, "g": 1024 * _MIB}
+
+
+class PageWeight(NamedTuple):
+    """
+    The bytes one page ships, by resource type.
+    """
+
+    # Page path, relative to the site root
+    path: str
+    bytes_by_type: Dict[str, int]
+    # Remote resources whose size isn't known
+    unsized: tuple[str, ...] = ()
+
+    @property
+    def total(self) -> int:
+        """
+        Bytes shipped over all resource types.
+        """
+        return sum(self.bytes_by_type.values())
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size like "512", "200KB" or "1.5MiB" into bytes. Units are
+    powers of 1024.
+    """
+    match = _SIZE_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError(f"Can't parse '{value}' as a size")
+    number, unit = match.groups()
+    prefix = unit.lower().rstrip("b").rstrip("i")
+    return int(float(number) * _UNIT_BYTES[prefix])
+
+
+def parse_budget(value: str) -> tuple[str, int]:
+    """
+    Parse a budget given as "TYPE=SIZE", for use as an argparse `type`.
+    """
+    resource_type, _, size = value.partition("=")
+    if resource_type not in DEFAULT_BUDGETS:
+        raise argparse.ArgumentTypeError(
+            f"Budget type must be one of {', '.join(DEFAULT_BUDGETS)}, "
+            f"not '{resource_type}'"
+        )
+    try:
+        return resource_type, parse_size(size)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def format_size(num_bytes: int) -> str:
+    """
+    Describe a size in the largest unit which keeps it at least 1.
+    """
+    if num_bytes >= _MIB:
+        return f"{num_bytes / _MIB:.1f}MiB"
+    if num_bytes >= _KIB:
+        return f"{num_bytes / _KIB:.1f}KiB"
+    return f"{num_bytes}B"
+
+
+def measure_page(
+    path: str,
+    html_bytes: int,
+    resources: Iterable[tuple[str, str]],
+    size_of: Callable[[str], int | None],
+) -> PageWeight:
+    """
+    Total a page's bytes.
+
+    Args:
+        path: Page path, relative to the site root
+        html_bytes: Size of the page's own HTML
+        resources: The type and location of each resource the page loads.
+            Each distinct location is counted once.
+        size_of: Size of the resource at a location, or None if unknown
+    """
+    bytes_by_type = dict.fromkeys(RESOURCE_TYPES, 0)
+    bytes_by_type["html"] = html_bytes
+    unsized = []
+    for resource_type, location in dict.fromkeys(resources):
+        size = size_of(location)
+        if size is None:
+            unsized.append(location)
+        else:
+            bytes_by_type[resource_type] += size
+    return PageWeight(path, bytes_by_type, tuple(unsized))
+
+
+def over_budget(weight: PageWeight, budgets: Dict[str, int]) -> list[str]:
+    """
+    Describe each budget which a page exceeds.
+    """
+    sizes = {**weight.bytes_by_type, "total": weight.total}
+    return [
+        f"{resource_type}: {format_size(sizes[resource_type])} "
+        f"> {format_size(budget)}"
+        for resource_type, budget in budgets.items()
+        if sizes[resource_type] > budget
+    ]
+
+
+def summary(weights: Sequence[PageWeight], top_n: int = DEFAULT_TOP_N) -> str:
+    """
+    Describe the `top_n` heaviest pages.
+    """
+    lines = ["Heaviest pages:"]
+    for weight in sorted(weights, key=lambda w: w.total, reverse=True)[:top_n]:
+        by_type = ", ".join(
+            f"{resource_type} {format_size(size)}"
+            for resource_type, size in weight.bytes_by_type.items()
+        )
+        unsized = (
+            f" (+{len(weight.unsized)} unsized)" if weight.unsized else ""
+        )
+        lines.append(
+            f"  {format_size(weight.total):>9}  {weight.path}  "
+            f"[{by_type}]{unsized}"
+        )
+    return "\n".join(lines)
+
+
+def write_report(output_path: Path, weights: Sequence[PageWeight]) -> None:
+    """
+    Write the weight of every page as JSON, heaviest first.
+    """
+    script_utils.write_json_atomically(
+        output_path,
+        [
+            {**weight._asdict(), "total": weight.total}
+            for weight in sorted(weights, key=lambda w: w.total, reverse=True)
+        ],
+    )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the `--page-weight` options to a checker's argument parser.
+    """
+    parser.add_argument(
+        "--page-weight",
+        action="store_true",
+        default=False,
+        help="Total the bytes each page ships, flag pages over budget and "
+        "report the heaviest pages",
+    )
+    parser.add_argument(
+        "--page-weight-budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="TYPE=SIZE",
+        help="Override a per-page budget, e.g. 'css=256KiB'. Types are "
+        f"{', '.join(DEFAULT_BUDGETS)}.",
+    )
+    parser.add_argument(
+        "--page-weight-remote",
+        action="store_true",
+        default=False,
+        help="Look up the sizes of remote resources with HEAD requests",
+    )
+    parser.add_argument(
+        "--page-weight-top",
+        type=int,
+        default=DEFAULT_TOP_N,
+        help="How many of the heaviest pages to print",
+    )
+    parser.add_argument(
+        "--page-weight-output",
+        type=Path,
+        default=_DEFAULT_OUTPUT_PATH,
+        help="Where to write the weight of every page",
+    )
+
+
+def budgets_from_args(args: argparse.Namespace) -> Dict[str, int]:
+    """
+    The default budgets, with any given on the command line.
+    """
+    return {**DEFAULT_BUDGETS, **dict(args.page_weight_budget)}
@@ -0,0 +1,257 @@
+"""
+Write Brotli (`.br`) and zstd (`.zst`) copies of each compressible file in the
+built site, so that they can be served without compressing on the fly.
+
+Run after `quartz build`. Files whose compressed copies are newer than them
+are skipped, so reruns only compress what the build changed.
+
+Example:
+    python scripts/precompress.py --jobs 8
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Sequence
+
+import brotli  # type: ignore[import]
+import zstandard
+
+# Add the project root to sys.path
+# pylint: disable=C0413
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts import page_weight
+from scripts import utils as script_utils
+
+COMPRESSIBLE_EXTENSIONS = frozenset(
+    {
+        ".css",
+        ".html",
+        ".js",
+        ".json",
+        ".map",
+        ".mjs",
+        ".svg",
+        ".txt",
+        ".webmanifest",
+        ".xml",
+    }
+)
+_BROTLI_QUALITY = 11
+_ZSTD_LEVEL = 19
+
+
+def _compress_brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=_BROTLI_QUALITY)
+
+
+def _compress_zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+
+
+# Maps the suffix of each compressed copy to its compressor
+ENCODINGS: Dict[str, Callable[[bytes], bytes]] = {
+    ".br": _compress_brotli,
+    ".zst": _compress_zstd,
+}
+
+
+class CompressionResult(NamedTuple):
+    """
+    The outcome of writing one compressed copy of a file.
+    """
+
+    # Type of the original file, e.g. ".html"
+    file_type: str
+    # Suffix of the compressed copy, e.g. ".br"
+    encoding: str
+    original_bytes: int
+    compressed_bytes: int
+    seconds: float
+
+
+def compressed_copy(path: Path, encoding: str) -> Path:
+    """
+    Where the copy of `path` compressed with `encoding` goes, e.g.
+    `index.html.br`.
+    """
+    return path.with_name(path.name + encoding)
+
+
+def is_fresh(path: Path, copy: Path) -> bool:
+    """
+    Whether `copy` exists and was written after `path` last changed.
+    """
+    try:
+        return copy.stat().st_mtime_ns >= path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def compressible_files(public_dir: Path) -> list[Path]:
+    """
+    The files under `public_dir` worth compressing, in path order.
+    """
+    return sorted(
+        Path(root) / filename
+        for root, _, filenames in os.walk(public_dir)
+        for filename in filenames
+        if Path(filename).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+    )
+
+
+def stale_files(public_dir: Path) -> list[Path]:
+    """
+    The compressible files under `public_dir` with a compressed copy which is
+    missing or older than them.
+    """
+    return [
+        path
+        for path in compressible_files(public_dir)
+        if not all(
+            is_fresh(path, compressed_copy(path, encoding))
+            for encoding in ENCODINGS
+        )
+    ]
+
+
+def compress_file(path: Path, force: bool = False) -> list[CompressionResult]:
+    """
+    Write each compressed copy of `path` which isn't fresh.
+
+    Args:
+        path: The file to compress
+        force: Rewrite copies even if they are fresh
+
+    Returns:
+        A result for each copy written
+    """
+    results: list[CompressionResult] = []
+    data: bytes | None = None
+    for encoding, compress in ENCODINGS.items():
+        copy = compressed_copy(path, encoding)
+        if not force and is_fresh(path, copy):
+            continue
+        if data is None:
+            data = path.read_bytes()
+        start = time.perf_counter()
+        compressed = compress(data)
+        seconds = time.perf_counter() - start
+
+        # Write atomically, so that an interrupted run leaves no truncated
+        # copy which looks fresh
+        temp_path = copy.with_name(copy.name + ".tmp")
+        temp_path.write_bytes(compressed)
+        os.replace(temp_path, copy)
+        results.append(
+            CompressionResult(
+                path.suffix.lower(),
+                encoding,
+                len(data),
+                len(compressed),
+                seconds,
+            )
+        )
+    return results
+
+
+def precompress_site(
+    public_dir: Path, jobs: int = 1, force: bool = False
+) -> list[CompressionResult]:
+    """
+    Write the compressed copies of every compressible file under
+    `public_dir` which aren't fresh, across `jobs` worker processes.
+    """
+    paths = compressible_files(public_dir)
+    worker = functools.partial(compress_file, force=force)
+    if jobs <= 1:
+        return [result for path in paths for result in worker(path)]
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return [
+            result
+            for results in executor.map(worker, paths, chunksize=chunksize)
+            for result in results
+        ]
+
+
+def summary(results: Iterable[CompressionResult]) -> str:
+    """
+    Describe the compression ratio and throughput for each file type and
+    encoding. Throughput is per worker process.
+    """
+    by_kind: Dict[tuple[str, str], list[CompressionResult]] = defaultdict(list)
+    for result in results:
+        by_kind[(result.file_type, result.encoding)].append(result)
+    if not by_kind:
+        return "All compressed copies are fresh."
+
+    lines = ["Type   Encoding  Files  Original -> Compressed  Ratio  MiB/s"]
+    for (file_type, encoding), kind_results in sorted(by_kind.items()):
+        original = sum(result.original_bytes for result in kind_results)
+        compressed = sum(result.compressed_bytes for result in kind_results)
+        seconds = sum(result.seconds for result in kind_results)
+        throughput = original / 1024 / 1024 / seconds if seconds else 0.0
+        lines.append(
+            f"{file_type:<6} {encoding:<8} {len(kind_results):>6}  "
+            f"{page_weight.format_size(original):>8} -> "
+            f"{page_weight.format_size(compressed):>10}  "
+            f"{original / compressed:>5.2f}  {throughput:>5.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _parse_args(argv: Sequence[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Write Brotli and zstd copies of the built site's "
+        "compressible files."
+    )
+    parser.add_argument(
+        "--public-dir",
+        type=Path,
+        default=None,
+        help="The built site (default: public/ in the git root)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="How many files to compress at once (default: CPU count)",
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="Rewrite compressed copies even if they are fresh",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """
+    Precompress the built site and report how well each file type
+    compressed.
+    """
+    args = _parse_args(argv)
+    public_dir = args.public_dir or script_utils.get_git_root() / "public"
+    if not public_dir.is_dir():
+        raise FileNotFoundError(f"{public_dir} doesn't exist; build first")
+
+    start = time.perf_counter()
+    results = precompress_site(public_dir, args.jobs, args.force)
+    print(summary(results))
+    print(
+        f"Wrote {len(results)} compressed copies in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
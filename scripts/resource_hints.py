@@ -0,0 +1,176 @@
+"""
+Cross-reference the resource hints in each page's head, i.e. its `<link
+rel="preload|prefetch|preconnect">` tags, with the resources which pages
+actually use.
+
+`built_site_checks.py` gathers each page's hints and resources; this module
+finds hints which are wasted, and resources used across the site which
+would load sooner with a hint.
+"""
+
+import argparse
+import re
+from collections import Counter
+from typing import Dict, Iterable, NamedTuple, Sequence
+from urllib.parse import urljoin, urlparse
+
+HINT_RELS = ("preload", "prefetch", "preconnect")
+# Share of pages which must use a resource for it to be worth hinting
+HOT_RESOURCE_SHARE = 0.5
+# Origins which pages may preconnect to without visibly loading from them
+PRECONNECT_ALLOWLIST = frozenset(
+    {
+        # Serves the fonts which the Google Fonts stylesheet loads
+        "https://fonts.gstatic.com",
+    }
+)
+_FONT_FACE_PATTERN = re.compile(r"@font-face\s*\{([^}]*)\}", re.IGNORECASE)
+_CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+class ResourceHint(NamedTuple):
+    """
+    One `<link>` hint, e.g. `ResourceHint("preload", "/font.woff2")`.
+    """
+
+    rel: str
+    # Absolute URL, or path from the site root
+    url: str
+
+
+class PageResources(NamedTuple):
+    """
+    The hints in a page's head, and the resources which the page uses.
+    """
+
+    # Page path, relative to the site root
+    path: str
+    hints: tuple[ResourceHint, ...]
+    # Absolute URLs, or paths from the site root, of everything the page
+    # loads, including the fonts its stylesheets declare
+    used: frozenset[str]
+    # Fonts which the page's inlined critical CSS declares
+    critical_fonts: frozenset[str]
+
+
+def origin(url: str) -> str | None:
+    """
+    The scheme and host of a remote URL, or None for local paths.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return None
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def font_face_urls(css: str, base_url: str) -> frozenset[str]:
+    """
+    The fonts which the `@font-face` rules in `css` declare, resolved
+    against `base_url`, e.g. the path of the page or stylesheet.
+    """
+    return frozenset(
+        urljoin(base_url, match.group(2).strip())
+        for block in _FONT_FACE_PATTERN.finditer(css)
+        for match in _CSS_URL_PATTERN.finditer(block.group(1))
+        if not match.group(2).startswith("data:")
+    )
+
+
+def hints_from_links(
+    links: Iterable[Dict[str, str]], page_url: str
+) -> tuple[ResourceHint, ...]:
+    """
+    The hints among a page's `<link>` tags, with URLs resolved against
+    `page_url`.
+    """
+    return tuple(
+        ResourceHint(rel, urljoin(page_url, link["href"]))
+        for link in links
+        if link.get("href")
+        for rel in link.get("rel", "").lower().split()
+        if rel in HINT_RELS
+    )
+
+
+def _origins(urls: Iterable[str]) -> set[str]:
+    return {url_origin for url in urls if (url_origin := origin(url))}
+
+
+def wasted_hints(page: PageResources, site_used: frozenset[str]) -> list[str]:
+    """
+    Describe the hints of a page which nothing uses: preloads of resources
+    the page doesn't load, prefetches of resources no page loads, and
+    preconnects to origins the page loads nothing from.
+
+    Args:
+        page: The page's hints and resources
+        site_used: Everything which any page of the site loads
+    """
+    used_origins = _origins(page.used)
+    wasted = []
+    for hint in page.hints:
+        if hint.rel == "preconnect":
+            hint_origin = origin(hint.url) or hint.url
+            if (
+                hint_origin not in used_origins
+                and hint_origin not in PRECONNECT_ALLOWLIST
+            ):
+                wasted.append(
+                    f"preconnect {hint.url}: nothing on the page loads from "
+                    "there"
+                )
+        elif hint.rel == "preload" and hint.url not in page.used:
+            wasted.append(f"preload {hint.url}: the page doesn't use it")
+        elif hint.rel == "prefetch" and hint.url not in site_used:
+            wasted.append(f"prefetch {hint.url}: no page uses it")
+    return wasted
+
+
+def missing_hints(pages: Sequence[PageResources]) -> list[str]:
+    """
+    Describe resources used by at least `HOT_RESOURCE_SHARE` of pages, which
+    some of the pages using them don't hint: fonts in the critical CSS which
+    aren't preloaded, and remote origins which aren't preconnected to.
+    """
+    threshold = HOT_RESOURCE_SHARE * len(pages)
+    font_users: Counter[str] = Counter()
+    font_preloads: Counter[str] = Counter()
+    origin_users: Counter[str] = Counter()
+    origin_hints: Counter[str] = Counter()
+    for page in pages:
+        preloaded = {hint.url for hint in page.hints if hint.rel == "preload"}
+        font_users.update(page.critical_fonts)
+        font_preloads.update(page.critical_fonts & preloaded)
+
+        hinted_origins = _origins(hint.url for hint in page.hints)
+        used_origins = _origins(page.used)
+        origin_users.update(used_origins)
+        origin_hints.update(used_origins & hinted_origins)
+
+    missing = [
+        f"font {font}: in the critical CSS of {users} pages, preloaded by "
+        f"{font_preloads[font]}"
+        for font, users in sorted(font_users.items())
+        if users >= threshold and font_preloads[font] < users
+    ]
+    missing.extend(
+        f"origin {url_origin}: used by {users} pages, preconnected to by "
+        f"{origin_hints[url_origin]}"
+        for url_origin, users in sorted(origin_users.items())
+        if users >= threshold and origin_hints[url_origin] < users
+    )
+    return missing
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the `--resource-hints` option to a checker's argument parser.
+    """
+    parser.add_argument(
+        "--resource-hints",
+        action="store_true",
+        default=False,
+        help="Flag preload, prefetch and preconnect hints which nothing "
+        "uses, and fonts and origins used across the site which aren't "
+        "hinted",
+    )
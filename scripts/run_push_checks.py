@@ -523,11 +523,20 @@ def get_check_steps(
             ],
             shell=True,
         ),
+        CheckStep(
+            name="Precompressing the built site",
+            command=[
+                "python",
+                f"{git_root_path}/scripts/precompress.py",
+            ],
+        ),
         CheckStep(
             name="Checking HTML files",
             command=[
                 "python",
                 f"{git_root_path}/scripts/built_site_checks.py",
+                "--cache",
+                "--check-precompressed",
             ],
         ),
         # CheckStep(
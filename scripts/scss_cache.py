@@ -0,0 +1,141 @@
+"""
+Cache compiled SCSS by the contents of the stylesheet and everything it
+imports, so that checks of unchanged styles don't recompile them.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict
+
+from scripts import utils as script_utils
+
+# Bump when the way entries are keyed or stored changes
+SCSS_CACHE_FORMAT_VERSION = 1
+
+# skipcq: BAN-B108
+DEFAULT_SCSS_CACHE_DIR = (
+    Path(tempfile.gettempdir()) / "quartz_checks" / "compiled_scss"
+)
+
+_IMPORT_PATTERN = re.compile(r"""@(?:use|forward|import)\s+["']([^"']+)["']""")
+
+
+def _resolve_import(name: str, importer_dir: Path) -> Path | None:
+    """
+    The local file which `@use`, `@forward` or `@import` of `name` loads, or
+    None for built-in modules and files which don't exist (yet).
+    """
+    base = importer_dir / name
+    for candidate in (
+        base,
+        base.with_name(f"{base.name}.scss"),
+        base.with_name(f"_{base.name}"),
+        base.with_name(f"_{base.name}.scss"),
+    ):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def sources_hash(scss_file_path: Path) -> str:
+    """
+    Hash a stylesheet and every local file it imports, directly or not.
+    Creating, deleting or editing any of them changes the hash.
+    """
+    digest = hashlib.sha256(f"v{SCSS_CACHE_FORMAT_VERSION}".encode())
+    pending = [scss_file_path]
+    seen = {scss_file_path.resolve()}
+    while pending:
+        source = pending.pop(0)
+        contents = source.read_bytes()
+        relative_path = os.path.relpath(source, scss_file_path.parent)
+        digest.update(f"\0{relative_path}\0{len(contents)}\0".encode())
+        digest.update(contents)
+
+        for name in _IMPORT_PATTERN.findall(
+            contents.decode("utf-8", errors="replace")
+        ):
+            imported = _resolve_import(name, source.parent)
+            if imported is not None and imported.resolve() not in seen:
+                seen.add(imported.resolve())
+                pending.append(imported)
+    return digest.hexdigest()
+
+
+class ScssCache:
+    """
+    Compiled CSS, keyed by `sources_hash`. Entries are kept in memory, and,
+    given a `cache_dir`, in one file per hash there, so that runs can share
+    them without coordinating.
+    """
+
+    def __init__(
+        self, cache_dir: Path | None = DEFAULT_SCSS_CACHE_DIR
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._compiled: Dict[str, str] = {}
+
+    def get(
+        self, scss_file_path: Path, compile_scss: Callable[[Path], str]
+    ) -> str:
+        """
+        Get a stylesheet's CSS, calling `compile_scss` if no entry matches
+        its sources. Errors from `compile_scss` aren't cached.
+        """
+        key = sources_hash(scss_file_path)
+        if key in self._compiled:
+            self.hits += 1
+            return self._compiled[key]
+
+        entry_path = None
+        if self.cache_dir is not None:
+            entry_path = self.cache_dir / f"{key}.css"
+            try:
+                css = entry_path.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                pass
+            else:
+                self.hits += 1
+                self._compiled[key] = css
+                return css
+
+        self.misses += 1
+        css = compile_scss(scss_file_path)
+        self._compiled[key] = css
+        if entry_path is not None:
+            # Other runs may write the same entry at once
+            script_utils.write_text_atomically(entry_path, css)
+        return css
+
+    def stats(self) -> str:
+        """
+        Describe how often the cache avoided a compilation.
+        """
+        return f"Compiled SCSS cache: {self.hits} hits, {self.misses} misses"
+
+
+_SCSS_CACHE: Dict[str, ScssCache] = {}
+
+
+def get_scss_cache() -> ScssCache:
+    """
+    Get the cache of compiled SCSS shared by this process.
+    """
+    if "cache" not in _SCSS_CACHE:
+        _SCSS_CACHE["cache"] = ScssCache()
+    return _SCSS_CACHE["cache"]
+
+
+def set_scss_cache(cache: ScssCache | None) -> None:
+    """
+    Replace the shared cache, or reset it to the default if None.
+    """
+    if cache is None:
+        _SCSS_CACHE.pop("cache", None)
+    else:
+        _SCSS_CACHE["cache"] = cache
@@ -3,23 +3,46 @@ Check source files for issues, like invalid links, missing required fields,
 etc.
 """
 
+import argparse
+import os
 import re
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Literal, Set
-
-import requests  # type: ignore[import]
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Sequence,
+    Set,
+)
+
+import sass  # type: ignore[import]
 
 # Add the project root to sys.path
 # pylint: disable=wrong-import-position
 sys.path.append(str(Path(__file__).parent.parent))
 import scripts.utils as script_utils
+from scripts import check_profiler, markdown_segments, scss_cache, url_prober
 
 MetadataIssues = Dict[str, List[str]]
 PathMap = Dict[str, Path]  # Maps URLs to their source files
 
+parser = argparse.ArgumentParser(description="Check source files for issues.")
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    help="Number of worker processes for checking files (default: CPU count)",
+    default=os.cpu_count() or 1,
+)
+check_profiler.add_arguments(parser, "source_file_checks")
+
 
 def check_required_fields(metadata: dict) -> List[str]:
     """
@@ -49,37 +72,52 @@ def validate_video_tags(text: str) -> List[str]:
         List of error messages for invalid video tags
     """
     issues = []
+    line_index = script_utils.LineIndex(text)
     for match in re.finditer(r"<video[^>]*\s(src|type)\s*=", text):
         issues.append(
-            f"Video tag contains forbidden 'src' or 'type' attribute:"
-            f" {match.group()}"
+            f"Video tag at {line_index.location(match.start())} contains "
+            f"forbidden 'src' or 'type' attribute: {match.group()}"
         )
     return issues
 
 
 def check_url_uniqueness(
-    urls: Set[str], existing_urls: PathMap, source_path: Path
+    urls: Set[str], url_owners: PathMap, source_path: Path
 ) -> List[str]:
     """
-    Check if any URLs (permalinks/aliases) have already been used.
+    Check if any URLs (permalinks/aliases) are already used by an earlier
+    file.
 
     Args:
         urls: Set of URLs to check
-        existing_urls: Map of known URLs to their file paths
+        url_owners: Map of each URL to the first file which uses it, from
+            `collect_url_owners`
         source_path: Path to file being checked
 
     Returns:
         List of error messages for duplicate URLs
     """
     errors = []
-    for url in urls:
-        if url in existing_urls:
-            errors.append(f"URL '{url}' already used in: {existing_urls[url]}")
-        else:
-            existing_urls[url] = source_path
+    for url in sorted(urls):
+        owner = url_owners.get(url, source_path)
+        if owner != source_path:
+            errors.append(f"URL '{url}' already used in: {owner}")
     return errors
 
 
+def collect_url_owners(all_metadata: Iterable[tuple[Path, dict]]) -> PathMap:
+    """
+    Map each URL (permalink/alias) to the first file, in order, which uses
+    it. Files can then be checked for duplicate URLs in any order.
+    """
+    url_owners: PathMap = {}
+    for file_path, metadata in all_metadata:
+        if metadata:
+            for url in get_all_urls(metadata):
+                url_owners.setdefault(url, file_path)
+    return url_owners
+
+
 def get_all_urls(metadata: dict) -> Set[str]:
     """
     Extract all URLs (permalinks and aliases) from metadata.
@@ -122,15 +160,16 @@ def check_invalid_md_links(text: str, file_path: Path) -> List[str]:
     errors = []
 
     matches = re.finditer(invalid_md_link_pattern, text)
+    line_index = script_utils.LineIndex(text)
 
     for match in matches:
         if (
             "shard-theory" in match.group() and "design.md" in file_path.name
         ):  # pragma: no cover
             continue  # I mention this checker, not a real broken link
-        line_num = text[: match.start()].count("\n") + 1
         errors.append(
-            f"Invalid markdown link at line {line_num}: {match.group()}"
+            f"Invalid markdown link at {line_index.location(match.start())}: "
+            f"{match.group()}"
         )
 
     return errors
@@ -155,10 +194,12 @@ def check_latex_tags(text: str, file_path: Path) -> List[str]:
     errors = []
 
     matches = re.finditer(tag_pattern, text)
+    line_index = script_utils.LineIndex(text)
 
     for match in matches:
-        line_num = text[: match.start()].count("\n") + 1
-        errors.append(f"LaTeX \\tag{{}} found at line {line_num}")
+        errors.append(
+            f"LaTeX \\tag{{}} found at {line_index.location(match.start())}"
+        )
 
     return errors
 
@@ -284,16 +325,15 @@ def check_card_image(metadata: dict) -> List[str]:
         )
         return errors
 
-    try:
-        response = requests.head(card_image_url, timeout=10)
-        if not response.ok:
-            errors.append(
-                f"Card image URL '{card_image_url}' returned "
-                f"status {response.status_code}"
-            )
-    except requests.RequestException as e:
+    result = url_prober.get_default_prober().probe(card_image_url)
+    if result.error is not None:
+        errors.append(
+            f"Failed to load card image URL '{card_image_url}': {result.error}"
+        )
+    elif not result.ok:
         errors.append(
-            f"Failed to load card image URL '{card_image_url}': {str(e)}"
+            f"Card image URL '{card_image_url}' returned "
+            f"status {result.status_code}"
         )
 
     return errors
@@ -309,14 +349,20 @@ def check_table_alignments(text: str) -> List[str]:
     Invalid: ---, ----
     """
     errors = []
-
-    column_pattern = r"\|\s*-+\s*\|"
-    for line_num, line in enumerate(text.split("\n"), 1):
-        if re.search(column_pattern, line):
-            errors.append(
-                f"Table column at line {line_num} missing alignment "
-                f"(should be :---, ---:, or :---:)"
-            )
+    line_index = script_utils.LineIndex(text)
+    reported_lines = set()
+
+    # Whitespace within the line, like `\s` when searching line by line
+    column_pattern = r"\|[^\S\n]*-+[^\S\n]*\|"
+    for match in re.finditer(column_pattern, text):
+        line_num, _ = line_index.line_col(match.start())
+        if line_num in reported_lines:
+            continue
+        reported_lines.add(line_num)
+        errors.append(
+            f"Table column at {line_index.location(match.start())} missing "
+            "alignment (should be :---, ---:, or :---:)"
+        )
 
     return errors
 
@@ -336,24 +382,9 @@ def remove_code_and_math(text: str, mark_boundaries: bool = False) -> str:
     Returns:
         Text with all code blocks, inline code, and math elements removed
     """
-    # Private use area character
-    math_code_replacement_char = _REPLACEMENT_CHAR if mark_boundaries else ""
-
-    # Remove all code blocks
-    text = re.sub(
-        r"```.*?```", math_code_replacement_char, text, flags=re.DOTALL
+    return markdown_segments.strip_code_and_math(
+        text, _REPLACEMENT_CHAR if mark_boundaries else ""
     )
-    text = re.sub(r"(?<!\\)`[^`]*(?<!\\)`", math_code_replacement_char, text)
-
-    # Remove all math blocks
-    text = re.sub(
-        r"\$\$.*?\$\$", math_code_replacement_char, text, flags=re.DOTALL
-    )
-    text = re.sub(
-        r"(?<!\\)\$[^$]*?(?<!\\)\$", math_code_replacement_char, text
-    )
-
-    return text
 
 
 # Either preceded by two backslashes or none, and then a brace.
@@ -362,6 +393,17 @@ _BRACE_REGEX = r"(^|(?<=\\\\)|(?<=[^\\]))[{}]"
 _END_OF_LINE_BRACES_REGEX = r"{[^$`\\]*}\s*$"
 
 
+def _prose_matches(pattern: str, text: str) -> Iterator[re.Match[str]]:
+    """
+    Match `pattern` within each prose segment of `text`, i.e. outside code
+    and math, with offsets into `text`.
+    """
+    compiled = re.compile(pattern, re.MULTILINE)
+    for segment in markdown_segments.segment_markdown(text):
+        if segment.kind == "prose":
+            yield from compiled.finditer(text, segment.start, segment.end)
+
+
 def check_unescaped_braces(text: str) -> List[str]:
     """
     Check for unescaped braces in markdown files that aren't at beginning/end
@@ -373,24 +415,35 @@ def check_unescaped_braces(text: str) -> List[str]:
     Returns:
         List of error messages for unescaped braces found
     """
-    content_no_eol_braces = re.sub(
-        _END_OF_LINE_BRACES_REGEX,
-        "",
-        text,
-        flags=re.MULTILINE,
-    )
-    stripped_content = remove_code_and_math(content_no_eol_braces)
+    # Neither kind of match can span code or math, which starts with a
+    # backtick or dollar sign, so both come out in order
+    end_of_line_groups = [
+        match.span()
+        for match in re.finditer(
+            _END_OF_LINE_BRACES_REGEX, text, flags=re.MULTILINE
+        )
+    ]
+    line_index = script_utils.LineIndex(text)
 
     errors = []
-    for match in re.finditer(_BRACE_REGEX, stripped_content, re.MULTILINE):
-        # Get the line containing the match
-        line_start = stripped_content.rfind("\n", 0, match.start()) + 1
-        line_end = stripped_content.find("\n", match.start())
-        if line_end == -1:  # Handle last line
-            line_end = len(stripped_content)
-        line = stripped_content[line_start:line_end]
+    group = 0
+    for match in _prose_matches(_BRACE_REGEX, text):
+        brace = match.start()
+        while (
+            group < len(end_of_line_groups)
+            and end_of_line_groups[group][1] <= brace
+        ):
+            group += 1
+        if (
+            group < len(end_of_line_groups)
+            and end_of_line_groups[group][0] <= brace
+        ):
+            continue
 
-        errors.append(f"Unescaped brace found in: {line.strip()}")
+        errors.append(
+            f"Unescaped brace at {line_index.location(brace)}: "
+            f"{line_index.line(brace).strip()}"
+        )
 
     return errors
 
@@ -403,16 +456,19 @@ def check_no_forbidden_patterns(text: str) -> List[str]:
     Check for forbidden patterns in text.
     """
     errors = []
-    no_code_math_text = remove_code_and_math(text, mark_boundaries=True)
+    line_index = script_utils.LineIndex(text)
     for pattern in _FORBIDDEN_PATTERNS:
-        for match in re.finditer(pattern, no_code_math_text):
-            errors.append(f"Forbidden pattern found: {match.group()}")
+        for match in _prose_matches(pattern, text):
+            errors.append(
+                f"Forbidden pattern found at "
+                f"{line_index.location(match.start())}: {match.group()}"
+            )
     return errors
 
 
 def check_file_data(
     metadata: dict,
-    existing_urls: PathMap,
+    url_owners: PathMap,
     file_path: Path,
     all_posts_metadata: Dict[str, dict],
 ) -> MetadataIssues:
@@ -421,34 +477,56 @@ def check_file_data(
 
     Args:
         metadata: The file's frontmatter metadata
-        existing_urls: Map of known URLs to their file paths
+        url_owners: Map of each URL to the first file which uses it
         file_path: Path to the file being checked
         all_posts_metadata: Map of file paths to their metadata for all posts
 
     Returns:
         Dictionary mapping check names to lists of error messages
     """
+    time_check = check_profiler.timer(file_path)
     text = file_path.read_text()
     issues: MetadataIssues = {
-        "required_fields": check_required_fields(metadata),
-        "invalid_links": check_invalid_md_links(text, file_path),
-        "latex_tags": check_latex_tags(text, file_path),
-        "table_alignments": check_table_alignments(text),
-        "unescaped_braces": check_unescaped_braces(text),
-        "video_tags": validate_video_tags(text),
-        "forbidden_patterns": check_no_forbidden_patterns(text),
+        "required_fields": time_check(
+            "required_fields", check_required_fields, metadata
+        ),
+        "invalid_links": time_check(
+            "invalid_links", check_invalid_md_links, text, file_path
+        ),
+        "latex_tags": time_check(
+            "latex_tags", check_latex_tags, text, file_path
+        ),
+        "table_alignments": time_check(
+            "table_alignments", check_table_alignments, text
+        ),
+        "unescaped_braces": time_check(
+            "unescaped_braces", check_unescaped_braces, text
+        ),
+        "video_tags": time_check("video_tags", validate_video_tags, text),
+        "forbidden_patterns": time_check(
+            "forbidden_patterns", check_no_forbidden_patterns, text
+        ),
     }
 
     if metadata:
         urls = get_all_urls(metadata)
         if urls:
-            issues["duplicate_urls"] = check_url_uniqueness(
-                urls, existing_urls, file_path
+            issues["duplicate_urls"] = time_check(
+                "duplicate_urls",
+                check_url_uniqueness,
+                urls,
+                url_owners,
+                file_path,
             )
-        issues["post_slug_relationships"] = check_sequence_relationships(
-            metadata.get("permalink", ""), all_posts_metadata
+        issues["post_slug_relationships"] = time_check(
+            "post_slug_relationships",
+            check_sequence_relationships,
+            metadata.get("permalink", ""),
+            all_posts_metadata,
+        )
+        issues["card_image"] = time_check(
+            "card_image", check_card_image, metadata
         )
-        issues["card_image"] = check_card_image(metadata)
 
     return issues
 
@@ -466,13 +544,29 @@ def print_issues(file_path: Path, issues: MetadataIssues) -> None:
                     print(f"    - {error}")
 
 
-def compile_scss(scss_file_path: Path) -> str:
+# libsass doesn't support `@use`, but `@use "x" as *` makes x's members
+# available just as `@import "x"` does
+_USE_AS_STAR_PATTERN = re.compile(r"""@use\s+(["'][^"']+["'])\s+as\s+\*\s*;""")
+
+
+def _compile_scss_in_process(scss_file_path: Path) -> str:
     """
-    Compile SCSS file to CSS string.
+    Compile SCSS with libsass, without starting a process.
     """
-    if not scss_file_path.exists():
-        return ""
+    source = _USE_AS_STAR_PATTERN.sub(
+        r"@import \1;", scss_file_path.read_text(encoding="utf-8")
+    )
+    return sass.compile(
+        string=source,
+        include_paths=[str(scss_file_path.parent)],
+        output_style="expanded",
+    )
+
 
+def _compile_scss_with_binary(scss_file_path: Path) -> str:
+    """
+    Compile SCSS with the `sass` binary.
+    """
     styles_dir = scss_file_path.parent
     sass_path = Path(str(shutil.which("sass")))
 
@@ -485,6 +579,27 @@ def compile_scss(scss_file_path: Path) -> str:
     return result.stdout
 
 
+def _compile_scss_uncached(scss_file_path: Path) -> str:
+    try:
+        return _compile_scss_in_process(scss_file_path)
+    except sass.CompileError:
+        # e.g. Sass features which libsass lacks, so let the binary decide
+        return _compile_scss_with_binary(scss_file_path)
+
+
+def compile_scss(scss_file_path: Path) -> str:
+    """
+    Compile SCSS file to CSS string, reusing the last compilation if neither
+    the file nor anything it imports changed.
+    """
+    if not scss_file_path.exists():
+        return ""
+
+    return scss_cache.get_scss_cache().get(
+        scss_file_path, _compile_scss_uncached
+    )
+
+
 def check_font_files(css_content: str, base_dir: Path) -> List[str]:
     """
     Check if font files referenced in CSS exist.
@@ -604,13 +719,15 @@ def check_scss_font_files(scss_file_path: Path, base_dir: Path) -> List[str]:
     return missing_files + undeclared_families
 
 
-def build_sequence_data(markdown_files: List[Path]) -> Dict[str, dict]:
+def sequence_data_from_metadata(
+    all_metadata: Iterable[dict],
+) -> Dict[str, dict]:
     """
-    Build a mapping of post slugs to their forward and previous post slugs.
+    Build a mapping of post slugs to their forward and previous post slugs,
+    from the metadata of every post.
     """
     all_sequence_data: Dict[str, dict] = {}
-    for file_path in markdown_files:
-        metadata, _ = script_utils.split_yaml(file_path)
+    for metadata in all_metadata:
         if metadata:
             # Build a mapping with only the forward and previous post slugs
             slug_mapping: Dict[str, str] = {}
@@ -634,13 +751,118 @@ def build_sequence_data(markdown_files: List[Path]) -> Dict[str, dict]:
     return all_sequence_data
 
 
-def main() -> None:
+def build_sequence_data(markdown_files: List[Path]) -> Dict[str, dict]:
+    """
+    Build a mapping of post slugs to their forward and previous post slugs.
+    """
+    index = script_utils.get_frontmatter_index()
+    return sequence_data_from_metadata(
+        index.get(file_path) for file_path in markdown_files
+    )
+
+
+# Site-wide data which `_init_worker` ships to each worker process once,
+# rather than with every file
+_WORKER_SITE_DATA: Dict[str, Dict[str, Any]] = {
+    "url_owners": {},
+    "sequence_data": {},
+}
+
+
+def _init_worker(
+    url_owners: PathMap,
+    sequence_data: Dict[str, dict],
+    probe_results: Dict[str, url_prober.ProbeResult],
+    profile: bool = False,
+) -> None:
+    """
+    Store site-wide data in a newly started worker process.
+    """
+    _WORKER_SITE_DATA["url_owners"] = url_owners
+    _WORKER_SITE_DATA["sequence_data"] = sequence_data
+    url_prober.get_default_prober().seed(probe_results)
+    if profile:
+        check_profiler.set_active_profiler(check_profiler.CheckProfiler())
+
+
+def _check_file_in_worker(
+    source: tuple[Path, dict],
+) -> tuple[MetadataIssues, list[check_profiler.Span]]:
+    """
+    Check a single file inside a worker process.
+
+    Returns:
+        The file's issues, and the spans recorded while checking it if
+        profiling
+    """
+    file_path, metadata = source
+    issues = check_file_data(
+        metadata,
+        _WORKER_SITE_DATA["url_owners"],
+        file_path,
+        _WORKER_SITE_DATA["sequence_data"],
+    )
+    profiler = check_profiler.get_active_profiler()
+    spans = profiler.drain() if profiler is not None else []
+    return issues, spans
+
+
+def check_files(
+    all_metadata: Sequence[tuple[Path, dict]],
+    sequence_data: Dict[str, dict],
+    jobs: int,
+) -> Iterator[tuple[Path, MetadataIssues]]:
+    """
+    Check each file which has metadata, fanning out to a process pool when
+    `jobs > 1`.
+
+    Duplicate URLs are attributed to the first file in `all_metadata` which
+    uses them, and results are yielded in the same order as `all_metadata`,
+    so the output doesn't depend on which worker finishes first. Spans
+    recorded by workers are added to this process's active profiler.
+    """
+    url_owners = collect_url_owners(all_metadata)
+    sources = [
+        (file_path, metadata)
+        for file_path, metadata in all_metadata
+        if metadata
+    ]
+    if jobs <= 1 or len(sources) <= 1:
+        for file_path, metadata in sources:
+            yield file_path, check_file_data(
+                metadata, url_owners, file_path, sequence_data
+            )
+        return
+
+    chunksize = max(1, len(sources) // (jobs * 4))
+    profiler = check_profiler.get_active_profiler()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            url_owners,
+            sequence_data,
+            url_prober.get_default_prober().results,
+            profiler is not None,
+        ),
+    ) as executor:
+        for (file_path, _), (issues, spans) in zip(
+            sources,
+            executor.map(_check_file_in_worker, sources, chunksize=chunksize),
+        ):
+            if profiler is not None:
+                profiler.extend(spans)
+            yield file_path, issues
+
+
+def main(argv: Sequence[str] = ()) -> None:
     """
     Check source files for issues.
     """
+    args = parser.parse_args(argv)
+    profiler = check_profiler.start(args)
     git_root = script_utils.get_git_root()
     content_dir = git_root / "content"
-    existing_urls: PathMap = {}
     has_errors = False
 
     # Check markdown files
@@ -651,21 +873,39 @@ def main() -> None:
         ignore_dirs=["templates", "drafts"],
     )
 
+    all_metadata = [
+        (
+            file_path,
+            check_profiler.timer(file_path)(
+                "read_frontmatter",
+                script_utils.get_frontmatter_index().get,
+                file_path,
+            ),
+        )
+        for file_path in markdown_files
+    ]
+    # Probe every card image at once rather than one file at a time
+    prober = url_prober.get_default_prober()
+    prober.probe_all(
+        metadata["card_image"]
+        for _, metadata in all_metadata
+        if metadata
+        and str(metadata.get("card_image", "")).startswith(
+            ("http://", "https://")
+        )
+    )
+
     # mapping from permalink or alias to its forward and prev post slugs
-    all_sequence_data: Dict[str, dict] = build_sequence_data(
-        list(markdown_files)
+    all_sequence_data = sequence_data_from_metadata(
+        metadata for _, metadata in all_metadata
     )
 
-    for file_path in markdown_files:
-        metadata, _ = script_utils.split_yaml(file_path)
-        if metadata:
-            rel_path = file_path.relative_to(git_root)
-            issues = check_file_data(
-                metadata, existing_urls, file_path, all_sequence_data
-            )
-            if any(lst for lst in issues.values()):
-                has_errors = True
-                print_issues(rel_path, issues)
+    for file_path, issues in check_files(
+        all_metadata, all_sequence_data, args.jobs
+    ):
+        if any(lst for lst in issues.values()):
+            has_errors = True
+            print_issues(file_path.relative_to(git_root), issues)
 
     # Check font files
     fonts_scss_path = git_root / "quartz" / "styles" / "fonts.scss"
@@ -675,9 +915,12 @@ def main() -> None:
         for font in missing_fonts:
             print(f"  - {font}")
 
+    prober.save()
+    script_utils.get_frontmatter_index().save()
+    check_profiler.report(profiler, args, "source_file_checks")
     if has_errors:
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
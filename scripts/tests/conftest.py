@@ -3,6 +3,9 @@ from pathlib import Path
 
 import pytest
 
+from .. import check_profiler, scss_cache, url_prober
+from .. import utils as script_utils
+
 
 @pytest.fixture()
 def temp_dir():
@@ -11,3 +14,45 @@ def temp_dir():
     """
     with tempfile.TemporaryDirectory() as dir_path:
         yield Path(dir_path)
+
+
+@pytest.fixture(autouse=True)
+def isolated_url_prober():
+    """
+    Give each test its own URL prober which doesn't persist results, so that
+    probes can't leak between tests or runs.
+    """
+    url_prober.set_default_prober(url_prober.UrlProber(cache_path=None))
+    yield
+    url_prober.set_default_prober(None)
+
+
+@pytest.fixture(autouse=True)
+def no_active_profiler():
+    """
+    Stop any profiling started by a test, e.g. through `--profile`.
+    """
+    yield
+    check_profiler.set_active_profiler(None)
+
+
+@pytest.fixture(autouse=True)
+def isolated_frontmatter_index():
+    """
+    Give each test an empty frontmatter index which isn't persisted.
+    """
+    script_utils.set_frontmatter_index(
+        script_utils.FrontmatterIndex(cache_path=None)
+    )
+    yield
+    script_utils.set_frontmatter_index(None)
+
+
+@pytest.fixture(autouse=True)
+def isolated_scss_cache():
+    """
+    Give each test an empty cache of compiled SCSS which isn't persisted.
+    """
+    scss_cache.set_scss_cache(scss_cache.ScssCache(cache_dir=None))
+    yield
+    scss_cache.set_scss_cache(None)
@@ -0,0 +1,321 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from .. import benchmark_checks, built_site_checks
+from .. import utils as script_utils
+
+_SMALL_SITE = benchmark_checks.SiteConfig(
+    pages=3, links_per_page=2, paragraphs_per_page=3, assets=20
+)
+
+
+@pytest.fixture
+def small_site(tmp_path: Path) -> Path:
+    site_root = tmp_path / "site"
+    benchmark_checks.generate_site(site_root, _SMALL_SITE)
+    return site_root
+
+
+def test_generate_site_is_clean(small_site: Path):
+    """
+    The synthetic site should pass every check, so that benchmarks time the
+    common path rather than error reporting.
+    """
+    public_dir = small_site / "public"
+    md_map = script_utils.build_html_to_md_map(small_site / "content")
+    pages = built_site_checks.collect_pages_to_check(public_dir, md_map, set())
+
+    results = list(
+        built_site_checks.check_pages(
+            pages,
+            public_dir,
+            should_check_fonts=False,
+            jobs=1,
+            site_index=built_site_checks.build_site_index(public_dir),
+        )
+    )
+
+    assert len(results) == _SMALL_SITE.pages
+    for page, issues in results:
+        assert not any(issues.values()), (page, issues)
+    assert (small_site / ".git").is_dir()
+    assert (
+        len(
+            script_utils.get_files(small_site / "quartz" / "static", (".png",))
+        )
+        == 18
+    )
+
+
+def test_generate_site_is_deterministic(tmp_path: Path):
+    for name in ("first", "second"):
+        benchmark_checks.generate_site(tmp_path / name, _SMALL_SITE)
+
+    for html_path in (tmp_path / "first" / "public").iterdir():
+        assert (
+            html_path.read_bytes()
+            == (tmp_path / "second" / "public" / html_path.name).read_bytes()
+        )
+
+
+def test_time_call_takes_fastest_run(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+    # Runs take 0.03s, 0.01s and 0.02s
+    clock = iter([0.0, 0.03, 1.0, 1.01, 2.0, 2.02])
+    monkeypatch.setattr(benchmark_checks.time, "perf_counter", clock.__next__)
+
+    best = benchmark_checks.time_call(lambda: calls.append(None), repeat=3)
+
+    assert len(calls) == 3
+    assert best == pytest.approx(0.01)
+
+
+def test_time_checks_gives_each_pass_fresh_documents():
+    soup = BeautifulSoup("<p>Text <code>code</code></p>", "html.parser")
+    codes_seen = []
+
+    def check_a_strips_code(soup: BeautifulSoup) -> None:
+        codes_seen.append(len(soup.find_all("code")))
+        for code in soup.find_all("code"):
+            code.decompose()
+
+    def check_b_reads_code(soup: BeautifulSoup) -> None:
+        codes_seen.append(len(soup.find_all("code")))
+
+    timings = benchmark_checks._time_checks(
+        {"a": check_a_strips_code, "b": check_b_reads_code},
+        [{"soup": soup}],
+        "prefix",
+        repeat=2,
+    )
+
+    assert set(timings) == {"prefix.a", "prefix.b"}
+    assert codes_seen == [1, 1, 1, 1]
+    assert soup.code is not None
+
+
+def test_run_benchmarks_times_every_check(
+    small_site: Path, monkeypatch: pytest.MonkeyPatch
+):
+    scripts_run = []
+
+    def _fake_time_script_main(script: str, site_root: Path) -> float:
+        scripts_run.append((script, site_root))
+        return 1.0
+
+    monkeypatch.setattr(
+        benchmark_checks, "time_script_main", _fake_time_script_main
+    )
+
+    timings = benchmark_checks.run_benchmarks(small_site, repeat=1)
+
+    assert scripts_run == [
+        ("built_site_checks.py", small_site),
+        ("source_file_checks.py", small_site),
+    ]
+    for name in (
+        "built_site_checks.check_invalid_anchors",
+        "built_site_checks.check_file_for_issues",
+        "built_site_checks.check_css_issues",
+        "built_site_checks.parse_html_file",
+        "built_site_checks.scan_head",
+        "built_site_checks.check_critical_css",
+        "source_file_checks.check_file_data",
+        "source_file_checks.check_table_alignments",
+        "source_file_checks.split_yaml",
+        "source_file_checks.read_frontmatter",
+        "utils.get_files",
+        "utils.FrontmatterIndex.cold",
+        "utils.FrontmatterIndex.warm",
+        "source_file_checks.check_scss_font_files.cold",
+        "source_file_checks.check_scss_font_files.warm",
+    ):
+        assert timings[name] >= 0
+    assert "built_site_checks.check_pages" not in timings
+    assert timings["built_site_checks.main"] == 1.0
+
+
+def test_time_script_main_runs_in_site(small_site: Path):
+    marker = small_site / "ran.txt"
+    script = small_site / "touch.py"
+    script.write_text(
+        "import tempfile\nfrom pathlib import Path\n"
+        "Path('ran.txt').write_text(tempfile.gettempdir())\n"
+        "raise SystemExit(1)\n"
+    )
+
+    seconds = benchmark_checks.time_script_main(str(script), small_site)
+
+    assert seconds > 0
+    # Caches go in the site rather than the real temporary directory
+    assert marker.read_text() == str(small_site / "tmp")
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "raise SystemExit(2)\n",
+        "raise ValueError('broken')\n",
+    ],
+)
+def test_time_script_main_fails_on_crash(small_site: Path, source: str):
+    script = small_site / "crash.py"
+    script.write_text(source)
+
+    with pytest.raises(RuntimeError, match="crash.py exited with status"):
+        benchmark_checks.time_script_main(str(script), small_site)
+
+
+@pytest.mark.parametrize(
+    "baseline,current,expected",
+    [
+        ({"a": 1.0}, {"a": 1.1}, []),
+        ({"a": 1.0}, {"a": 1.5}, ["a: 1.0000s -> 1.5000s (+50%)"]),
+        # Too fast to measure reliably
+        ({"a": 0.001}, {"a": 0.004}, []),
+        # Not in the baseline
+        ({}, {"a": 5.0}, []),
+        ({"a": 2.0, "b": 1.0}, {"a": 1.0, "b": 1.0}, []),
+    ],
+)
+def test_compare_timings(
+    baseline: dict[str, float], current: dict[str, float], expected: list
+):
+    assert (
+        benchmark_checks.compare_timings(baseline, current, threshold=0.2)
+        == expected
+    )
+
+
+@pytest.fixture
+def fake_benchmarks(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    site_roots: list[Path] = []
+
+    def _fake_run_benchmarks(site_root: Path, repeat: int) -> dict:
+        site_roots.append(site_root)
+        return {"built_site_checks.main": 1.0}
+
+    monkeypatch.setattr(
+        benchmark_checks, "run_benchmarks", _fake_run_benchmarks
+    )
+    return site_roots
+
+
+def test_main_writes_results(
+    tmp_path: Path, fake_benchmarks: list[Path], capsys
+):
+    output = tmp_path / "results.json"
+
+    benchmark_checks.main(
+        ["--pages", "2", "--repeat", "1", "--output", str(output)]
+    )
+
+    results = json.loads(output.read_text())
+    assert results["config"]["pages"] == 2
+    assert results["timings"] == {"built_site_checks.main": 1.0}
+    assert "Wrote 1 timings" in capsys.readouterr().out
+    # The temporary site is cleaned up
+    assert not fake_benchmarks[0].exists()
+
+
+def test_main_keeps_site_dir(tmp_path: Path, fake_benchmarks: list[Path]):
+    site_dir = tmp_path / "kept"
+
+    benchmark_checks.main(
+        [
+            "--pages",
+            "2",
+            "--output",
+            str(tmp_path / "results.json"),
+            "--site-dir",
+            str(site_dir),
+        ]
+    )
+
+    assert fake_benchmarks == [site_dir]
+    assert len(list((site_dir / "public").glob("*.html"))) == 2
+
+
+def _write_baseline(path: Path, pages: int, seconds: float) -> None:
+    config = benchmark_checks.SiteConfig(pages=pages)._asdict()
+    path.write_text(
+        json.dumps(
+            {"config": config, "timings": {"built_site_checks.main": seconds}}
+        )
+    )
+
+
+def test_main_passes_within_threshold(
+    tmp_path: Path, fake_benchmarks: list[Path], capsys
+):
+    baseline = tmp_path / "baseline.json"
+    _write_baseline(baseline, pages=3, seconds=0.95)
+
+    benchmark_checks.main(
+        [
+            "--pages",
+            "2",
+            "--output",
+            str(tmp_path / "results.json"),
+            "--baseline",
+            str(baseline),
+        ]
+    )
+
+    assert "differently shaped site" in capsys.readouterr().out
+
+
+def test_main_fails_on_regression(
+    tmp_path: Path, fake_benchmarks: list[Path], capsys
+):
+    baseline = tmp_path / "baseline.json"
+    _write_baseline(baseline, pages=2, seconds=0.5)
+
+    with pytest.raises(SystemExit, match="1"):
+        benchmark_checks.main(
+            [
+                "--pages",
+                "2",
+                "--output",
+                str(tmp_path / "results.json"),
+                "--baseline",
+                str(baseline),
+                "--threshold",
+                "0.5",
+            ]
+        )
+
+    output = capsys.readouterr().out
+    assert "differently shaped site" not in output
+    assert "built_site_checks.main: 0.5000s -> 1.0000s (+100%)" in output
+
+
+def test_script_runs_end_to_end(tmp_path: Path):
+    output = tmp_path / "results.json"
+    subprocess.run(
+        [
+            sys.executable,
+            str(Path(benchmark_checks.__file__)),
+            "--pages",
+            "2",
+            "--links-per-page",
+            "1",
+            "--paragraphs-per-page",
+            "1",
+            "--repeat",
+            "1",
+            "--output",
+            str(output),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    timings = json.loads(output.read_text())["timings"]
+    assert timings["built_site_checks.main"] > 0
+    assert timings["source_file_checks.main"] > 0
@@ -1,6 +1,12 @@
+import inspect
+import json
+import os
+import re
 import subprocess
 import sys
+import time
 from collections import Counter
+from html import escape
 from pathlib import Path
 from typing import TYPE_CHECKING
 from unittest.mock import patch
@@ -9,6 +15,14 @@ import pytest
 import requests  # type: ignore[import]
 from bs4 import BeautifulSoup
 
+from .. import (
+    check_profiler,
+    inline_payloads,
+    page_weight,
+    precompress,
+    resource_hints,
+    url_prober,
+)
 from .. import utils as script_utils
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -406,6 +420,270 @@ def test_check_invalid_anchors_external_page(
     assert sorted(result) == sorted(expected_invalid_anchors)
 
 
+@pytest.mark.parametrize(
+    "href,expected_invalid",
+    [
+        ("/target#valid-anchor", False),
+        ("/target.html#missing-anchor", True),
+        ("./sub/../target#valid-anchor", False),
+        ("/missing#valid-anchor", True),
+        ("/#valid-anchor", True),
+        ("/sub/../../target#valid-anchor", True),
+    ],
+)
+def test_check_invalid_anchors_uses_index(
+    temp_site_root: Path, href: str, expected_invalid: bool
+):
+    """With an index, target pages are never read from disk."""
+    soup = BeautifulSoup(f'<a href="{href}">Link</a>', "html.parser")
+    anchor_index = {"target.html": frozenset({"valid-anchor"})}
+
+    with patch.object(
+        built_site_checks,
+        "collect_page_ids",
+        side_effect=AssertionError("Should not read pages"),
+    ):
+        result = built_site_checks.check_invalid_anchors(
+            soup, temp_site_root, anchor_index
+        )
+
+    assert result == ([f"Invalid anchor: {href}"] if expected_invalid else [])
+
+
+def test_build_site_index(temp_site_root: Path):
+    (temp_site_root / "index.html").write_text(
+        '<html><body><h1 id="top">T</h1><a id="a&amp;b"></a>'
+        '<img id="self-closing"/><p id>empty</p>'
+        '<a href="/posts/post#section">in</a><a href="./about#me">about</a>'
+        '<a href="#top">self</a><a href="/#top">root</a>'
+        '<a href="https://example.com/x#y">external</a><a href>none</a>'
+        '<link href="/index.css#x"><link rel="stylesheet" href="/index.css">'
+        '<script src="https://cdn.example.com/a.js"></script><script></script>'
+        '<img src="cat.png"><svg></svg>'
+        '<iframe src="//embed.example.com/v"></iframe>'
+        '<iframe src="https://example.com/e"></iframe>'
+        '<iframe src="/local"></iframe><iframe></iframe></body></html>'
+    )
+    (temp_site_root / "posts").mkdir()
+    (temp_site_root / "posts" / "post.html").write_text(
+        '<div id="section"></div>'
+    )
+    (temp_site_root / "index.css").write_text("#top { color: red; }")
+
+    assert built_site_checks.build_site_index(
+        temp_site_root, collect_payloads=True
+    ) == built_site_checks.SiteIndex(
+        anchor_index={
+            "index.html": frozenset({"top", "a&b", "self-closing"}),
+            "posts/post.html": frozenset({"section"}),
+        },
+        anchor_links={
+            "index.html": frozenset({"posts/post.html", "about.html"}),
+            "posts/post.html": frozenset(),
+        },
+        iframe_sources={
+            "index.html": frozenset(
+                {"https://embed.example.com/v", "https://example.com/e"}
+            ),
+            "posts/post.html": frozenset(),
+        },
+        manifest=built_site_checks.SiteManifest(
+            str(temp_site_root),
+            frozenset({"index.html", "posts/post.html", "index.css"}),
+        ),
+        resources={
+            "index.html": (
+                ("css", "/index.css"),
+                ("js", "https://cdn.example.com/a.js"),
+                ("media", "cat.png"),
+            ),
+            "posts/post.html": (),
+        },
+        inline_payloads=_payload_index(
+            (
+                "index.html",
+                [("script", "<script></script>"), ("svg", "<svg></svg>")],
+            )
+        ),
+        hints={"index.html": (), "posts/post.html": ()},
+        critical_fonts={
+            "index.html": frozenset(),
+            "posts/post.html": frozenset(),
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "html,expected",
+    [
+        (
+            '<video><source src="a.mp4"><source src="a.webm"></video>'
+            '<video><source src="b.mp4"></video>',
+            (("media", "a.mp4"), ("media", "b.mp4")),
+        ),
+        (
+            '<video src="a.mp4"><source src="a.webm"></video>',
+            (("media", "a.mp4"),),
+        ),
+        (
+            '<video><source srcset="a.avif"><source src="a.mp4">'
+            '<source src="a.webm"></video>',
+            (("media", "a.mp4"),),
+        ),
+        # Sources outside a video aren't alternatives to each other
+        (
+            '<source src="a.mp4"><source src="a.webm">',
+            (("media", "a.mp4"), ("media", "a.webm")),
+        ),
+    ],
+)
+def test_build_site_index_counts_one_source_per_video(
+    temp_site_root: Path, html: str, expected: tuple
+):
+    (temp_site_root / "index.html").write_text(html)
+
+    resources = built_site_checks.build_site_index(temp_site_root).resources
+
+    assert resources["index.html"] == expected
+
+
+def _payload_index(*pages: tuple[str, list[tuple[str, str]]]):
+    index: inline_payloads.PayloadIndex = {}
+    for page, payloads in pages:
+        inline_payloads.add_page(index, page, payloads)
+    return index
+
+
+def test_build_site_index_counts_inline_payloads(temp_site_root: Path):
+    icon = (
+        '<svg class="icon"><svg><style>a{}</style></svg><path d="M0"/></svg>'
+    )
+    (temp_site_root / "a.html").write_text(
+        f"<head><style>p {{ margin: 0; }}</style></head><body>{icon}"
+        '<script>init()</script><script src="/a.js"></script></body>'
+    )
+    (temp_site_root / "b.html").write_text(
+        f"<body>{icon}{icon}<script>init()</script><style>unclosed"
+    )
+
+    site_index = built_site_checks.build_site_index(
+        temp_site_root, collect_payloads=True
+    )
+
+    icon_markup = (
+        '<svg class="icon"><svg><style>a{}</style></svg><path d="M0"/></path>'
+        "</svg>"
+    )
+    assert site_index.inline_payloads == _payload_index(
+        (
+            "a.html",
+            [
+                ("style", "<style>p { margin: 0; }</style>"),
+                ("svg", icon_markup),
+                ("script", "<script>init()</script>"),
+            ],
+        ),
+        (
+            "b.html",
+            [("svg", icon_markup), ("script", "<script>init()</script>")],
+        ),
+    )
+    assert {
+        (stats.tag, stats.pages)
+        for stats in site_index.inline_payloads.values()
+    } == {("style", 1), ("svg", 2), ("script", 2)}
+
+
+def test_build_site_index_skips_inline_payloads_by_default(
+    temp_site_root: Path,
+):
+    (temp_site_root / "a.html").write_text(
+        "<style>p { margin: 0; }</style><script>init()</script>"
+    )
+
+    site_index = built_site_checks.build_site_index(temp_site_root)
+
+    assert site_index.inline_payloads == {}
+
+
+def _site_index_with(
+    base_dir: Path, anchor_index: dict, files: frozenset[str] = frozenset()
+):
+    return built_site_checks.SiteIndex(
+        anchor_index=anchor_index,
+        anchor_links={},
+        iframe_sources={},
+        manifest=built_site_checks.SiteManifest(str(base_dir), files),
+        resources={},
+        inline_payloads={},
+        hints={},
+        critical_fonts={},
+    )
+
+
+def test_site_manifest_is_file(tmp_path: Path):
+    base_dir = tmp_path / "public"
+    (base_dir / "images").mkdir(parents=True)
+    (base_dir / "images" / "a.png").touch()
+    (tmp_path / "outside.txt").touch()
+    manifest = built_site_checks.build_site_index(base_dir).manifest
+
+    assert manifest.files == frozenset({"images/a.png"})
+    assert manifest.is_file(base_dir / "images" / ".." / "images" / "a.png")
+    assert not manifest.is_file(base_dir / "images")
+    assert not manifest.is_file(base_dir / "b.png")
+    # Paths outside the site are checked on disk
+    assert manifest.is_file(base_dir / ".." / "outside.txt")
+    assert not manifest.is_file(tmp_path / "missing.txt")
+
+
+def test_check_file_for_issues_uses_site_index(tmp_path: Path):
+    file_path = tmp_path / "index.html"
+    file_path.write_text(
+        '<html><head><link rel="stylesheet" href="/listed.css"></head>'
+        '<body><a href="/other#x">x</a><img src="/listed.png"></body></html>'
+    )
+
+    issues = built_site_checks.check_file_for_issues(
+        file_path,
+        tmp_path,
+        None,
+        should_check_fonts=False,
+        # Neither listed file exists on disk
+        site_index=_site_index_with(
+            tmp_path,
+            {"other.html": frozenset({"x"})},
+            frozenset({"listed.css", "listed.png"}),
+        ),
+    )
+
+    assert issues["invalid_anchors"] == []
+    assert issues["missing_assets"] == []
+    assert issues["missing_media_files"] == []
+
+
+def test_worker_uses_shipped_anchor_index(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        built_site_checks, "_WORKER_SITE_DATA", {"site_index": None}
+    )
+    file_path = tmp_path / "index.html"
+    file_path.write_text('<html><body><a href="/other#x">x</a></body></html>')
+
+    built_site_checks._init_worker(
+        _site_index_with(tmp_path, {"other.html": frozenset({"x"})}), {}
+    )
+    issues, spans = built_site_checks._check_page_in_worker(
+        built_site_checks.PageToCheck(file_path, None),
+        tmp_path,
+        should_check_fonts=False,
+    )
+
+    assert issues["invalid_anchors"] == []
+    assert spans == []
+
+
 def test_check_problematic_paragraphs(sample_soup):
     result = built_site_checks.paragraphs_contain_canary_phrases(sample_soup)
     assert len(result) == 3
@@ -463,19 +741,36 @@ def test_check_katex_elements_for_errors(sample_html_with_katex_errors):
         ("/file.jpg", "file.jpg"),
     ],
 )
-def test_resolve_media_path(input_path, expected_path, temp_site_root):
+@pytest.mark.parametrize("use_manifest", [False, True])
+def test_resolve_media_path(
+    input_path, expected_path, temp_site_root, use_manifest
+):
     """Test the resolve_media_path helper function."""
-    result = built_site_checks.resolve_media_path(input_path, temp_site_root)
+    result = built_site_checks.resolve_media_path(
+        input_path, temp_site_root, _manifest(temp_site_root, use_manifest)
+    )
     assert result == (temp_site_root / expected_path).resolve()
 
 
-def test_check_local_media_files(sample_soup, temp_site_root):
+def _manifest(
+    base_dir: Path, use_manifest: bool
+) -> "built_site_checks.SiteManifest | None":
+    """
+    List the files under `base_dir`, or return None to check them on disk.
+    """
+    if not use_manifest:
+        return None
+    return built_site_checks.build_site_index(base_dir).manifest
+
+
+@pytest.mark.parametrize("use_manifest", [False, True])
+def test_check_local_media_files(sample_soup, temp_site_root, use_manifest):
     # Create an existing image file
     (temp_site_root / "existing-image.jpg").touch()
     (temp_site_root / "existing-video.mp4").touch()
 
     result = built_site_checks.check_local_media_files(
-        sample_soup, temp_site_root
+        sample_soup, temp_site_root, _manifest(temp_site_root, use_manifest)
     )
     assert set(result) == {
         "missing-image.png (resolved to "
@@ -501,15 +796,18 @@ def test_check_local_media_files(sample_soup, temp_site_root):
         ('<img src="existing.png">', [], ["existing.png"]),
     ],
 )
+@pytest.mark.parametrize("use_manifest", [False, True])
 def test_check_local_media_files_parametrized(
-    html, expected, existing_files, temp_site_root
+    html, expected, existing_files, temp_site_root, use_manifest
 ):
     # Create any existing files
     for file in existing_files:
         (temp_site_root / file).touch()
 
     soup = BeautifulSoup(html, "html.parser")
-    result = built_site_checks.check_local_media_files(soup, temp_site_root)
+    result = built_site_checks.check_local_media_files(
+        soup, temp_site_root, _manifest(temp_site_root, use_manifest)
+    )
 
     # Format the expected paths with the actual resolved paths
     expected = [
@@ -586,6 +884,105 @@ def test_check_file_for_issues_with_redirect(tmp_path):
     assert issues == {}
 
 
+def test_check_file_for_issues_skips_parsing_redirects(tmp_path):
+    file_path = tmp_path / "test.html"
+    file_path.write_text(
+        '<html><head><meta http-equiv="refresh" content="0;url=/new-page">'
+        "</head><body>" + "<p>Redirecting</p>" * 1000 + "</body></html>"
+    )
+
+    with patch.object(
+        script_utils, "parse_html_file", side_effect=AssertionError
+    ):
+        issues = built_site_checks.check_file_for_issues(
+            file_path, tmp_path, None, should_check_fonts=False
+        )
+
+    assert issues == {}
+
+
+def test_parse_head():
+    head = built_site_checks.parse_head(
+        "<html><head>"
+        '<meta charset="utf-8"><title>A &amp; B</title>\n'
+        '<meta name="description" content="About things">'
+        '<link rel="preload" as="font" href="/font.woff2">'
+        '<link rel="stylesheet preload" as="style" href="/index.css">'
+        '<link rel="icon" href="/favicon.ico">'
+        '<style id="critical-css">p{}</style>'
+        '<script defer src="/a.js"></script><script>inline()</script>'
+        "</head><body>"
+        '<script src="/body.js"></script>'
+        '<meta name="body-meta"><title>Body title</title>'
+        '<style id="critical-css">p{}</style>'
+        "</body></html>"
+    )
+
+    assert head == built_site_checks.HeadMetadata(
+        meta_tags=(
+            {"charset": "utf-8"},
+            {"name": "description", "content": "About things"},
+        ),
+        critical_css_blocks=1,
+        critical_css="p{}",
+        links=(
+            {"rel": "preload", "as": "font", "href": "/font.woff2"},
+            {"rel": "stylesheet preload", "as": "style", "href": "/index.css"},
+            {"rel": "icon", "href": "/favicon.ico"},
+        ),
+        preloads=(
+            {"rel": "preload", "as": "font", "href": "/font.woff2"},
+            {"rel": "stylesheet preload", "as": "style", "href": "/index.css"},
+        ),
+        stylesheets=(
+            {"rel": "stylesheet preload", "as": "style", "href": "/index.css"},
+        ),
+        scripts=({"defer": "", "src": "/a.js"}, {}),
+        is_redirect=False,
+        late_tags=(),
+    )
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        # No <head> element
+        "<html><body><title>Title</title><meta name='a'></body></html>",
+        # An unclosed <head> ends at <body>
+        "<html><head><body><meta name='a'></body></html>",
+        # Only the first <head> counts
+        "<html><head></head><head><meta name='a'></head></html>",
+    ],
+)
+def test_parse_head_ignores_tags_outside_head(html: str):
+    head = built_site_checks.parse_head(html)
+
+    assert head.meta_tags == ()
+
+
+def test_parse_head_detects_redirect():
+    head = built_site_checks.parse_head(
+        '<html><head><meta http-equiv="Refresh" content="0; URL=/new">'
+        "</head></html>"
+    )
+
+    assert head.is_redirect
+
+
+def test_scan_head_stops_at_end_of_head(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # Small reads, so that "</head>" is split between two of them
+    monkeypatch.setattr(built_site_checks, "_HEAD_READ_SIZE", 4)
+    file_path = tmp_path / "test.html"
+    # The body isn't valid UTF-8, so decoding it would fail
+    file_path.write_bytes(
+        b"<html><head><meta name='a'></head><body>\xff\xfe</body>"
+    )
+
+    assert built_site_checks.scan_head(file_path).meta_tags == ({"name": "a"},)
+
+
 @pytest.mark.parametrize(
     "html,expected",
     [
@@ -1396,6 +1793,93 @@ def test_check_unrendered_html(html, expected):
     assert sorted(result) == sorted(expected)
 
 
+_NESTED_SKIP_HTML = """
+<!DOCTYPE html>
+<html>
+<head><title>"Title"</title><style>a::after { content: "--"; }</style></head>
+<body>
+    <!-- a "comment" -->
+    <p>Outer "quotes" -- <em>nested "quotes"</em></p>
+    <div class="no-formatting">
+        <p>Skipped "quotes" <span>still -- skipped</span></p>
+    </div>
+    <pre><code>code "quotes"</code></pre>
+    <p class="elvish">Elvish "text"</p>
+    <span class="bad-handwriting other">Scrawl..</span>
+    <p>After <code>x</code> "more" text.. &lt;div&gt;</p>
+    <script>var a = "b";</script>
+</body>
+</html>
+"""
+
+
+def test_iter_formattable_text_matches_should_skip():
+    soup = BeautifulSoup(_NESTED_SKIP_HTML, "html.parser")
+    expected = [
+        element
+        for element in soup.find_all(string=True)
+        if not built_site_checks.should_skip(element)
+    ]
+
+    assert list(built_site_checks.iter_formattable_text(soup)) == expected
+
+
+def test_iter_formattable_text_inherits_skip_from_root_ancestors():
+    soup = BeautifulSoup(_NESTED_SKIP_HTML, "html.parser")
+    skipped_span = soup.select_one(".no-formatting span")
+    assert list(built_site_checks.iter_formattable_text(skipped_span)) == []
+
+
+def test_iter_formattable_text_walks_ancestors_once(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    soup = BeautifulSoup(_NESTED_SKIP_HTML, "html.parser")
+    original_should_skip = built_site_checks.should_skip
+    calls: list[object] = []
+
+    def _counting_should_skip(element):
+        calls.append(element)
+        return original_should_skip(element)
+
+    monkeypatch.setattr(
+        built_site_checks, "should_skip", _counting_should_skip
+    )
+    list(built_site_checks.iter_formattable_text(soup))
+
+    assert calls == [soup]
+
+
+def test_run_text_node_checks_matches_individual_checks():
+    soup = BeautifulSoup(_NESTED_SKIP_HTML, "html.parser")
+
+    assert built_site_checks.run_text_node_checks(soup) == {
+        "unprocessed_quotes": built_site_checks.check_unprocessed_quotes(soup),
+        "unprocessed_dashes": built_site_checks.check_unprocessed_dashes(soup),
+        "unrendered_html": built_site_checks.check_unrendered_html(soup),
+        "consecutive_periods": built_site_checks.check_consecutive_periods(
+            soup
+        ),
+    }
+    assert built_site_checks.check_unprocessed_quotes(soup) == [
+        "Unprocessed quotes ['\"', '\"']: \"Title\"",
+        "Unprocessed quotes ['\"', '\"']:  a \"comment\" ",
+        "Unprocessed quotes ['\"', '\"']: Outer \"quotes\" -- ",
+        "Unprocessed quotes ['\"', '\"']: nested \"quotes\"",
+        "Unprocessed quotes ['\"', '\"']:  \"more\" text.. <div>",
+    ]
+
+
+def test_run_text_node_checks_with_custom_check():
+    soup = BeautifulSoup("<p>one <code>two</code> three</p>", "html.parser")
+
+    def _record_words(element, found: list[str]) -> None:
+        found.extend(element.split())
+
+    assert built_site_checks.run_text_node_checks(
+        soup, {"words": _record_words}
+    ) == {"words": ["one", "three"]}
+
+
 _TAGS_TO_CHECK = built_site_checks._TAGS_TO_CHECK_FOR_MISSING_ASSETS
 
 
@@ -1671,6 +2155,19 @@ _MIN_DESCRIPTION_LENGTH = built_site_checks.MIN_DESCRIPTION_LENGTH
             """,
             ["Description not found"],
         ),
+        # Test description outside the head
+        (
+            """
+            <html>
+            <head>
+            </head>
+            <body>
+                <meta name="description" content="A fine description">
+            </body>
+            </html>
+            """,
+            [],
+        ),
     ],
 )
 def test_check_description_length(html: str, expected: list[str]) -> None:
@@ -1773,8 +2270,8 @@ def test_check_css_issues_missing_file(tmp_path: Path):
     ],
 )
 def test_check_critical_css(html, expected):
-    soup = BeautifulSoup(html, "html.parser")
-    result = built_site_checks.check_critical_css(soup)
+    head = built_site_checks.parse_head(html)
+    result = built_site_checks.check_critical_css(head)
     assert result == expected
 
 
@@ -2054,7 +2551,7 @@ def test_check_iframe_sources(
     # Counter to track which response to return
     response_index = 0
 
-    def mock_head(url: str, timeout: int) -> object:
+    def mock_head(_session, url: str, timeout: float) -> object:
         nonlocal response_index
         if response_index >= len(mock_responses):
             raise ValueError("Not enough mock responses provided")
@@ -2067,17 +2564,52 @@ def test_check_iframe_sources(
 
         ok, status_code = response
         mock_response = type(
-            "MockResponse", (), {"ok": ok, "status_code": status_code}
+            "MockResponse",
+            (),
+            {"ok": ok, "status_code": status_code, "headers": {}},
         )
         return mock_response
 
-    # Patch the requests.head function
-    monkeypatch.setattr(requests, "head", mock_head)
+    # Patch the session used by the prober
+    monkeypatch.setattr(requests.Session, "head", mock_head)
 
-    result = built_site_checks.check_iframe_sources(soup)
+    # A single worker probes in document order, matching mock_responses
+    prober = url_prober.UrlProber(cache_path=None, max_workers=1)
+    result = built_site_checks.check_iframe_sources(soup, prober)
     assert sorted(result) == sorted(expected)
 
 
+def test_check_iframe_sources_probes_each_url_once(monkeypatch):
+    requested: list[str] = []
+
+    def mock_head(_session, url: str, timeout: float) -> object:
+        requested.append(url)
+        return type(
+            "MockResponse",
+            (),
+            {"ok": False, "status_code": 503, "headers": {}},
+        )
+
+    monkeypatch.setattr(requests.Session, "head", mock_head)
+    soup = BeautifulSoup(
+        '<iframe src="//a.com" title="First"></iframe>'
+        '<iframe src="https://a.com" title="Second"></iframe>',
+        "html.parser",
+    )
+
+    result = built_site_checks.check_iframe_sources(soup)
+    # Other pages reuse the shared prober's results
+    built_site_checks.check_iframe_sources(soup)
+
+    assert requested == ["https://a.com"]
+    assert result == [
+        "Iframe source https://a.com returned status 503. "
+        "Description: title='First' (alt='')",
+        "Iframe source https://a.com returned status 503. "
+        "Description: title='Second' (alt='')",
+    ]
+
+
 @pytest.mark.parametrize(
     "html,expected",
     [
@@ -2291,6 +2823,22 @@ def test_check_robots_txt_location(
     assert result == expected
 
 
+def test_check_precompressed_files(tmp_path: Path):
+    (tmp_path / "posts").mkdir()
+    fresh = tmp_path / "index.html"
+    stale = tmp_path / "posts" / "post.html"
+    for path in (fresh, stale, tmp_path / "cat.png"):
+        path.write_text("<p>text</p>")
+    precompress.compress_file(fresh)
+    precompress.compress_file(stale)
+    # Rebuilt after it was compressed
+    os.utime(stale, ns=(time.time_ns() + 10**9,) * 2)
+
+    assert built_site_checks.check_precompressed_files(tmp_path) == [
+        "posts/post.html: compressed copies missing or stale"
+    ]
+
+
 @pytest.mark.parametrize(
     "html,expected",
     [
@@ -2370,57 +2918,300 @@ def test_check_robots_txt_location(
 )
 def test_check_preloaded_fonts(html, expected):
     """Test the check_preloaded_fonts function with various HTML structures."""
-    soup = BeautifulSoup(html, "html.parser")
-    assert built_site_checks.check_preloaded_fonts(soup) == expected
+    head = built_site_checks.parse_head(html)
+    assert built_site_checks.check_preloaded_fonts(head) == expected
 
 
-def test_check_file_for_issues_with_fonts(tmp_path):
-    """Test that the font check is included when should_check_fonts is True."""
-    # Create a test HTML file with no preloaded font
-    html_content = """
-    <html>
-    <head><title>Test</title></head>
-    <body><p>Test content</p></body>
-    </html>
-    """
-    file_path = tmp_path / "test.html"
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
+@pytest.mark.parametrize(
+    "head_html,expected",
+    [
+        ('<script src="/a.js"></script>', ["/a.js"]),
+        ('<script defer src="/a.js"></script>', []),
+        ('<script async src="/a.js"></script>', []),
+        ('<script type="module" src="/a.js"></script>', []),
+        ('<script type="application/json">{}</script>', []),
+        ("<script>inline()</script>", []),
+        (
+            '<script src="/static/scripts/detectDarkMode.js"></script>',
+            [],
+        ),
+    ],
+)
+def test_check_render_blocking_scripts(head_html: str, expected: list[str]):
+    head = built_site_checks.parse_head(
+        f"<html><head>{head_html}</head><body></body></html>"
+    )
+    assert built_site_checks.check_render_blocking_scripts(head) == expected
 
-    # Check with fonts enabled
-    issues = built_site_checks.check_file_for_issues(
-        file_path, tmp_path, None, should_check_fonts=True
+
+@pytest.mark.parametrize(
+    "src,page_url,expected",
+    [
+        ("./prescript.js", "/index.html", []),
+        ("../prescript.js", "/posts/post.html", []),
+        ("prescript.js", "/posts/post.html", ["prescript.js"]),
+        ("../a.js", "/posts/post.html", ["../a.js"]),
+    ],
+)
+def test_check_render_blocking_scripts_resolves_relative_sources(
+    src: str, page_url: str, expected: list[str]
+):
+    head = built_site_checks.parse_head(
+        f'<html><head><script src="{src}"></script></head></html>'
+    )
+    assert (
+        built_site_checks.check_render_blocking_scripts(head, page_url)
+        == expected
     )
 
-    # Verify that missing_preloaded_font is in the issues
-    assert "missing_preloaded_font" in issues
-    assert issues["missing_preloaded_font"] is True
 
-    # Check with fonts disabled
-    issues = built_site_checks.check_file_for_issues(
-        file_path, tmp_path, None, should_check_fonts=False
+_QUARTZ_COMPONENTS = Path(__file__).parents[2] / "quartz" / "components"
+
+
+def _quartz_head_resources(base_dir: str) -> str:
+    """
+    The external scripts and stylesheets which Quartz writes into the head of
+    a page whose path to the site root is `base_dir`: the static tags in
+    `Head.tsx`, and the `beforeDOMReady` scripts from `pageResources`, which
+    `JSResourceToScriptElement` renders without `defer`.
+    """
+    head_source = (_QUARTZ_COMPONENTS / "Head.tsx").read_text()
+    # Drop JSX comments, which can sit between attributes
+    head_source = re.sub(r"(?<=\s)//[^\n]*", "", head_source)
+    tags = [
+        match.group(0) + ("</script>" if match.group(1) == "script" else "")
+        for match in re.finditer(r"<(script|link)\b[^>]*>", head_source)
+        if re.search(r'\b(?:src|href)="', match.group(0))
+    ]
+    render_source = (_QUARTZ_COMPONENTS / "renderPage.tsx").read_text()
+    tags.extend(
+        f'<script spa-preserve src="{base_dir}/{name}" '
+        'type="application/javascript"></script>'
+        for name in re.findall(
+            r'src: joinSegments\(baseDir, "([^"]+)"\),\s*'
+            r'loadTime: "beforeDOMReady"',
+            render_source,
+        )
     )
+    return "\n".join(tags)
 
-    # Verify that missing_preloaded_font is not in the issues
-    assert "missing_preloaded_font" not in issues
+
+@pytest.mark.parametrize(
+    "base_dir,page_url", [(".", "/index.html"), ("..", "/posts/post.html")]
+)
+def test_quartz_head_has_no_render_blocking_resources(
+    base_dir: str, page_url: str
+):
+    resources = _quartz_head_resources(base_dir)
+    assert f'src="{base_dir}/prescript.js"' in resources
+    head = built_site_checks.parse_head(
+        f"<html><head>{resources}</head><body></body></html>"
+    )
+
+    assert (
+        built_site_checks.check_render_blocking_scripts(head, page_url) == []
+    )
+    assert (
+        built_site_checks.check_render_blocking_stylesheets(head, page_url)
+        == []
+    )
 
 
 @pytest.mark.parametrize(
-    "html,expected",
+    "head_html,expected",
     [
-        # Test valid relative paths (should be allowed)
+        ('<link rel="stylesheet" href="/extra.css">', ["/extra.css"]),
         (
-            """
-            <img src="/images/test.jpg">
-            <img src="./images/test.jpg">
-            <img src="../images/test.jpg">
-            """,
-            [],
+            '<link rel="stylesheet" media="screen" href="/extra.css">',
+            ["/extra.css"],
         ),
-        # Test valid assets.turntrout.com domain
+        ('<link rel="stylesheet" media="print" href="/extra.css">', []),
+        ('<link rel="stylesheet" disabled href="/extra.css">', []),
+        ('<link rel="preload" as="style" href="/extra.css">', []),
+        ('<link rel="stylesheet" href="/index.css">', []),
         (
-            """
-            <img src="https://assets.turntrout.com/image.jpg">
+            '<link rel="stylesheet" '
+            'href="https://fonts.googleapis.com/css2?family=A">',
+            [],
+        ),
+    ],
+)
+def test_check_render_blocking_stylesheets(
+    head_html: str, expected: list[str]
+):
+    head = built_site_checks.parse_head(
+        f"<html><head>{head_html}</head><body></body></html>"
+    )
+    assert (
+        built_site_checks.check_render_blocking_stylesheets(head) == expected
+    )
+
+
+_SCREENFUL = (
+    "<p>" + "x" * (built_site_checks.SCREENFUL_TEXT_CHARS + 1) + "</p>"
+)
+
+
+@pytest.mark.parametrize(
+    "body_html,expected",
+    [
+        # The first image is on the first screen
+        ('<img src="/a.png"><img src="/b.png">', ["/b.png (in img tag)"]),
+        ('<img src="/a.png"><img src="/b.png" loading="lazy">', []),
+        # Text pushes media below the first screen
+        (
+            f'{_SCREENFUL}<iframe src="https://a.com"></iframe>',
+            ["https://a.com (in iframe tag)"],
+        ),
+        (f'{_SCREENFUL}<iframe src="https://a.com" loading="lazy">', []),
+        # Scripts, styles and comments aren't visible text
+        (
+            f"<script>{_SCREENFUL}</script><style>{_SCREENFUL}</style>"
+            f'<!--{_SCREENFUL}--><img src="/a.png">',
+            [],
+        ),
+        # Favicons are tiny, and neither count nor are counted
+        (
+            '<img class="favicon" src="/f.svg"><img src="/a.png">'
+            f'{_SCREENFUL}<img class="favicon" src="/f.svg">',
+            [],
+        ),
+    ],
+    ids=[
+        "second_image",
+        "second_image_lazy",
+        "after_text",
+        "after_text_lazy",
+        "invisible_text",
+        "favicons",
+    ],
+)
+def test_check_offscreen_media_loading(body_html: str, expected: list[str]):
+    soup = BeautifulSoup(
+        f"<html><body>{body_html}</body></html>", "html.parser"
+    )
+    assert built_site_checks.check_offscreen_media_loading(soup) == expected
+
+
+def test_check_offscreen_media_loading_without_body():
+    soup = BeautifulSoup('<img src="/a.png"><img src="/b.png">', "lxml-xml")
+    assert not built_site_checks.check_offscreen_media_loading(soup)
+
+
+@pytest.mark.parametrize(
+    "html,expected",
+    [
+        ('<img src="/a.png">', ["/a.png (in img tag)"]),
+        ('<img src="/a.png" width="10">', ["/a.png (in img tag)"]),
+        ('<img src="/a.png" width="10" height="5">', []),
+        ('<img src="/a.png" style="aspect-ratio: 2 / 1">', []),
+        ('<img src="/a.png" style="width: 10px; height: 5px">', []),
+        (
+            '<img src="/a.png" style="max-width: 10px; height: 5px">',
+            ["/a.png (in img tag)"],
+        ),
+        ('<img class="favicon" src="/f.svg">', []),
+        (
+            '<video><source src="/a.mp4"><source src="/a.webm"></video>',
+            ["/a.mp4 (in video tag)"],
+        ),
+        ("<video></video>", [" (in video tag)"]),
+        ('<video src="/a.mp4" width="16" height="9"></video>', []),
+    ],
+)
+def test_check_media_dimensions(html: str, expected: list[str]):
+    soup = BeautifulSoup(html, "html.parser")
+    assert built_site_checks.check_media_dimensions(soup) == expected
+
+
+_MARKDOWN_IMAGE_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)")
+_RAW_MEDIA_PATTERN = re.compile(r"<img\b[^>]*>|<video\b.*?</video>", re.DOTALL)
+
+
+def test_media_dimensions_check_is_opt_in_for_site_content(tmp_path: Path):
+    """
+    The build emits markdown images as bare `<img src>` tags and copies raw
+    HTML media unchanged, so most of the site's media don't reserve their
+    space yet. Checking them mustn't fail a default run.
+    """
+    media = []
+    content_dir = script_utils.get_git_root() / "content"
+    for md_file in sorted(content_dir.rglob("*.md")):
+        text = md_file.read_text(encoding="utf-8")
+        media.extend(
+            f'<img src="{escape(src)}" alt="{escape(alt)}">'
+            for alt, src in _MARKDOWN_IMAGE_PATTERN.findall(text)
+        )
+        media.extend(_RAW_MEDIA_PATTERN.findall(text))
+    assert media
+    file_path = tmp_path / "page.html"
+    file_path.write_text(
+        f"<html><head></head><body>{''.join(media)}</body></html>",
+        encoding="utf-8",
+    )
+
+    issues = built_site_checks.check_file_for_issues(
+        file_path, tmp_path, None, should_check_fonts=False
+    )
+    assert issues["media_without_dimensions"]
+
+    default_args = built_site_checks.parser.parse_args([])
+    assert "media_without_dimensions" not in (
+        built_site_checks._reported_issues(default_args, issues)
+    )
+    opted_in_args = built_site_checks.parser.parse_args(
+        ["--check-media-dimensions"]
+    )
+    assert built_site_checks._reported_issues(opted_in_args, issues) == issues
+
+
+def test_check_file_for_issues_with_fonts(tmp_path):
+    """Test that the font check is included when should_check_fonts is True."""
+    # Create a test HTML file with no preloaded font
+    html_content = """
+    <html>
+    <head><title>Test</title></head>
+    <body><p>Test content</p></body>
+    </html>
+    """
+    file_path = tmp_path / "test.html"
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(html_content)
+
+    # Check with fonts enabled
+    issues = built_site_checks.check_file_for_issues(
+        file_path, tmp_path, None, should_check_fonts=True
+    )
+
+    # Verify that missing_preloaded_font is in the issues
+    assert "missing_preloaded_font" in issues
+    assert issues["missing_preloaded_font"] is True
+
+    # Check with fonts disabled
+    issues = built_site_checks.check_file_for_issues(
+        file_path, tmp_path, None, should_check_fonts=False
+    )
+
+    # Verify that missing_preloaded_font is not in the issues
+    assert "missing_preloaded_font" not in issues
+
+
+@pytest.mark.parametrize(
+    "html,expected",
+    [
+        # Test valid relative paths (should be allowed)
+        (
+            """
+            <img src="/images/test.jpg">
+            <img src="./images/test.jpg">
+            <img src="../images/test.jpg">
+            """,
+            [],
+        ),
+        # Test valid assets.turntrout.com domain
+        (
+            """
+            <img src="https://assets.turntrout.com/image.jpg">
             <video src="https://assets.turntrout.com/video.mp4">
             <source src="https://assets.turntrout.com/audio.mp3">
             """,
@@ -2566,11 +3357,13 @@ def test_check_media_asset_sources(html, expected):
         ),
     ],
 )
+@pytest.mark.parametrize("use_manifest", [False, True])
 def test_check_asset_references(
     tmp_path: Path,
     html_content: str,
     existing_files: list[str],
     expected_missing: list[str],
+    use_manifest: bool,
 ) -> None:
     """Test the check_asset_references function."""
     base_dir = tmp_path / "public"
@@ -2598,7 +3391,7 @@ def test_check_asset_references(
     )
 
     missing_assets = built_site_checks.check_asset_references(
-        soup, html_file_path, base_dir
+        soup, html_file_path, base_dir, _manifest(base_dir, use_manifest)
     )
     assert sorted(missing_assets) == expected_missing_resolved
 
@@ -2712,6 +3505,21 @@ def test_parser_args_check_fonts(
         assert args.check_fonts == expected_check_fonts
 
 
+@pytest.mark.parametrize(
+    "test_args,expected",
+    [
+        ([], False),
+        (["--check-media-dimensions"], True),
+    ],
+)
+def test_parser_args_check_media_dimensions(
+    test_args: list[str], expected: bool
+):
+    with patch.object(sys, "argv", ["built_site_checks.py"] + test_args):
+        args = built_site_checks.parser.parse_args()
+        assert args.check_media_dimensions == expected
+
+
 def test_main_no_issues(
     mock_environment,
     valid_css_file,
@@ -2794,6 +3602,43 @@ def test_main_robots_txt_issues(
         )
 
 
+def test_main_precompressed_issues(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    html_file,
+    monkeypatch,
+    disable_md_requirement,
+):
+    monkeypatch.setattr(
+        built_site_checks, "check_file_for_issues", lambda *args, **kwargs: {}
+    )
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--check-precompressed"]
+    )
+    # Only the page is left uncompressed
+    precompress.compress_file(valid_css_file)
+    precompress.compress_file(robots_txt_file)
+
+    with (
+        patch.object(built_site_checks, "_print_issues") as mock_print,
+        pytest.raises(SystemExit),
+    ):
+        built_site_checks.main()
+
+    mock_print.assert_called_once_with(
+        mock_environment["public_dir"],
+        {
+            "stale_precompressed_files": [
+                "test.html: compressed copies missing or stale"
+            ]
+        },
+    )
+
+
 def test_main_html_issues(
     mock_environment,
     valid_css_file,
@@ -2853,6 +3698,9 @@ def test_main_handles_markdown_mapping(
             mock_environment["public_dir"],
             md_file,
             should_check_fonts=False,
+            site_index=built_site_checks.build_site_index(
+                mock_environment["public_dir"]
+            ),
         )
 
 
@@ -2910,6 +3758,9 @@ def test_main_command_line_args(
             mock_environment["public_dir"],
             None,
             should_check_fonts=True,
+            site_index=built_site_checks.build_site_index(
+                mock_environment["public_dir"]
+            ),
         )
 
 
@@ -2929,6 +3780,290 @@ def test_main_skips_drafts(
         mock_print.assert_not_called()
 
 
+@pytest.mark.parametrize(
+    "test_args,expected_jobs",
+    [
+        (["--jobs", "3"], 3),
+        (["-j", "1"], 1),
+    ],
+)
+def test_parser_args_jobs(test_args: list[str], expected_jobs: int):
+    with patch.object(sys, "argv", ["built_site_checks.py"] + test_args):
+        args = built_site_checks.parser.parse_args()
+        assert args.jobs == expected_jobs
+
+
+def test_collect_pages_to_check_sorted_and_mapped(
+    mock_environment, disable_md_requirement
+):
+    public_dir = mock_environment["public_dir"]
+    md_file = mock_environment["content_dir"] / "b.md"
+    for name in ("c.html", "a.html", "b.html", "alias.html", "style.css"):
+        (public_dir / name).write_text("<html></html>")
+    (public_dir / "sub").mkdir()
+    (public_dir / "sub" / "b.html").write_text("<html></html>")
+    (public_dir / "drafts").mkdir()
+    (public_dir / "drafts" / "draft.html").write_text("<html></html>")
+
+    pages = built_site_checks.collect_pages_to_check(
+        public_dir, {"b": md_file}, {"alias"}
+    )
+
+    assert pages == [
+        built_site_checks.PageToCheck(public_dir / "a.html", None),
+        built_site_checks.PageToCheck(public_dir / "b.html", md_file),
+        built_site_checks.PageToCheck(public_dir / "c.html", None),
+        built_site_checks.PageToCheck(public_dir / "sub" / "b.html", None),
+    ]
+
+
+def test_make_picklable_converts_tags():
+    soup = BeautifulSoup('<a class="internal">link</a>', "html.parser")
+    issues = {
+        "invalid_internal_links": soup.find_all("a"),
+        "localhost_links": ["http://localhost"],
+        "empty_body": True,
+    }
+
+    assert built_site_checks._make_picklable(issues) == {
+        "invalid_internal_links": ['<a class="internal">link</a>'],
+        "localhost_links": ["http://localhost"],
+        "empty_body": True,
+    }
+
+
+def test_check_page_in_worker_returns_picklable_issues(tmp_path: Path):
+    page_path = tmp_path / "page.html"
+    page_path.write_text(
+        '<html><body><a class="internal" href="https://x.com">x</a>'
+        "</body></html>"
+    )
+
+    issues, _ = built_site_checks._check_page_in_worker(
+        built_site_checks.PageToCheck(page_path, None),
+        tmp_path,
+        should_check_fonts=False,
+    )
+
+    assert issues["invalid_internal_links"] == [
+        '<a class="internal" href="https://x.com">x</a>'
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_pages_preserves_order(tmp_path: Path, jobs: int):
+    pages = []
+    for name in ("a", "b", "c", "d"):
+        page_path = tmp_path / f"{name}.html"
+        page_path.write_text(
+            f'<html><body><a href="http://localhost/{name}">x</a>'
+            "</body></html>"
+        )
+        pages.append(built_site_checks.PageToCheck(page_path, None))
+
+    results = list(
+        built_site_checks.check_pages(
+            pages, tmp_path, should_check_fonts=False, jobs=jobs
+        )
+    )
+
+    assert [page for page, _ in results] == pages
+    assert [issues["localhost_links"] for _, issues in results] == [
+        [f"http://localhost/{name}"] for name in ("a", "b", "c", "d")
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_pages_probes_iframes_up_front(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, jobs: int
+):
+    requested: list[str] = []
+
+    def mock_head(_session, url: str, timeout: float) -> object:
+        requested.append(url)
+        return type(
+            "MockResponse",
+            (),
+            {"ok": False, "status_code": 404, "headers": {}},
+        )
+
+    monkeypatch.setattr(requests.Session, "head", mock_head)
+    pages = []
+    for name in ("a", "b"):
+        page_path = tmp_path / f"{name}.html"
+        page_path.write_text(
+            '<html><body><iframe src="https://embed.com/v"></iframe>'
+            "</body></html>"
+        )
+        pages.append(built_site_checks.PageToCheck(page_path, None))
+
+    results = list(
+        built_site_checks.check_pages(
+            pages,
+            tmp_path,
+            should_check_fonts=False,
+            jobs=jobs,
+            site_index=built_site_checks.build_site_index(tmp_path),
+        )
+    )
+
+    # Probed once in this process, then shipped to any workers
+    assert requested == ["https://embed.com/v"]
+    assert [issues["problematic_iframes"] for _, issues in results] == [
+        [
+            "Iframe source https://embed.com/v returned status 404. "
+            "Description: title='' (alt='')"
+        ]
+    ] * 2
+
+
+def test_init_worker_seeds_url_prober(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        built_site_checks, "_WORKER_SITE_DATA", {"site_index": None}
+    )
+    result = url_prober.ProbeResult(ok=True, status_code=200)
+
+    built_site_checks._init_worker(None, {"https://a.com": result})
+
+    assert url_prober.get_default_prober().results == {"https://a.com": result}
+
+
+def test_main_parallel_prints_in_path_order(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    monkeypatch,
+    disable_md_requirement,
+):
+    """Parallel runs report issues in path order and exit with 1."""
+    public_dir = mock_environment["public_dir"]
+    monkeypatch.setattr(sys, "argv", ["built_site_checks.py", "--jobs", "2"])
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    page_paths = [public_dir / f"{name}.html" for name in ("z", "m", "a")]
+    for page_path in page_paths:
+        page_path.write_text(
+            '<html><body><a href="http://localhost">x</a></body></html>'
+        )
+
+    with patch.object(built_site_checks, "_print_issues") as mock_print:
+        with pytest.raises(SystemExit) as excinfo:
+            built_site_checks.main()
+        assert excinfo.value.code == 1
+
+    printed_paths = [call.args[0] for call in mock_print.call_args_list]
+    assert printed_paths == sorted(page_paths)
+
+
+def test_check_file_for_issues_records_spans(tmp_path: Path):
+    file_path = tmp_path / "about.html"
+    file_path.write_text("<html><body><p>Hi</p></body></html>")
+    md_path = tmp_path / "about.md"
+    md_path.write_text("Hi")
+    profiler = check_profiler.CheckProfiler()
+    check_profiler.set_active_profiler(profiler)
+
+    issues = built_site_checks.check_file_for_issues(
+        file_path, tmp_path, md_path, should_check_fonts=True
+    )
+
+    checks = [span.check for span in profiler.spans]
+    assert checks[:2] == ["scan_head", "parse_html"]
+    assert "text_node_checks" in checks
+    # Every issue is timed, except those found by the single text node pass
+    # and by the head scan
+    passes = {"scan_head", "parse_html", "text_node_checks"}
+    found_by_passes = {"late_header_tags", *built_site_checks.TEXT_NODE_CHECKS}
+    assert set(checks) - passes == set(issues) - found_by_passes
+    assert {span.path for span in profiler.spans} == {str(file_path)}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_pages_collects_worker_spans(tmp_path: Path, jobs: int):
+    pages = []
+    for name in ("a", "b", "c"):
+        page_path = tmp_path / f"{name}.html"
+        page_path.write_text("<html><body><p>Hi</p></body></html>")
+        pages.append(built_site_checks.PageToCheck(page_path, None))
+    profiler = check_profiler.CheckProfiler()
+    check_profiler.set_active_profiler(profiler)
+
+    list(
+        built_site_checks.check_pages(
+            pages, tmp_path, should_check_fonts=False, jobs=jobs
+        )
+    )
+
+    assert set(profiler.path_totals()) == {
+        str(page.file_path) for page in pages
+    }
+    assert profiler.check_totals()["parse_html"].calls == 3
+
+
+def test_worker_returns_spans_when_profiling(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        built_site_checks, "_WORKER_SITE_DATA", {"site_index": None}
+    )
+    page_path = tmp_path / "page.html"
+    page_path.write_text("<html><body><p>Hi</p></body></html>")
+
+    built_site_checks._init_worker(None, {}, profile=True)
+    _, spans = built_site_checks._check_page_in_worker(
+        built_site_checks.PageToCheck(page_path, None),
+        tmp_path,
+        should_check_fonts=False,
+    )
+
+    assert spans[0].check == "scan_head"
+    # Spans are handed back once, not accumulated across pages
+    assert not check_profiler.get_active_profiler().spans
+
+
+def test_main_profile(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    monkeypatch,
+    disable_md_requirement,
+    capsys,
+):
+    public_dir = mock_environment["public_dir"]
+    output_path = mock_environment["tmp_path"] / "profile.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "built_site_checks.py",
+            "--jobs",
+            "1",
+            "--profile",
+            "--profile-top",
+            "1",
+            "--profile-output",
+            str(output_path),
+        ],
+    )
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    (public_dir / "page.html").write_text("<html><body></body></html>")
+
+    with pytest.raises(SystemExit):
+        built_site_checks.main()
+
+    output = capsys.readouterr().out
+    assert "Slowest checks:" in output
+    assert "Slowest files:" in output
+    exported = json.loads(output_path.read_text())
+    assert exported["script"] == "built_site_checks"
+    assert {span["path"] for span in exported["spans"]} == {
+        str(public_dir / "page.html")
+    }
+
+
 @pytest.mark.parametrize(
     "html,expected_issues",
     [
@@ -3292,3 +4427,1045 @@ def test_check_malformed_hrefs(html_content: str, expected_issues: list[str]):
     # Assuming built_site_checks contains the corrected check_malformed_hrefs
     result = built_site_checks.check_malformed_hrefs(soup)
     assert sorted(result) == sorted(expected_issues)
+
+
+_PARSER_COMPAT_HEAD = """
+<meta charset="utf-8">
+<title>Sample "page"</title>
+<meta name="description" content="A sample page used to compare parsers.">
+<style id="critical-css">body { margin: 0; }</style>
+<link rel="preload" href="/static/styles/subfont/ebgaramond-1.woff2"
+    as="font" crossorigin>
+<link rel="stylesheet" href="/index.css">
+<link rel="stylesheet" href="/missing.css">
+<script src="/prescript.js"></script>
+<script src="/missing.js"></script>
+"""
+
+_PARSER_COMPAT_BODY = """
+<article>
+<h1 id="intro">Intro -- with "quotes"</h1>
+<h2 id="intro-1">Intro again</h2>
+<p id="dup">With <em>emphasis</em>and no space. Text.. "quoted" [^1].</p>
+<p id="dup">Table: a caption and &lt;div&gt; unrendered html</p>
+<p>Subtitle: not rendered</p>
+<p>A <a href="http://localhost:8080">local</a> and
+<a class="internal" href="https://example.com">bad internal</a>,
+<a href="#intro">ok anchor</a>, <a href="#nope">bad anchor</a>,
+<a href="/other#there">cross</a>, <a href="/other#missing">cross bad</a>,
+<a href="/nope#x">missing page</a>,
+<a class="external" href="https://exa mple">spaces ok</a>
+<a class="external" href="htps:/bad">malformed</a>
+<a href="mailto:not-an-email">mail</a>.</p>
+<p>Some<i>one</i> and *unrendered* _emphasis_
+<code>"code quotes" -- ok</code></p>
+<p><span class="favicon-span"><img class="favicon" src="/favicon.ico"></span>
+and <img class="favicon" src="/favicon2.ico"></p>
+<blockquote><p>! spoiler here</p><p>ends with &gt;</p></blockquote>
+<span class="katex-error">\\bad</span>
+<span class="katex-display">&gt; starts with gt</span>
+<div class="no-formatting">"skip" -- this..</div>
+<img src="/images/missing.png">
+<img src="https://evil.example.com/img.png">
+<img src="/images/present.avif">
+<video id="pond-video"><source src="/pond.mp4"></video>
+<iframe src="/embedded.html" title="local"></iframe>
+<div class="flowchart"><span id="intro">flow</span></div>
+<dl><dt>: bad definition</dt><dd>ok</dd></dl>
+</article>
+"""
+
+# Functions named check_* which aren't per-page checks
+_NOT_PAGE_CHECKS = {
+    "check_pages",
+    "check_pages_with_cache",
+    "check_rss_file_for_issues",
+}
+
+
+@pytest.fixture
+def parser_compat_site(tmp_path: Path) -> dict[str, Path]:
+    """A small site whose page triggers most built-site checks."""
+    page = tmp_path / "page.html"
+    page.write_text(
+        f"<!DOCTYPE html><html><head>{_PARSER_COMPAT_HEAD}</head>"
+        f"<body>{_PARSER_COMPAT_BODY}</body></html>"
+    )
+    (tmp_path / "other.html").write_text('<div id="there"></div>')
+    (tmp_path / "index.css").write_text("body {}")
+    (tmp_path / "prescript.js").write_text("")
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "present.avif").touch()
+    md_path = tmp_path / "page.md"
+    md_path.write_text(
+        "![present](/images/present.avif)\n![gone](/images/gone.avif)\n"
+    )
+    return {"base_dir": tmp_path, "file_path": page, "md_path": md_path}
+
+
+def _page_check_names() -> list[str]:
+    return sorted(
+        name
+        for name, function in inspect.getmembers(
+            built_site_checks, inspect.isfunction
+        )
+        if name.startswith("check_")
+        and function.__module__ == built_site_checks.__name__
+        and name not in _NOT_PAGE_CHECKS
+    )
+
+
+def _run_check_with_parser(
+    check_name: str,
+    html_parser: str,
+    site: dict[str, Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> object:
+    """
+    Run a check on the sample page, parsed with the given backend.
+    """
+    monkeypatch.setenv(script_utils.HTML_PARSER_ENV_VAR, html_parser)
+    check = getattr(built_site_checks, check_name)
+    soup = script_utils.parse_html_file(site["file_path"], html_parser)
+    available_args: dict[str, object] = {
+        **site,
+        "soup": soup,
+        "head": built_site_checks.scan_head(site["file_path"]),
+        "element": soup.find("em"),
+        "allowed_chars": built_site_checks.ALLOWED_ELT_FOLLOWING_CHARS,
+        "prefix": "after",
+        "should_check_fonts": True,
+    }
+    kwargs = {
+        name: available_args[name]
+        for name, param in inspect.signature(check).parameters.items()
+        if param.default is inspect.Parameter.empty
+    }
+    result = check(**kwargs)
+    # Tags are compared by their HTML
+    return str(result)
+
+
+@pytest.mark.parametrize("check_name", _page_check_names())
+def test_checks_agree_across_html_parsers(
+    check_name: str,
+    parser_compat_site: dict[str, Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Every check must report the same issues whichever backend parsed the
+    page, so that the default backend can be changed safely.
+    """
+    pytest.importorskip("lxml")
+    results = {
+        html_parser: _run_check_with_parser(
+            check_name, html_parser, parser_compat_site, monkeypatch
+        )
+        for html_parser in script_utils.HTML_PARSERS
+    }
+    assert results["lxml"] == results["html.parser"]
+
+
+@pytest.mark.xfail(
+    strict=True,
+    reason="libxml2 doesn't treat <source> as a void element, so lxml nests "
+    "consecutive <source> tags",
+)
+def test_video_sources_agree_across_html_parsers() -> None:
+    pytest.importorskip("lxml")
+    html = (
+        '<video><source src="/a.mp4" type="video/mp4; codecs=hvc1">'
+        '<source src="/a.webm" type="video/webm"></video>'
+    )
+    results = [
+        built_site_checks.check_video_source_order_and_match(
+            BeautifulSoup(html, html_parser)
+        )
+        for html_parser in script_utils.HTML_PARSERS
+    ]
+    assert results[0] == results[1]
+
+
+def test_main_html_parser_flag_sets_environment(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    html_file,
+    monkeypatch,
+    disable_md_requirement,
+):
+    # Set rather than deleted, so that monkeypatch restores the variable
+    # which main() sets
+    monkeypatch.setenv(script_utils.HTML_PARSER_ENV_VAR, "html.parser")
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--html-parser", "lxml"]
+    )
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    monkeypatch.setattr(
+        built_site_checks, "check_file_for_issues", lambda *args, **kwargs: {}
+    )
+
+    built_site_checks.main()
+
+    assert script_utils.get_html_parser() == "lxml"
+
+
+def _write_linked_site(tmp_path: Path) -> list:
+    """
+    Write pages where a.html links into b.html, and c.html links nowhere.
+    """
+    (tmp_path / "a.html").write_text('<a href="/b#there">b</a>')
+    (tmp_path / "b.html").write_text('<p id="there">B</p>')
+    (tmp_path / "c.html").write_text('<a href="#self">c</a>')
+    return [
+        built_site_checks.PageToCheck(
+            tmp_path / f"{name}.html", tmp_path / f"{name}.md"
+        )
+        for name in ("a", "b", "c")
+    ]
+
+
+def test_get_page_inputs(tmp_path: Path):
+    pages = _write_linked_site(tmp_path)
+    (tmp_path / "a.html").write_text(
+        '<a href="/b#there">b</a><a href="/missing#x">m</a>'
+    )
+    md_path = tmp_path / "a.md"
+    md_path.write_text("# A")
+    site_index = built_site_checks.build_site_index(tmp_path)
+
+    inputs = built_site_checks.get_page_inputs(
+        pages[0]._replace(md_path=md_path), tmp_path, site_index
+    )
+
+    assert inputs == built_site_checks.page_check_cache.PageInputs(
+        html_hash=built_site_checks.page_check_cache.hash_file(
+            pages[0].file_path
+        ),
+        md_hash=built_site_checks.page_check_cache.hash_file(md_path),
+        dependencies={
+            "b.html": built_site_checks.page_check_cache.hash_strings(
+                {"there"}
+            ),
+            "missing.html": None,
+        },
+    )
+    assert (
+        built_site_checks.get_page_inputs(
+            pages[2], tmp_path, site_index
+        ).md_hash
+        is None
+    )
+
+
+def test_checker_fingerprint_tracks_options_and_site_files(tmp_path: Path):
+    (tmp_path / "page.html").write_text("<p>Hi</p>")
+    fingerprint = built_site_checks.checker_fingerprint(tmp_path, False)
+
+    assert fingerprint == built_site_checks.checker_fingerprint(
+        tmp_path, False
+    )
+    assert fingerprint != built_site_checks.checker_fingerprint(tmp_path, True)
+
+    (tmp_path / "other.html").write_text("<p>Pages don't matter</p>")
+    assert fingerprint == built_site_checks.checker_fingerprint(
+        tmp_path, False
+    )
+
+    (tmp_path / "image.avif").touch()
+    assert fingerprint != built_site_checks.checker_fingerprint(
+        tmp_path, False
+    )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_pages_with_cache_rechecks_changed_pages(
+    tmp_path: Path, jobs: int
+):
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    pages = _write_linked_site(public_dir)
+    cache_path = tmp_path / "cache.json"
+
+    def _run() -> tuple[list, list[Path]]:
+        cache = built_site_checks.page_check_cache.PageCheckCache.load(
+            cache_path, "fingerprint"
+        )
+        site_index = built_site_checks.build_site_index(public_dir)
+        checked: list[Path] = []
+
+        def _check_fresh_pages(pages_to_check):
+            checked.extend(page.file_path for page in pages_to_check)
+            return built_site_checks.check_pages(
+                pages_to_check,
+                public_dir,
+                should_check_fonts=False,
+                jobs=jobs,
+                site_index=site_index,
+            )
+
+        results = list(
+            built_site_checks.check_pages_with_cache(
+                pages,
+                public_dir,
+                site_index=site_index,
+                cache=cache,
+                check_fresh_pages=_check_fresh_pages,
+            )
+        )
+        cache.save(site_index.anchor_index.keys())
+        return results, checked
+
+    first_results, checked = _run()
+    assert checked == [page.file_path for page in pages]
+    assert [page for page, _ in first_results] == pages
+    assert first_results[0][1]["invalid_anchors"] == []
+
+    second_results, checked = _run()
+    assert checked == []
+    assert second_results == first_results
+
+    # Removing the target ID invalidates the page linking to it
+    (public_dir / "b.html").write_text("<html><body><p>B</p></body></html>")
+    third_results, checked = _run()
+    assert checked == [public_dir / "a.html", public_dir / "b.html"]
+    assert third_results[0][1]["invalid_anchors"] == [
+        "Invalid anchor: /b#there"
+    ]
+    assert third_results[2] == first_results[2]
+
+    # Cached pages before a fresh page keep their place
+    (public_dir / "c.html").write_text(
+        '<html><body><a href="http://localhost">C</a></body></html>'
+    )
+    fourth_results, checked = _run()
+    assert checked == [public_dir / "c.html"]
+    assert fourth_results[:2] == third_results[:2]
+    assert fourth_results[2][1]["localhost_links"] == ["http://localhost"]
+
+
+def test_check_pages_with_cache_reprobes_iframes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    (public_dir / "video.html").write_text(
+        '<html><body><iframe src="https://video.com/v" title="V"></iframe>'
+        "</body></html>"
+    )
+    pages = [built_site_checks.PageToCheck(public_dir / "video.html", None)]
+    cache_path = tmp_path / "cache.json"
+    status_code = 503
+
+    def mock_head(_session, url: str, timeout: float) -> object:
+        return type(
+            "MockResponse",
+            (),
+            {
+                "ok": status_code < 400,
+                "status_code": status_code,
+                "headers": {},
+            },
+        )
+
+    monkeypatch.setattr(requests.Session, "head", mock_head)
+
+    def _run() -> tuple[list[str], int]:
+        # Each run starts without the previous run's failed probes
+        url_prober.set_default_prober(url_prober.UrlProber(cache_path=None))
+        cache = built_site_checks.page_check_cache.PageCheckCache.load(
+            cache_path, "fingerprint"
+        )
+        site_index = built_site_checks.build_site_index(public_dir)
+        results = list(
+            built_site_checks.check_pages_with_cache(
+                pages,
+                public_dir,
+                site_index=site_index,
+                cache=cache,
+                check_fresh_pages=lambda pages_to_check: (
+                    built_site_checks.check_pages(
+                        pages_to_check,
+                        public_dir,
+                        should_check_fonts=False,
+                        jobs=1,
+                        site_index=site_index,
+                    )
+                ),
+            )
+        )
+        cache.save(site_index.anchor_index.keys())
+        return results[0][1]["problematic_iframes"], cache.hits
+
+    def _saved_iframe_issues() -> list[str]:
+        pages = json.loads(cache_path.read_text())["pages"]
+        return pages["video.html"]["issues"]["problematic_iframes"]
+
+    failure = [
+        "Iframe source https://video.com/v returned status 503. "
+        "Description: title='V' (alt='')"
+    ]
+    assert _run() == (failure, 0)
+    assert _saved_iframe_issues() == []
+    assert _run() == (failure, 1)
+    assert _saved_iframe_issues() == []
+
+    status_code = 200
+    assert _run() == ([], 1)
+
+
+@pytest.mark.parametrize(
+    "changed_names,expected_names",
+    [
+        # Pages linking into a changed page are checked too
+        (["b.md"], ["a", "b"]),
+        (["a.md"], ["a"]),
+        (["a.md", "c.md"], ["a", "c"]),
+        # Changes outside the markdown sources don't select pages
+        (["b.html", "quartz.config.ts"], []),
+        ([], []),
+    ],
+)
+def test_select_changed_pages(
+    tmp_path: Path, changed_names: list[str], expected_names: list[str]
+):
+    pages = _write_linked_site(tmp_path)
+    site_index = built_site_checks.build_site_index(tmp_path)
+
+    selected = built_site_checks.select_changed_pages(
+        pages,
+        tmp_path,
+        {(tmp_path / name).resolve() for name in changed_names},
+        site_index,
+    )
+
+    assert selected == [
+        page for page in pages if page.file_path.stem in expected_names
+    ]
+
+
+def test_select_changed_pages_without_md_path(tmp_path: Path):
+    pages = [
+        page._replace(md_path=None) for page in _write_linked_site(tmp_path)
+    ]
+
+    assert not built_site_checks.select_changed_pages(
+        pages,
+        tmp_path,
+        {(tmp_path / "b.md").resolve()},
+        built_site_checks.build_site_index(tmp_path),
+    )
+
+
+def test_main_changed_since(
+    mock_environment, valid_css_file, robots_txt_file, monkeypatch, capsys
+):
+    public_dir = mock_environment["public_dir"]
+    content_dir = mock_environment["content_dir"]
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--changed-since", "main"]
+    )
+    pages = _write_linked_site(public_dir)
+    monkeypatch.setattr(
+        script_utils,
+        "build_html_to_md_map",
+        lambda md_dir: {
+            page.file_path.stem: content_dir / f"{page.file_path.stem}.md"
+            for page in pages
+        },
+    )
+    changed_refs = []
+
+    def _fake_get_changed_files(since_ref: str, repo_root: Path) -> set:
+        changed_refs.append((since_ref, repo_root))
+        return {(content_dir / "b.md").resolve()}
+
+    monkeypatch.setattr(
+        script_utils, "get_changed_files", _fake_get_changed_files
+    )
+
+    with patch.object(
+        built_site_checks, "check_file_for_issues", return_value={}
+    ) as mock_check:
+        built_site_checks.main()
+
+    assert changed_refs == [("main", mock_environment["tmp_path"])]
+    assert sorted(call.args[0].name for call in mock_check.call_args_list) == [
+        "a.html",
+        "b.html",
+    ]
+    assert "Checking 2 of 3 pages changed since main." in (
+        capsys.readouterr().out
+    )
+
+
+def test_main_changed_since_bad_ref(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    monkeypatch,
+    disable_md_requirement,
+    capsys,
+):
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--changed-since", "nope"]
+    )
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+
+    def _bad_ref(since_ref: str, repo_root: Path) -> set:
+        raise ValueError(f"Can't compare the working tree with '{since_ref}'")
+
+    monkeypatch.setattr(script_utils, "get_changed_files", _bad_ref)
+
+    with pytest.raises(SystemExit) as excinfo:
+        built_site_checks.main()
+
+    assert excinfo.value.code == 2
+    assert "'nope'" in capsys.readouterr().err
+
+
+def test_main_with_cache(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    html_file,
+    monkeypatch,
+    disable_md_requirement,
+    capsys,
+):
+    cache_path = mock_environment["tmp_path"] / "cache.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["built_site_checks.py", "--cache", "--cache-path", str(cache_path)],
+    )
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    html_issues = {"localhost_links": ["http://localhost:8000"]}
+    mock_check = patch.object(
+        built_site_checks, "check_file_for_issues", return_value=html_issues
+    )
+
+    for expected_calls in (1, 0):
+        with (
+            mock_check as check,
+            patch.object(built_site_checks, "_print_issues") as mock_print,
+        ):
+            with pytest.raises(SystemExit):
+                built_site_checks.main()
+        assert check.call_count == expected_calls
+        mock_print.assert_called_with(html_file, html_issues)
+
+    assert cache_path.is_file()
+    assert "Reused cached results for 1 of 1 pages." in capsys.readouterr().out
+
+
+def test_site_data_round_trip(tmp_path: Path):
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    _write_linked_site(public_dir)
+    (public_dir / "hinted.html").write_text(
+        '<head><link rel="preload" href="/font.woff2">'
+        '<style id="critical-css">@font-face { src: url(/font.woff2); }'
+        "</style></head>"
+    )
+    site_data = built_site_checks.SiteData(
+        permalink_to_md_path={"a": tmp_path / "content" / "a.md"},
+        aliases={"old-a"},
+        site_index=built_site_checks.build_site_index(public_dir),
+    )
+    data_path = tmp_path / "nested" / "site_data.json"
+    built_site_checks.save_site_data(site_data, data_path, tmp_path)
+
+    # Load it from another checkout of the same build
+    other_root = tmp_path / "other"
+    loaded = built_site_checks.load_site_data(
+        data_path, other_root, other_root / "public"
+    )
+
+    assert loaded.permalink_to_md_path == {
+        "a": other_root / "content" / "a.md"
+    }
+    assert loaded.aliases == site_data.aliases
+    assert loaded.site_index == site_data.site_index._replace(
+        manifest=site_data.site_index.manifest._replace(
+            root=str((other_root / "public").absolute())
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "contents", [json.dumps(["a", "list"]), json.dumps({"version": 0})]
+)
+def test_load_site_data_rejects_other_files(tmp_path: Path, contents: str):
+    data_path = tmp_path / "site_data.json"
+    data_path.write_text(contents)
+
+    with pytest.raises(ValueError, match="does not contain site data"):
+        built_site_checks.load_site_data(data_path, tmp_path, tmp_path)
+
+
+@pytest.fixture
+def linked_site_main(mock_environment, monkeypatch) -> list:
+    """
+    Pages of a linked site, each of which main() finds an issue in.
+    """
+    content_dir = mock_environment["content_dir"]
+    pages = _write_linked_site(mock_environment["public_dir"])
+    monkeypatch.setattr(
+        script_utils,
+        "build_html_to_md_map",
+        lambda md_dir: {
+            page.file_path.stem: content_dir / f"{page.file_path.stem}.md"
+            for page in pages
+        },
+    )
+    monkeypatch.setattr(
+        built_site_checks,
+        "check_file_for_issues",
+        lambda file_path, *args, **kwargs: {"issue": [file_path.name]},
+    )
+    return pages
+
+
+def test_main_shards_and_merge(
+    mock_environment, robots_txt_file, linked_site_main, monkeypatch
+):
+    tmp_path = mock_environment["tmp_path"]
+    checked_by_shard = []
+    css_checks_by_shard = []
+    for number in (1, 2):
+        report_path = tmp_path / f"report-{number}.json"
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "built_site_checks.py",
+                "--shard",
+                f"{number}/2",
+                "--report",
+                str(report_path),
+            ],
+        )
+        with (
+            patch.object(sys, "exit"),
+            patch.object(built_site_checks, "_print_issues") as mock_print,
+            patch.object(
+                built_site_checks, "check_css_issues", return_value=[]
+            ) as mock_css,
+        ):
+            built_site_checks.main()
+        checked_by_shard.append(
+            {call.args[0].name for call in mock_print.call_args_list}
+        )
+        css_checks_by_shard.append(mock_css.call_count)
+
+    # Each page is checked by exactly one shard
+    assert not checked_by_shard[0] & checked_by_shard[1]
+    assert checked_by_shard[0] | checked_by_shard[1] == {
+        "a.html",
+        "b.html",
+        "c.html",
+    }
+    # Site-wide checks run in the first shard only
+    assert css_checks_by_shard == [1, 0]
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["built_site_checks.py", "--merge"]
+        + [str(tmp_path / f"report-{number}.json") for number in (1, 2)],
+    )
+    with (
+        patch.object(built_site_checks, "_print_issues") as mock_print,
+        pytest.raises(SystemExit) as excinfo,
+    ):
+        built_site_checks.main()
+
+    assert excinfo.value.code == 1
+    assert sorted(call.args for call in mock_print.call_args_list) == [
+        (Path("public") / f"{name}.html", {"issue": [f"{name}.html"]})
+        for name in ("a", "b", "c")
+    ]
+
+
+def test_main_shares_site_data(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    linked_site_main,
+    monkeypatch,
+    capsys,
+):
+    data_path = mock_environment["tmp_path"] / "site_data.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["built_site_checks.py", "--save-site-data", str(data_path)],
+    )
+    with (
+        patch.object(built_site_checks, "check_file_for_issues") as check,
+        patch.object(
+            built_site_checks,
+            "build_site_index",
+            wraps=built_site_checks.build_site_index,
+        ) as build_index,
+    ):
+        built_site_checks.main()
+    check.assert_not_called()
+    # Shards may report duplicated payloads from the saved data
+    assert build_index.call_args.args[1]
+    assert f"Wrote site data to {data_path}" in capsys.readouterr().out
+
+    def _no_markdown_map(md_dir: Path) -> dict:
+        raise AssertionError("Site data should be loaded, not computed")
+
+    monkeypatch.setattr(script_utils, "build_html_to_md_map", _no_markdown_map)
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--site-data", str(data_path)]
+    )
+    with (
+        patch.object(built_site_checks, "_print_issues") as mock_print,
+        pytest.raises(SystemExit),
+    ):
+        built_site_checks.main()
+
+    assert sorted(call.args[0].name for call in mock_print.call_args_list) == [
+        "a.html",
+        "b.html",
+        "c.html",
+    ]
+
+
+@pytest.mark.parametrize(
+    "html,expected",
+    [
+        ('<link rel="stylesheet" href="/a.css">', ("css", "/a.css")),
+        (
+            '<link rel="preload" as="style" href="a.css">',
+            ("css", "a.css"),
+        ),
+        ('<link rel="preload" as="font" href="/f.woff2">', None),
+        ('<link rel="stylesheet">', None),
+        ('<script src="/a.js"></script>', ("js", "/a.js")),
+        ("<script>inline()</script>", None),
+        ('<img src="/a.png">', ("media", "/a.png")),
+        ('<svg href="a.svg"></svg>', ("media", "a.svg")),
+        ("<video></video>", None),
+        ('<a href="/a.png">link</a>', None),
+    ],
+)
+def test_page_resource(html: str, expected: tuple | None):
+    tag = BeautifulSoup(html, "html.parser").find()
+
+    assert built_site_checks._page_resource(tag.name, tag) == expected
+
+
+def _write_weighed_site(public_dir: Path) -> list:
+    (public_dir / "posts").mkdir(parents=True)
+    (public_dir / "style.css").write_text("x" * 100)
+    (public_dir / "posts" / "post.js").write_text("x" * 20)
+    (public_dir / "cat.png").write_bytes(b"x" * 3000)
+    (public_dir / "clip.mp4").write_bytes(b"x" * 1000)
+    (public_dir / "clip.webm").write_bytes(b"x" * 2000)
+    (public_dir / "posts" / "post.html").write_text(
+        '<link rel="stylesheet" href="/style.css">'
+        '<script src="post.js"></script><script src="missing.js"></script>'
+        '<img src="cat.png"><img src="./cat.png"><img src="cat.txt">'
+        '<script src="https://cdn.example.com/lib.js"></script>'
+        '<video><source src="/clip.mp4"><source src="/clip.webm"></video>'
+    )
+    return [
+        built_site_checks.PageToCheck(public_dir / "posts" / "post.html", None)
+    ]
+
+
+def test_page_resource_locations(tmp_path: Path):
+    _write_weighed_site(tmp_path)
+    site_index = built_site_checks.build_site_index(tmp_path)
+
+    assert list(
+        built_site_checks.page_resource_locations(
+            "posts/post.html", tmp_path, site_index
+        )
+    ) == [
+        ("css", str(tmp_path / "style.css")),
+        ("js", str(tmp_path / "posts" / "post.js")),
+        ("js", str(tmp_path / "posts" / "missing.js")),
+        ("media", str(tmp_path / "cat.png")),
+        ("media", str(tmp_path / "cat.png")),
+        ("js", "https://cdn.example.com/lib.js"),
+        ("media", str(tmp_path / "clip.mp4")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "look_up_remote,expected_js,expected_unsized",
+    [(False, 20, ("https://cdn.example.com/lib.js",)), (True, 20 + 500, ())],
+)
+def test_audit_page_weights(
+    tmp_path: Path,
+    monkeypatch,
+    look_up_remote: bool,
+    expected_js: int,
+    expected_unsized: tuple,
+):
+    pages = _write_weighed_site(tmp_path)
+    probed = []
+
+    def _fake_probe_all(urls) -> dict:
+        results = {
+            url: url_prober.ProbeResult(True, 200, content_length=500)
+            for url in urls
+        }
+        probed.extend(results)
+        return results
+
+    monkeypatch.setattr(
+        url_prober.get_default_prober(), "probe_all", _fake_probe_all
+    )
+
+    weights = built_site_checks.audit_page_weights(
+        pages,
+        tmp_path,
+        built_site_checks.build_site_index(tmp_path),
+        look_up_remote=look_up_remote,
+    )
+
+    html_bytes = (tmp_path / "posts" / "post.html").stat().st_size
+    assert weights == [
+        page_weight.PageWeight(
+            "posts/post.html",
+            # The video's WEBM is an alternative to its MP4
+            {"html": html_bytes, "css": 100, "js": expected_js, "media": 4000},
+            expected_unsized,
+        )
+    ]
+    assert probed == (
+        ["https://cdn.example.com/lib.js"] if look_up_remote else []
+    )
+
+
+def test_main_page_weight(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    disable_md_requirement,
+    monkeypatch,
+    capsys,
+):
+    public_dir = mock_environment["public_dir"]
+    output_path = mock_environment["tmp_path"] / "weights.json"
+    _write_weighed_site(public_dir)
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "built_site_checks.py",
+            "--page-weight",
+            "--page-weight-budget",
+            "media=1KB",
+            "--page-weight-output",
+            str(output_path),
+        ],
+    )
+
+    with (
+        patch.object(
+            built_site_checks, "check_file_for_issues", return_value={}
+        ),
+        patch.object(built_site_checks, "_print_issues") as mock_print,
+        pytest.raises(SystemExit),
+    ):
+        built_site_checks.main()
+
+    mock_print.assert_called_once_with(
+        public_dir / "posts" / "post.html",
+        {"over_weight_budget": ["media: 3.9KiB > 1.0KiB"]},
+    )
+    assert "Heaviest pages:" in capsys.readouterr().out
+    assert json.loads(output_path.read_text())[0]["path"] == "posts/post.html"
+
+
+def _write_hinted_site(public_dir: Path) -> list:
+    (public_dir / "static").mkdir(parents=True)
+    (public_dir / "static" / "site.css").write_text(
+        "@font-face { src: url(fonts/body.woff2); }"
+    )
+    for name, extra_head in (
+        ("a", '<link rel="preload" as="font" href="/unused.woff2">'),
+        ("b", ""),
+    ):
+        (public_dir / f"{name}.html").write_text(
+            "<html><head>"
+            '<style id="critical-css">'
+            "@font-face { src: url(/static/fonts/title.woff2); }</style>"
+            '<link rel="stylesheet" href="/static/site.css">'
+            '<link rel="stylesheet" href="https://cdn.example.com/x.css">'
+            '<link rel="stylesheet" href="/static/missing.css">'
+            f"{extra_head}</head>"
+            '<body><img src="static/cat.png"></body></html>'
+        )
+    return [
+        built_site_checks.PageToCheck(public_dir / f"{name}.html", None)
+        for name in ("a", "b")
+    ]
+
+
+def test_collect_resource_use(tmp_path: Path):
+    pages = _write_hinted_site(tmp_path)
+
+    page_resources = built_site_checks.collect_resource_use(
+        pages, tmp_path, built_site_checks.build_site_index(tmp_path)
+    )
+
+    assert page_resources[0] == resource_hints.PageResources(
+        "a.html",
+        (resource_hints.ResourceHint("preload", "/unused.woff2"),),
+        frozenset(
+            {
+                "/static/fonts/title.woff2",
+                "/static/site.css",
+                "/static/fonts/body.woff2",
+                "https://cdn.example.com/x.css",
+                "/static/missing.css",
+                "/static/cat.png",
+            }
+        ),
+        frozenset({"/static/fonts/title.woff2"}),
+    )
+    assert page_resources[1].hints == ()
+
+
+@pytest.mark.parametrize(
+    "shard_args,expected_missing",
+    [
+        ([], True),
+        (["--shard", "2/2"], False),
+    ],
+)
+def test_check_resource_hints_compares_the_whole_site(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    shard_args: list[str],
+    expected_missing: bool,
+):
+    monkeypatch.setattr(built_site_checks, "_PUBLIC_DIR", tmp_path)
+    all_pages = _write_hinted_site(tmp_path)
+    (tmp_path / "c.html").write_text(
+        '<html><head><link rel="prefetch" href="/d.png"></head></html>'
+    )
+    (tmp_path / "d.html").write_text('<body><img src="/d.png"></body>')
+    all_pages += [
+        built_site_checks.PageToCheck(tmp_path / f"{name}.html", None)
+        for name in ("c", "d")
+    ]
+    args = built_site_checks.parser.parse_args(shard_args)
+
+    found_issues = built_site_checks._check_resource_hints(
+        args,
+        all_pages,
+        [all_pages[2]],
+        built_site_checks.build_site_index(tmp_path),
+    )
+
+    # Only another page uses the prefetched image, and the wasted preload
+    # is on a page which wasn't selected
+    assert not any(
+        "wasted_resource_hints" in issues for _, issues in found_issues
+    )
+    assert bool(found_issues) == expected_missing
+
+
+def test_main_resource_hints(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    disable_md_requirement,
+    monkeypatch,
+):
+    public_dir = mock_environment["public_dir"]
+    _write_hinted_site(public_dir)
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    monkeypatch.setattr(
+        sys, "argv", ["built_site_checks.py", "--resource-hints"]
+    )
+
+    with (
+        patch.object(
+            built_site_checks, "check_file_for_issues", return_value={}
+        ),
+        patch.object(built_site_checks, "_print_issues") as mock_print,
+        pytest.raises(SystemExit),
+    ):
+        built_site_checks.main()
+
+    assert [call.args for call in mock_print.call_args_list] == [
+        (
+            public_dir / "a.html",
+            {
+                "wasted_resource_hints": [
+                    "preload /unused.woff2: the page doesn't use it"
+                ]
+            },
+        ),
+        (
+            public_dir,
+            {
+                "missing_resource_hints": [
+                    "font /static/fonts/title.woff2: in the critical CSS of "
+                    "2 pages, preloaded by 0",
+                    "origin https://cdn.example.com: used by 2 pages, "
+                    "preconnected to by 0",
+                ]
+            },
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "shard_args,reports", [([], True), (["--shard", "2/2"], False)]
+)
+def test_main_duplicate_payloads(
+    mock_environment,
+    valid_css_file,
+    robots_txt_file,
+    disable_md_requirement,
+    monkeypatch,
+    capsys,
+    shard_args: list[str],
+    reports: bool,
+):
+    _write_hinted_site(mock_environment["public_dir"])
+    monkeypatch.setattr(
+        script_utils, "build_html_to_md_map", lambda md_dir: {}
+    )
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "built_site_checks.py",
+            "--duplicate-payloads",
+            "--duplicate-payloads-min-pages",
+            "2",
+            *shard_args,
+        ],
+    )
+
+    with patch.object(
+        built_site_checks, "check_file_for_issues", return_value={}
+    ):
+        built_site_checks.main()
+
+    output = capsys.readouterr().out
+    assert ("<style> of 84B on 2 pages, e.g. a.html" in output) == reports
@@ -0,0 +1,149 @@
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+
+from .. import check_profiler
+
+
+def _profiler_with_spans() -> check_profiler.CheckProfiler:
+    profiler = check_profiler.CheckProfiler()
+    profiler.extend(
+        [
+            ("links", "a.html", 1.0),
+            ("links", "b.html", 3.0),
+            ("quotes", "a.html", 0.5),
+        ]
+    )
+    return profiler
+
+
+def test_run_records_span():
+    profiler = check_profiler.CheckProfiler()
+
+    result = profiler.run("add", "a.md", lambda x, y: x + y, 1, 2)
+
+    assert result == 3
+    [span] = profiler.spans
+    assert (span.check, span.path) == ("add", "a.md")
+    assert span.seconds >= 0
+
+
+def test_run_records_span_when_check_raises():
+    profiler = check_profiler.CheckProfiler()
+
+    def _fail() -> None:
+        raise ValueError("bad page")
+
+    with pytest.raises(ValueError, match="bad page"):
+        profiler.run("fail", "a.md", _fail)
+
+    assert [span.check for span in profiler.spans] == ["fail"]
+
+
+def test_totals():
+    profiler = _profiler_with_spans()
+
+    assert profiler.check_totals() == {
+        "links": check_profiler.Totals(4.0, 2),
+        "quotes": check_profiler.Totals(0.5, 1),
+    }
+    assert profiler.path_totals() == {
+        "a.html": check_profiler.Totals(1.5, 2),
+        "b.html": check_profiler.Totals(3.0, 1),
+    }
+
+
+def test_drain():
+    profiler = _profiler_with_spans()
+
+    spans = profiler.drain()
+
+    assert len(spans) == 3
+    assert all(isinstance(span, check_profiler.Span) for span in spans)
+    assert not profiler.spans
+
+
+def test_summary_lists_slowest_first():
+    summary = _profiler_with_spans().summary(top_n=1)
+
+    assert summary.splitlines() == [
+        "Slowest checks:",
+        "      4.000s       2 calls  links",
+        "Slowest files:",
+        "      3.000s       1 calls  b.html",
+    ]
+
+
+def test_export(tmp_path: Path):
+    output_path = tmp_path / "nested" / "profile.json"
+
+    _profiler_with_spans().export(output_path, "built_site_checks")
+
+    exported = json.loads(output_path.read_text())
+    assert exported["script"] == "built_site_checks"
+    assert exported["spans"][0] == {
+        "check": "links",
+        "path": "a.html",
+        "seconds": 1.0,
+    }
+
+
+def test_timer_without_profiler():
+    time_check = check_profiler.timer(Path("a.md"))
+
+    assert time_check("len", len, "abc") == 3
+    assert check_profiler.get_active_profiler() is None
+
+
+def test_timer_with_profiler():
+    profiler = check_profiler.CheckProfiler()
+    check_profiler.set_active_profiler(profiler)
+
+    time_check = check_profiler.timer(Path("a.md"))
+
+    assert time_check("len", len, "abc") == 3
+    assert [(span.check, span.path) for span in profiler.spans] == [
+        ("len", "a.md")
+    ]
+
+
+def _parse(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    check_profiler.add_arguments(parser, "some_checks")
+    return parser.parse_args(argv)
+
+
+def test_add_arguments_defaults():
+    args = _parse([])
+
+    assert not args.profile
+    assert args.profile_top == check_profiler.DEFAULT_TOP_N
+    assert args.profile_output.name == "some_checks_profile.json"
+
+
+def test_start_and_report(tmp_path: Path, capsys):
+    output_path = tmp_path / "profile.json"
+    args = _parse(["--profile", "--profile-output", str(output_path)])
+
+    profiler = check_profiler.start(args)
+    assert profiler is check_profiler.get_active_profiler()
+    check_profiler.timer(Path("a.md"))("len", len, "abc")
+    check_profiler.report(profiler, args, "some_checks")
+
+    output = capsys.readouterr().out
+    assert "Slowest checks:" in output
+    assert f"Wrote 1 spans to {output_path}" in output
+    assert json.loads(output_path.read_text())["script"] == "some_checks"
+
+
+def test_not_profiling(tmp_path: Path, capsys):
+    args = _parse(["--profile-output", str(tmp_path / "profile.json")])
+
+    profiler = check_profiler.start(args)
+    check_profiler.report(profiler, args, "some_checks")
+
+    assert profiler is None
+    assert capsys.readouterr().out == ""
+    assert not (tmp_path / "profile.json").exists()
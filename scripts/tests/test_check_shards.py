@@ -0,0 +1,112 @@
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+
+from .. import check_shards
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("1/1", check_shards.Shard(1, 1)), ("3/4", check_shards.Shard(3, 4))],
+)
+def test_parse_shard(value: str, expected: check_shards.Shard):
+    shard = check_shards.parse_shard(value)
+
+    assert shard == expected
+    assert str(shard) == value
+
+
+@pytest.mark.parametrize("value", ["", "2", "a/b", "1/2/3", "0/2", "3/2"])
+def test_parse_shard_rejects_bad_values(value: str):
+    with pytest.raises(argparse.ArgumentTypeError):
+        check_shards.parse_shard(value)
+
+
+def test_shards_partition_keys():
+    keys = [f"posts/{i}.html" for i in range(200)]
+    shards = [check_shards.Shard(number, 3) for number in (1, 2, 3)]
+
+    owners = [
+        [shard for shard in shards if check_shards.in_shard(key, shard)]
+        for key in keys
+    ]
+
+    assert all(len(key_owners) == 1 for key_owners in owners)
+    # Every shard gets a share of the work
+    for shard in shards:
+        assert sum(key_owners == [shard] for key_owners in owners) > 30
+
+
+def _write_shard_reports(
+    tmp_path: Path, total: int, issues_by_number: dict[int, list]
+) -> list[Path]:
+    report_paths = []
+    for number, issues in issues_by_number.items():
+        report_path = tmp_path / f"report-{number}.json"
+        check_shards.write_report(
+            report_path, check_shards.Shard(number, total), issues
+        )
+        report_paths.append(report_path)
+    return report_paths
+
+
+def test_merge_reports(tmp_path: Path, capsys):
+    issues = {"localhost_links": ["http://localhost:8000"]}
+    report_paths = _write_shard_reports(
+        tmp_path, 2, {1: [], 2: [("public/a.html", issues)]}
+    )
+    printed = []
+
+    exit_code = check_shards.merge_reports(
+        report_paths, lambda path, found: printed.append((path, found))
+    )
+
+    assert exit_code == 1
+    assert printed == [(Path("public/a.html"), issues)]
+    assert "Missing" not in capsys.readouterr().out
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_merge_clean_reports(tmp_path: Path):
+    report_paths = _write_shard_reports(tmp_path, 2, {1: [], 2: []})
+
+    assert check_shards.merge_reports(report_paths, print) == 0
+
+
+def test_merge_reports_with_missing_shard(tmp_path: Path, capsys):
+    report_paths = _write_shard_reports(tmp_path, 3, {2: []})
+
+    assert check_shards.merge_reports(report_paths, print) == 1
+    assert "Missing reports for shard 1/3, shard 3/3" in (
+        capsys.readouterr().out
+    )
+
+
+def test_merge_reports_with_different_shard_counts(tmp_path: Path, capsys):
+    report_paths = _write_shard_reports(
+        tmp_path, 2, {1: []}
+    ) + _write_shard_reports(tmp_path / "other", 3, {2: [], 3: []})
+
+    assert check_shards.merge_reports(report_paths, print) == 1
+    assert "disagree on the shard count: [2, 3]" in capsys.readouterr().out
+
+
+def test_merge_whole_site_report(tmp_path: Path, capsys):
+    report_path = tmp_path / "nested" / "report.json"
+    check_shards.write_report(report_path, None, [])
+
+    assert check_shards.merge_reports([report_path], print) == 0
+    assert not capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "contents", [json.dumps(["a", "list"]), json.dumps({"version": 0})]
+)
+def test_merge_rejects_other_files(tmp_path: Path, contents: str):
+    report_path = tmp_path / "report.json"
+    report_path.write_text(contents)
+
+    with pytest.raises(ValueError, match="not a shard report"):
+        check_shards.merge_reports([report_path], print)
@@ -430,3 +430,32 @@ Content with AVIF card_image.
             convert_markdown_yaml.main()
 
     mock_process.assert_called_once_with(md_file)
+
+
+def test_main_skips_files_without_convertible_card_image(mock_git_root):
+    content_dir = mock_git_root / "content"
+    content_dir.mkdir()
+    uploaded_file = content_dir / "uploaded.md"
+    uploaded_file.write_text(
+        "---\ntitle: Uploaded\n"
+        "card_image: https://assets.turntrout.com/static/image.png\n---\n"
+    )
+    plain_file = content_dir / "plain.md"
+    plain_file.write_text("No frontmatter here.\n")
+
+    with (
+        mock.patch(
+            "scripts.convert_markdown_yaml.process_card_image_in_markdown"
+        ) as mock_process,
+        mock.patch(
+            "scripts.convert_markdown_yaml.script_utils.get_files",
+            return_value=[uploaded_file, plain_file],
+        ),
+        mock.patch(
+            "sys.argv",
+            ["convert_markdown_yaml.py", "-d", str(content_dir)],
+        ),
+    ):
+        convert_markdown_yaml.main()
+
+    mock_process.assert_not_called()
@@ -0,0 +1,78 @@
+import argparse
+
+from .. import inline_payloads
+
+_STYLE = ("style", "<style>p { margin: 1em; }</style>")
+_ICON = ("svg", '<svg><path d="M0"></path></svg>')
+
+
+def _index_of(pages: dict[str, list[tuple[str, str]]]):
+    index: inline_payloads.PayloadIndex = {}
+    for page, payloads in pages.items():
+        inline_payloads.add_page(index, page, payloads)
+    return index
+
+
+def test_add_page_counts_pages():
+    index = _index_of(
+        {
+            "b.html": [_STYLE, _ICON, _ICON],
+            "a.html": [_ICON],
+            "c.html": [_ICON],
+        }
+    )
+
+    assert sorted(index.values()) == [
+        inline_payloads.PayloadStats("style", 33, 1, "b.html"),
+        inline_payloads.PayloadStats("svg", 31, 3, "a.html"),
+    ]
+    assert all(len(digest) == 8 for digest in index)
+
+
+def test_wasted_bytes():
+    stats = inline_payloads.PayloadStats("svg", 100, 4, "a.html")
+
+    assert stats.wasted_bytes == 300
+
+
+def test_duplicated_payloads_most_wasteful_first():
+    big_style = ("style", "<style>" + "a{}" * 100 + "</style>")
+    index = _index_of(
+        {
+            f"{page}.html": [_STYLE, _ICON, big_style][: page + 1]
+            for page in range(3)
+        }
+    )
+
+    assert [
+        stats.size for stats in inline_payloads.duplicated_payloads(index, 2)
+    ] == [33, 31]
+    assert inline_payloads.duplicated_payloads(index, 4) == []
+
+
+def test_summary():
+    index = _index_of({"a.html": [_ICON], "b.html": [_ICON, _STYLE]})
+
+    assert inline_payloads.summary(index, min_pages=2).splitlines() == [
+        "Inline payloads on at least 2 pages, by bytes wasted:",
+        "        31B wasted  <svg> of 31B on 2 pages, e.g. a.html",
+        "Total: 31B wasted",
+    ]
+
+
+def test_json_round_trip():
+    index = _index_of({"a.html": [_ICON], "b.html": [_ICON, _STYLE]})
+
+    assert inline_payloads.from_json(inline_payloads.to_json(index)) == index
+
+
+def test_add_arguments():
+    parser = argparse.ArgumentParser()
+    inline_payloads.add_arguments(parser)
+
+    args = parser.parse_args([])
+
+    assert not args.duplicate_payloads
+    assert (
+        args.duplicate_payloads_min_pages == inline_payloads.DEFAULT_MIN_PAGES
+    )
@@ -0,0 +1,76 @@
+import pytest
+
+from .. import markdown_segments
+from ..markdown_segments import Segment
+
+
+def test_segment_markdown_covers_text():
+    text = "Use `x` in $y$.\n\n```\ncode\n```\n$$\nz\n$$\nEnd"
+
+    segments = markdown_segments.segment_markdown(text)
+
+    assert segments == (
+        Segment("prose", 0, 4),
+        Segment("inline_code", 4, 7),
+        Segment("prose", 7, 11),
+        Segment("inline_math", 11, 14),
+        Segment("prose", 14, 17),
+        Segment("fenced_code", 17, 29),
+        Segment("prose", 29, 30),
+        Segment("display_math", 30, 37),
+        Segment("prose", 37, len(text)),
+    )
+    assert [text[s.start : s.end] for s in segments[1::2]] == [
+        "`x`",
+        "$y$",
+        "```\ncode\n```",
+        "$$\nz\n$$",
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "Costs $5",
+        "Escaped \\$5 and \\$6",
+        "A lone ` backtick",
+    ],
+)
+def test_segment_markdown_leaves_unpaired_delimiters_in_prose(text: str):
+    expected = (Segment("prose", 0, len(text)),) if text else ()
+    assert markdown_segments.segment_markdown(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text,kind",
+    [
+        ("```a `b` c```", "fenced_code"),
+        ("$$a $b$ c$$", "display_math"),
+    ],
+)
+def test_segment_markdown_prefers_blocks(text: str, kind: str):
+    assert markdown_segments.segment_markdown(text) == (
+        Segment(kind, 0, len(text)),
+    )
+
+
+def test_segment_markdown_is_cached_by_contents():
+    text = "Cached `code` and $math$"
+    first = markdown_segments.segment_markdown(text)
+
+    # An equal text read separately, e.g. by another check of the file
+    assert markdown_segments.segment_markdown("".join(list(text))) is first
+
+
+@pytest.mark.parametrize(
+    "replacement,expected",
+    [("", "Use  and .\n"), ("|", "Use | and |.\n")],
+)
+def test_strip_code_and_math(replacement: str, expected: str):
+    assert (
+        markdown_segments.strip_code_and_math(
+            "Use `x` and $y$.\n", replacement
+        )
+        == expected
+    )
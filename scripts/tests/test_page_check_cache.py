@@ -0,0 +1,158 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from .. import page_check_cache
+
+_INPUTS = page_check_cache.PageInputs(
+    html_hash="html",
+    md_hash="md",
+    dependencies={"b.html": "ids-b", "a.html": None},
+)
+_ISSUES = {"localhost_links": ["http://localhost"], "empty_body": False}
+
+
+def test_hash_bytes_separates_parts():
+    assert page_check_cache.hash_bytes("ab", "c") != (
+        page_check_cache.hash_bytes("a", "bc")
+    )
+    assert page_check_cache.hash_bytes("abc") == (
+        page_check_cache.hash_bytes(b"abc")
+    )
+
+
+def test_hash_strings_ignores_order():
+    assert page_check_cache.hash_strings(["a", "b"]) == (
+        page_check_cache.hash_strings({"b", "a"})
+    )
+
+
+def test_hash_file(tmp_path: Path):
+    file_path = tmp_path / "page.html"
+    file_path.write_text("<p>Hi</p>")
+    assert page_check_cache.hash_file(file_path) == (
+        page_check_cache.hash_bytes(b"<p>Hi</p>")
+    )
+
+
+def test_round_trip(tmp_path: Path):
+    cache_path = tmp_path / "nested" / "cache.json"
+    cache = page_check_cache.PageCheckCache.load(cache_path, "fingerprint")
+    assert cache.get("page.html", _INPUTS) is None
+    cache.put("page.html", _INPUTS, _ISSUES)
+    cache.save({"page.html"})
+
+    reloaded = page_check_cache.PageCheckCache.load(cache_path, "fingerprint")
+    assert reloaded.get("page.html", _INPUTS) == _ISSUES
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+    assert not cache_path.with_suffix(".tmp").exists()
+
+
+@pytest.mark.parametrize(
+    "changed_inputs",
+    [
+        _INPUTS._replace(html_hash="new html"),
+        _INPUTS._replace(md_hash=None),
+        _INPUTS._replace(dependencies={"b.html": "new ids", "a.html": None}),
+        _INPUTS._replace(dependencies={"b.html": "ids-b", "a.html": "now"}),
+    ],
+)
+def test_changed_inputs_miss(
+    tmp_path: Path, changed_inputs: page_check_cache.PageInputs
+):
+    cache = page_check_cache.PageCheckCache(tmp_path / "cache.json", "f")
+    cache.put("page.html", _INPUTS, _ISSUES)
+
+    assert cache.get("page.html", changed_inputs) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_dependency_order_does_not_matter(tmp_path: Path):
+    cache = page_check_cache.PageCheckCache(tmp_path / "cache.json", "f")
+    cache.put("page.html", _INPUTS, _ISSUES)
+    reordered = _INPUTS._replace(
+        dependencies={"a.html": None, "b.html": "ids-b"}
+    )
+    assert cache.get("page.html", reordered) == _ISSUES
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "not json",
+        json.dumps(["a", "list"]),
+        json.dumps({"version": -1, "fingerprint": "f", "pages": {}}),
+        json.dumps(
+            {
+                "version": page_check_cache.CACHE_FORMAT_VERSION,
+                "fingerprint": "other checker",
+                "pages": {"page.html": {}},
+            }
+        ),
+    ],
+)
+def test_load_discards_unusable_cache(tmp_path: Path, contents: str):
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text(contents)
+
+    cache = page_check_cache.PageCheckCache.load(cache_path, "f")
+
+    assert cache.get("page.html", _INPUTS) is None
+
+
+def test_load_missing_cache(tmp_path: Path):
+    cache = page_check_cache.PageCheckCache.load(tmp_path / "missing", "f")
+    assert cache.get("page.html", _INPUTS) is None
+
+
+def _saved_pages(cache_path: Path) -> dict:
+    return json.loads(cache_path.read_text())["pages"]
+
+
+def test_save_keeps_pages_not_checked(tmp_path: Path):
+    cache_path = tmp_path / "cache.json"
+    cache = page_check_cache.PageCheckCache(cache_path, "f")
+    cache.put("checked.html", _INPUTS, _ISSUES)
+    cache.put("other-shard.html", _INPUTS, _ISSUES)
+    cache.save({"checked.html", "other-shard.html"})
+
+    next_run = page_check_cache.PageCheckCache.load(cache_path, "f")
+    assert next_run.get("checked.html", _INPUTS) == _ISSUES
+    next_run.save({"checked.html", "other-shard.html"})
+
+    assert list(_saved_pages(cache_path)) == [
+        "checked.html",
+        "other-shard.html",
+    ]
+
+
+def test_save_drops_deleted_pages(tmp_path: Path):
+    cache_path = tmp_path / "cache.json"
+    cache = page_check_cache.PageCheckCache(cache_path, "f")
+    cache.put("kept.html", _INPUTS, _ISSUES)
+    cache.put("deleted.html", _INPUTS, _ISSUES)
+
+    cache.save({"kept.html"})
+
+    assert list(_saved_pages(cache_path)) == ["kept.html"]
+
+
+def test_save_merges_concurrent_shards(tmp_path: Path):
+    cache_path = tmp_path / "cache.json"
+    old_issues = {"empty_body": True}
+    cache = page_check_cache.PageCheckCache(cache_path, "f")
+    cache.put("a.html", _INPUTS, old_issues)
+    cache.put("b.html", _INPUTS, old_issues)
+    cache.save({"a.html", "b.html"})
+    first = page_check_cache.PageCheckCache.load(cache_path, "f")
+    second = page_check_cache.PageCheckCache.load(cache_path, "f")
+
+    first.put("a.html", _INPUTS, _ISSUES)
+    first.save({"a.html", "b.html"})
+    second.put("b.html", _INPUTS, _ISSUES)
+    second.save({"a.html", "b.html"})
+
+    assert {
+        key: entry["issues"] for key, entry in _saved_pages(cache_path).items()
+    } == {"a.html": _ISSUES, "b.html": _ISSUES}
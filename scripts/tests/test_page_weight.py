@@ -0,0 +1,131 @@
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+
+from .. import page_weight
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("512", 512),
+        ("512B", 512),
+        ("200KB", 200 * 1024),
+        ("200 kib", 200 * 1024),
+        ("1.5MiB", int(1.5 * 1024 * 1024)),
+        ("2g", 2 * 1024**3),
+    ],
+)
+def test_parse_size(value: str, expected: int):
+    assert page_weight.parse_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "KB", "-1", "1TB", "big"])
+def test_parse_size_rejects_bad_values(value: str):
+    with pytest.raises(ValueError):
+        page_weight.parse_size(value)
+
+
+def test_parse_budget():
+    assert page_weight.parse_budget("css=256KiB") == ("css", 256 * 1024)
+
+
+@pytest.mark.parametrize("value", ["fonts=1MB", "css", "css=lots"])
+def test_parse_budget_rejects_bad_values(value: str):
+    with pytest.raises(argparse.ArgumentTypeError):
+        page_weight.parse_budget(value)
+
+
+@pytest.mark.parametrize(
+    "num_bytes,expected",
+    [(0, "0B"), (1023, "1023B"), (1536, "1.5KiB"), (3 * 1024**2, "3.0MiB")],
+)
+def test_format_size(num_bytes: int, expected: str):
+    assert page_weight.format_size(num_bytes) == expected
+
+
+def test_measure_page():
+    sizes = {"/a.css": 100, "/b.js": 20, "/c.png": 3000}
+
+    weight = page_weight.measure_page(
+        "index.html",
+        html_bytes=5,
+        resources=[
+            ("css", "/a.css"),
+            ("js", "/b.js"),
+            ("media", "/c.png"),
+            # Loaded twice, but only downloaded once
+            ("media", "/c.png"),
+            ("media", "https://cdn.example.com/d.png"),
+        ],
+        size_of=sizes.get,
+    )
+
+    assert weight == page_weight.PageWeight(
+        "index.html",
+        {"html": 5, "css": 100, "js": 20, "media": 3000},
+        ("https://cdn.example.com/d.png",),
+    )
+    assert weight.total == 3125
+
+
+def test_over_budget():
+    weight = page_weight.PageWeight(
+        "index.html", {"html": 10, "css": 2048, "js": 0, "media": 0}
+    )
+
+    assert page_weight.over_budget(
+        weight, {"html": 10, "css": 1024, "total": 1536}
+    ) == ["css: 2.0KiB > 1.0KiB", "total: 2.0KiB > 1.5KiB"]
+    assert not page_weight.over_budget(weight, page_weight.DEFAULT_BUDGETS)
+
+
+_WEIGHTS = [
+    page_weight.PageWeight(
+        "light.html", {"html": 10, "css": 0, "js": 0, "media": 0}
+    ),
+    page_weight.PageWeight(
+        "heavy.html",
+        {"html": 2048, "css": 0, "js": 0, "media": 0},
+        ("https://cdn.example.com/d.png",),
+    ),
+]
+
+
+def test_summary_lists_heaviest_first():
+    lines = page_weight.summary(_WEIGHTS, top_n=1).splitlines()
+
+    assert lines == [
+        "Heaviest pages:",
+        "     2.0KiB  heavy.html  [html 2.0KiB, css 0B, js 0B, media 0B]"
+        " (+1 unsized)",
+    ]
+
+
+def test_write_report(tmp_path: Path):
+    output_path = tmp_path / "nested" / "weights.json"
+
+    page_weight.write_report(output_path, _WEIGHTS)
+
+    report = json.loads(output_path.read_text())
+    assert [entry["path"] for entry in report] == ["heavy.html", "light.html"]
+    assert report[0]["total"] == 2048
+    assert report[0]["unsized"] == ["https://cdn.example.com/d.png"]
+    assert not list(output_path.parent.glob("*.tmp"))
+
+
+def test_budgets_from_args():
+    parser = argparse.ArgumentParser()
+    page_weight.add_arguments(parser)
+
+    args = parser.parse_args(
+        ["--page-weight-budget", "css=1KB", "--page-weight-budget", "js=2KB"]
+    )
+
+    assert page_weight.budgets_from_args(args) == {
+        **page_weight.DEFAULT_BUDGETS,
+        "css": 1024,
+        "js": 2048,
+    }
@@ -0,0 +1,137 @@
+import os
+import time
+from pathlib import Path
+
+import brotli  # type: ignore[import]
+import pytest
+import zstandard
+
+from .. import precompress
+
+_HTML = "<p>Some compressible text.</p>" * 100
+
+
+@pytest.fixture
+def public_dir(tmp_path: Path) -> Path:
+    (tmp_path / "static").mkdir()
+    (tmp_path / "index.html").write_text(_HTML)
+    (tmp_path / "static" / "styles.CSS").write_text("p { margin: 0; }" * 50)
+    (tmp_path / "static" / "cat.png").write_bytes(b"\x89PNG")
+    return tmp_path
+
+
+def _touch_later(path: Path) -> None:
+    later = time.time_ns() + 10**9
+    os.utime(path, ns=(later, later))
+
+
+def test_compressible_files(public_dir: Path):
+    assert precompress.compressible_files(public_dir) == [
+        public_dir / "index.html",
+        public_dir / "static" / "styles.CSS",
+    ]
+
+
+def test_compress_file_writes_copies(public_dir: Path):
+    path = public_dir / "index.html"
+
+    results = precompress.compress_file(path)
+
+    assert [result.encoding for result in results] == [".br", ".zst"]
+    assert all(result.file_type == ".html" for result in results)
+    assert all(
+        result.compressed_bytes < result.original_bytes == len(_HTML)
+        for result in results
+    )
+    assert brotli.decompress((public_dir / "index.html.br").read_bytes()) == (
+        _HTML.encode()
+    )
+    assert zstandard.ZstdDecompressor().decompress(
+        (public_dir / "index.html.zst").read_bytes()
+    ) == (_HTML.encode())
+    assert not list(public_dir.glob("*.tmp"))
+
+
+def test_compress_file_skips_fresh_copies(public_dir: Path):
+    path = public_dir / "index.html"
+    precompress.compress_file(path)
+
+    assert not precompress.compress_file(path)
+    assert len(precompress.compress_file(path, force=True)) == 2
+
+
+def test_compress_file_replaces_stale_copies(public_dir: Path):
+    path = public_dir / "index.html"
+    precompress.compress_file(path)
+    (public_dir / "index.html.zst").unlink()
+    _touch_later(public_dir / "index.html.br")
+
+    assert [result.encoding for result in precompress.compress_file(path)] == [
+        ".zst"
+    ]
+
+    _touch_later(path)
+    assert len(precompress.compress_file(path)) == 2
+
+
+def test_stale_files(public_dir: Path):
+    assert precompress.stale_files(public_dir) == (
+        precompress.compressible_files(public_dir)
+    )
+
+    precompress.precompress_site(public_dir)
+    assert not precompress.stale_files(public_dir)
+
+    _touch_later(public_dir / "index.html")
+    assert precompress.stale_files(public_dir) == [public_dir / "index.html"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_precompress_site(public_dir: Path, jobs: int):
+    results = precompress.precompress_site(public_dir, jobs=jobs)
+
+    assert sorted(
+        (result.file_type, result.encoding) for result in results
+    ) == [
+        (".css", ".br"),
+        (".css", ".zst"),
+        (".html", ".br"),
+        (".html", ".zst"),
+    ]
+    assert not precompress.precompress_site(public_dir, jobs=jobs)
+
+
+def test_summary():
+    results = [
+        precompress.CompressionResult(".html", ".br", 3 * 2**20, 2**20, 0.5),
+        precompress.CompressionResult(".html", ".br", 2**20, 2**20, 0.5),
+        precompress.CompressionResult(".css", ".zst", 2048, 512, 0.0),
+    ]
+
+    assert precompress.summary(results).splitlines() == [
+        "Type   Encoding  Files  Original -> Compressed  Ratio  MiB/s",
+        ".css   .zst          1    2.0KiB ->       512B   4.00    0.0",
+        ".html  .br           2    4.0MiB ->     2.0MiB   2.00    4.0",
+    ]
+
+
+def test_summary_without_results():
+    assert precompress.summary([]) == "All compressed copies are fresh."
+
+
+def test_main(public_dir: Path, capsys):
+    precompress.main(["--public-dir", str(public_dir), "--jobs", "1"])
+
+    output = capsys.readouterr().out
+    assert ".html  .br           1" in output
+    assert "Wrote 4 compressed copies" in output
+    assert (public_dir / "static" / "styles.CSS.zst").is_file()
+
+
+def test_main_defaults_to_git_root(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(
+        precompress.script_utils, "get_git_root", lambda: tmp_path
+    )
+
+    with pytest.raises(FileNotFoundError, match="build first"):
+        precompress.main([])
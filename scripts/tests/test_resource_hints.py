@@ -0,0 +1,121 @@
+import pytest
+
+from .. import resource_hints
+
+_Hint = resource_hints.ResourceHint
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        (
+            "https://fonts.googleapis.com/css2?a=b",
+            "https://fonts.googleapis.com",
+        ),
+        ("http://example.com", "http://example.com"),
+        ("/static/font.woff2", None),
+        ("data:font/woff2;base64,AAAA", None),
+    ],
+)
+def test_origin(url: str, expected: str | None):
+    assert resource_hints.origin(url) == expected
+
+
+def test_font_face_urls():
+    css = """
+    body { background: url(/not-a-font.png); }
+    @font-face {
+      font-family: "A";
+      src: url("fonts/a.woff2") format("woff2"), url('/b.woff') format("woff");
+    }
+    @FONT-FACE { src: url(data:font/woff2;base64,AAAA); }
+    @font-face { src: url( https://cdn.example.com/c.woff2 ); }
+    """
+
+    assert resource_hints.font_face_urls(css, "/static/index.css") == {
+        "/static/fonts/a.woff2",
+        "/b.woff",
+        "https://cdn.example.com/c.woff2",
+    }
+
+
+def test_hints_from_links():
+    links = [
+        {"rel": "preload", "as": "font", "href": "font.woff2"},
+        {"rel": "stylesheet Preload", "href": "/index.css"},
+        {"rel": "prefetch", "href": "/next.html"},
+        {"rel": "preconnect", "href": "https://cdn.example.com"},
+        {"rel": "icon", "href": "/favicon.ico"},
+        {"rel": "preload"},
+    ]
+
+    assert resource_hints.hints_from_links(links, "/posts/post.html") == (
+        _Hint("preload", "/posts/font.woff2"),
+        _Hint("preload", "/index.css"),
+        _Hint("prefetch", "/next.html"),
+        _Hint("preconnect", "https://cdn.example.com"),
+    )
+
+
+def _page(
+    hints: tuple = (),
+    used: frozenset[str] = frozenset(),
+    critical_fonts: frozenset[str] = frozenset(),
+) -> resource_hints.PageResources:
+    return resource_hints.PageResources(
+        "page.html", hints, used | critical_fonts, critical_fonts
+    )
+
+
+def test_wasted_hints():
+    page = _page(
+        hints=(
+            _Hint("preload", "/used.woff2"),
+            _Hint("preload", "/unused.woff2"),
+            _Hint("prefetch", "/elsewhere.css"),
+            _Hint("prefetch", "/nowhere.css"),
+            _Hint("preconnect", "https://cdn.example.com"),
+            _Hint("preconnect", "https://idle.example.com"),
+            _Hint("preconnect", "https://fonts.gstatic.com"),
+        ),
+        used=frozenset({"/used.woff2", "https://cdn.example.com/lib.js"}),
+    )
+
+    assert resource_hints.wasted_hints(
+        page, site_used=page.used | {"/elsewhere.css"}
+    ) == [
+        "preload /unused.woff2: the page doesn't use it",
+        "prefetch /nowhere.css: no page uses it",
+        "preconnect https://idle.example.com: nothing on the page loads "
+        "from there",
+    ]
+
+
+def test_missing_hints():
+    font = "/static/fonts/body.woff2"
+    cdn_url = "https://cdn.example.com/lib.js"
+    pages = [
+        # Hints both
+        _page(
+            hints=(
+                _Hint("preload", font),
+                _Hint("preconnect", "https://cdn.example.com"),
+            ),
+            used=frozenset({cdn_url}),
+            critical_fonts=frozenset({font}),
+        ),
+        # Hints neither
+        _page(used=frozenset({cdn_url}), critical_fonts=frozenset({font})),
+        # Uses a rare font and origin
+        _page(
+            used=frozenset({"https://rare.example.com/a.png"}),
+            critical_fonts=frozenset({"/rare.woff2"}),
+        ),
+    ]
+
+    assert resource_hints.missing_hints(pages) == [
+        f"font {font}: in the critical CSS of 2 pages, preloaded by 1",
+        "origin https://cdn.example.com: used by 2 pages, preconnected to by 1",
+    ]
+    assert not resource_hints.missing_hints(pages[:1])
+    assert not resource_hints.missing_hints([])
@@ -762,6 +762,11 @@ def test_get_check_steps():
     assert any(
         step.name.startswith("Checking HTML files") for step in steps_after
     )
+    # The HTML checks verify the compressed copies which precompressing writes
+    step_names = [step.name for step in steps_after]
+    assert step_names.index("Precompressing the built site") < (
+        step_names.index("Checking HTML files")
+    )
 
     # Verify paths are properly configured
     for step in steps_before + steps_after:
@@ -2,7 +2,10 @@
 Test the utilities used for running the tests :)
 """
 
+import json
+import os
 import subprocess
+from datetime import date, datetime
 from pathlib import Path
 from typing import Optional
 from unittest import mock
@@ -202,6 +205,89 @@ def test_get_files_gitignore(tmp_path):
         pytest.skip("Git not installed or not in PATH")
 
 
+def test_git_ignored_files_matches_per_file_checks(tmp_path: Path) -> None:
+    repo = git.Repo.init(tmp_path)
+    (tmp_path / ".gitignore").write_text("*.txt\nbuild/\n!keep.txt\n")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / ".gitignore").write_text("draft-*\n")
+    names = [
+        "a.md",
+        "a.txt",
+        "keep.txt",
+        "tracked.txt",
+        "build/out.md",
+        "docs/draft-1.md",
+        "docs/final.md",
+        "docs/with space.txt",
+    ]
+    for name in names:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+    # Tracked files aren't ignored, even if they match a pattern
+    repo.index.add([".gitignore", "tracked.txt"])
+    repo.index.commit("Initial commit")
+
+    ignored = script_utils.git_ignored_files(
+        tmp_path, [Path(name) for name in names]
+    )
+
+    assert (
+        ignored
+        == {name for name in names if repo.ignored(name)}
+        == {"a.txt", "build/out.md", "docs/draft-1.md", "docs/with space.txt"}
+    )
+
+
+def test_git_ignored_files_without_files(tmp_path: Path) -> None:
+    assert script_utils.git_ignored_files(tmp_path, []) == set()
+
+
+def test_git_ignored_files_outside_repo(tmp_path: Path) -> None:
+    with pytest.raises(subprocess.CalledProcessError):
+        script_utils.git_ignored_files(tmp_path, [Path("a.md")])
+
+
+def test_get_files_outside_repo_keeps_all_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a.md").write_text("a")
+    monkeypatch.setattr(
+        script_utils, "get_git_root", lambda starting_dir: tmp_path
+    )
+
+    assert script_utils.get_files(dir_to_search=tmp_path) == (
+        tmp_path / "a.md",
+    )
+
+
+def test_get_changed_files(tmp_path: Path) -> None:
+    repo = git.Repo.init(tmp_path)
+    for name in ("edited.md", "deleted.md", "same.md"):
+        (tmp_path / name).write_text(name)
+    repo.index.add(["edited.md", "deleted.md", "same.md"])
+    repo.index.commit("Initial commit")
+    (tmp_path / "edited.md").write_text("new text")
+    (tmp_path / "deleted.md").unlink()
+    (tmp_path / "new.md").write_text("new file")
+
+    changed = script_utils.get_changed_files("HEAD", tmp_path)
+
+    assert changed == {
+        (tmp_path / name).resolve()
+        for name in ("edited.md", "deleted.md", "new.md")
+    }
+
+
+def test_get_changed_files_bad_ref(tmp_path: Path) -> None:
+    repo = git.Repo.init(tmp_path)
+    (tmp_path / "a.md").write_text("a")
+    repo.index.add(["a.md"])
+    repo.index.commit("Initial commit")
+
+    with pytest.raises(ValueError, match="'no-such-ref'"):
+        script_utils.get_changed_files("no-such-ref", tmp_path)
+
+
 def test_get_files_ignore_dirs(tmp_path):
     """
     Test that specified directories are ignored.
@@ -536,6 +622,48 @@ def test_parse_html_file(tmp_path: Path) -> None:
     assert soup.find("h1") is not None
 
 
+@pytest.mark.parametrize(
+    "env_value,expected_parser",
+    [(None, "html.parser"), ("html.parser", "html.parser"), ("lxml", "lxml")],
+)
+def test_get_html_parser(
+    monkeypatch: pytest.MonkeyPatch,
+    env_value: Optional[str],
+    expected_parser: str,
+) -> None:
+    if env_value is None:
+        monkeypatch.delenv(script_utils.HTML_PARSER_ENV_VAR, raising=False)
+    else:
+        monkeypatch.setenv(script_utils.HTML_PARSER_ENV_VAR, env_value)
+    assert script_utils.get_html_parser() == expected_parser
+
+
+def test_get_html_parser_rejects_unknown_backend(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv(script_utils.HTML_PARSER_ENV_VAR, "html5lib")
+    with pytest.raises(ValueError, match="Unsupported HTML parser 'html5lib'"):
+        script_utils.get_html_parser()
+
+
+@pytest.mark.parametrize("use_env", [True, False])
+def test_parse_html_file_uses_selected_backend(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_env: bool
+) -> None:
+    test_file = tmp_path / "test.html"
+    test_file.write_text("<p>Test</p>")
+    monkeypatch.delenv(script_utils.HTML_PARSER_ENV_VAR, raising=False)
+
+    with mock.patch.object(script_utils, "BeautifulSoup") as mock_soup:
+        if use_env:
+            monkeypatch.setenv(script_utils.HTML_PARSER_ENV_VAR, "lxml")
+            script_utils.parse_html_file(test_file)
+        else:
+            script_utils.parse_html_file(test_file, "lxml")
+
+    mock_soup.assert_called_once_with("<p>Test</p>", "lxml")
+
+
 def test_is_redirect() -> None:
     """
     Test detection of redirect pages.
@@ -897,3 +1025,321 @@ def test_collect_aliases(
 
     # Check results
     assert result == expected_aliases
+
+
+# Fields which the read-only callers of `read_frontmatter` use
+_FRONTMATTER_FIELDS = (
+    "title",
+    "permalink",
+    "aliases",
+    "description",
+    "tags",
+    "card_image",
+    "date_published",
+    "date_updated",
+    "next-post-slug",
+    "prev-post-slug",
+    "next-post-title",
+    "prev-post-title",
+)
+
+
+@pytest.mark.parametrize(
+    "frontmatter",
+    [
+        'title: "Quoted: title"\npermalink: /page\n',
+        "title: Plain\naliases: [a, 'b', \"c\"]\ntags:\n  - ai\n  - math\n",
+        "permalink: page\naliases:\n  - old-page\n  -\n",
+        "description: >-\n  Folded\n  text\ncard_image: https://a.com/x.png\n",
+        "date_published: 2024-10-12 00:00:00\ndate_updated: 2024-10-13\n",
+        "next-post-slug: b # a comment\nprev-post-title: 'It''s A'\n",
+    ],
+)
+def test_read_frontmatter_agrees_with_split_yaml(
+    tmp_path: Path, frontmatter: str
+) -> None:
+    md_file = tmp_path / "page.md"
+    md_file.write_text(f"---\n{frontmatter}---\nBody\n")
+
+    metadata = script_utils.read_frontmatter(md_file)
+
+    assert type(metadata) is dict
+    round_trip, _ = script_utils.split_yaml(md_file)
+    for field in _FRONTMATTER_FIELDS:
+        assert metadata.get(field) == round_trip.get(field), field
+
+
+def test_read_frontmatter_agrees_on_site_content() -> None:
+    md_files = sorted((script_utils.get_git_root() / "content").rglob("*.md"))
+
+    for md_file in md_files:
+        metadata = script_utils.read_frontmatter(md_file)
+        round_trip, _ = script_utils.split_yaml(md_file)
+        for field in _FRONTMATTER_FIELDS:
+            assert metadata.get(field) == round_trip.get(field), (
+                md_file,
+                field,
+            )
+
+
+@pytest.mark.parametrize(
+    "text,expected_output",
+    [
+        ("No frontmatter here", "Skipping"),
+        ("---\n---\nBody", ""),
+        ("---\ntitle: [unclosed\n---\nBody", "Error parsing YAML"),
+    ],
+)
+def test_read_frontmatter_without_metadata(
+    tmp_path: Path, capsys, text: str, expected_output: str
+) -> None:
+    md_file = tmp_path / "page.md"
+    md_file.write_text(text)
+
+    assert script_utils.read_frontmatter(md_file, verbose=True) == {}
+    assert expected_output in capsys.readouterr().out
+
+
+def _write_md(path: Path, frontmatter: str) -> Path:
+    path.write_text(f"---\n{frontmatter}---\nBody\n")
+    return path
+
+
+def _shift_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_write_json_atomically(tmp_path: Path) -> None:
+    output_path = tmp_path / "nested" / "data.json"
+
+    script_utils.write_json_atomically(output_path, {"a": [1, 2]})
+    script_utils.write_json_atomically(output_path, {"b": 3})
+
+    assert json.loads(output_path.read_text()) == {"b": 3}
+    assert list(output_path.parent.iterdir()) == [output_path]
+
+
+def test_write_json_atomically_keeps_old_file_on_error(
+    tmp_path: Path,
+) -> None:
+    output_path = tmp_path / "data.json"
+    output_path.write_text('{"old": true}')
+
+    with pytest.raises(TypeError):
+        script_utils.write_json_atomically(output_path, {"bad": object()})
+
+    assert json.loads(output_path.read_text()) == {"old": True}
+    assert list(tmp_path.iterdir()) == [output_path]
+
+
+def test_write_text_atomically_removes_temp_file_on_error(
+    tmp_path: Path,
+) -> None:
+    output_path = tmp_path / "style.css"
+
+    with (
+        mock.patch.object(script_utils.os, "replace", side_effect=OSError),
+        pytest.raises(OSError),
+    ):
+        script_utils.write_text_atomically(output_path, "p {}")
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_frontmatter_index_reuses_unchanged_files(tmp_path: Path) -> None:
+    md_file = _write_md(tmp_path / "a.md", "title: A\npermalink: a\n")
+    index = script_utils.FrontmatterIndex(cache_path=None)
+
+    assert index.get(md_file) == {"title": "A", "permalink": "a"}
+    with mock.patch.object(
+        script_utils, "read_frontmatter", side_effect=AssertionError
+    ):
+        assert index.get(md_file) == {"title": "A", "permalink": "a"}
+    assert (index.hits, index.misses) == (1, 1)
+
+
+def test_frontmatter_index_persists(tmp_path: Path) -> None:
+    md_file = _write_md(
+        tmp_path / "a.md",
+        "date_published: 2024-10-12 01:02:03\ndate_updated: 2024-10-13\n"
+        "aliases: [b, c]\ncount: 3\nratio: 0.5\ndraft: true\nnone:\n",
+    )
+    cache_path = tmp_path / "nested" / "index.json"
+    first = script_utils.FrontmatterIndex(cache_path)
+    expected = first.get(md_file)
+    first.save()
+
+    second = script_utils.FrontmatterIndex(cache_path)
+    with mock.patch.object(
+        script_utils, "read_frontmatter", side_effect=AssertionError
+    ):
+        loaded = second.get(md_file)
+
+    assert loaded == expected == script_utils.read_frontmatter(md_file)
+    assert isinstance(loaded["date_published"], datetime)
+    assert isinstance(loaded["date_updated"], date)
+    assert not list(cache_path.parent.glob("*.tmp"))
+
+
+def test_frontmatter_index_reparses_edited_files(tmp_path: Path) -> None:
+    md_file = _write_md(tmp_path / "a.md", "title: A\n")
+    index = script_utils.FrontmatterIndex(cache_path=None)
+    index.get(md_file)
+
+    _write_md(md_file, "title: Edited\n")
+    _shift_mtime(md_file)
+
+    assert index.get(md_file) == {"title": "Edited"}
+    assert index.misses == 2
+
+
+def test_frontmatter_index_rehashes_touched_files(tmp_path: Path) -> None:
+    md_file = _write_md(tmp_path / "a.md", "title: A\n")
+    cache_path = tmp_path / "index.json"
+    index = script_utils.FrontmatterIndex(cache_path)
+    index.get(md_file)
+    index.save()
+
+    _shift_mtime(md_file)
+    with mock.patch.object(
+        script_utils, "read_frontmatter", side_effect=AssertionError
+    ):
+        assert index.get(md_file) == {"title": "A"}
+    index.save()
+
+    # The new mtime was saved, so the file isn't hashed again
+    reloaded = script_utils.FrontmatterIndex(cache_path)
+    with mock.patch.object(
+        script_utils.hashlib, "sha256", side_effect=AssertionError
+    ):
+        assert reloaded.get(md_file) == {"title": "A"}
+
+
+def test_frontmatter_index_returns_copies(tmp_path: Path) -> None:
+    md_file = _write_md(tmp_path / "a.md", "tags: [a]\n")
+    index = script_utils.FrontmatterIndex(cache_path=None)
+    index.get(md_file)
+
+    index.get(md_file)["tags"].append("b")
+
+    assert index.get(md_file) == {"tags": ["a"]}
+
+
+@pytest.mark.parametrize(
+    "frontmatter", ["1: integer key\n", "data: !!binary aGk=\n"]
+)
+def test_frontmatter_index_skips_unindexable_values(
+    tmp_path: Path, frontmatter: str
+) -> None:
+    md_file = _write_md(tmp_path / "a.md", frontmatter)
+    index = script_utils.FrontmatterIndex(cache_path=None)
+
+    assert index.get(md_file) == index.get(md_file)
+    assert index.misses == 2
+
+
+def test_frontmatter_index_save_drops_deleted_files(tmp_path: Path) -> None:
+    kept = _write_md(tmp_path / "kept.md", "title: Kept\n")
+    deleted = _write_md(tmp_path / "deleted.md", "title: Deleted\n")
+    cache_path = tmp_path / "index.json"
+    index = script_utils.FrontmatterIndex(cache_path)
+    index.get(kept)
+    index.get(deleted)
+    index.save()
+
+    deleted.unlink()
+    script_utils.FrontmatterIndex(cache_path).save()
+
+    files = json.loads(cache_path.read_text())["files"]
+    assert list(files) == [str(kept.resolve())]
+
+
+def test_frontmatter_index_save_skips_unchanged_index(tmp_path: Path) -> None:
+    md_file = _write_md(tmp_path / "a.md", "title: A\n")
+    cache_path = tmp_path / "index.json"
+    index = script_utils.FrontmatterIndex(cache_path)
+    index.get(md_file)
+    index.save()
+
+    reloaded = script_utils.FrontmatterIndex(cache_path)
+    reloaded.get(md_file)
+    with mock.patch.object(
+        script_utils.json, "dump", side_effect=AssertionError
+    ):
+        reloaded.save()
+    script_utils.FrontmatterIndex(cache_path=None).save()
+
+
+@pytest.mark.parametrize(
+    "contents",
+    ["not json", json.dumps(["a", "list"]), json.dumps({"version": 0})],
+)
+def test_frontmatter_index_ignores_other_files(
+    tmp_path: Path, contents: str
+) -> None:
+    md_file = _write_md(tmp_path / "a.md", "title: A\n")
+    cache_path = tmp_path / "index.json"
+    cache_path.write_text(contents)
+
+    index = script_utils.FrontmatterIndex(cache_path)
+
+    assert index.get(md_file) == {"title": "A"}
+    assert index.stats() == (
+        "Frontmatter index: 0 hits, 1 misses, 1 files indexed"
+    )
+
+
+def test_shared_frontmatter_index() -> None:
+    script_utils.set_frontmatter_index(None)
+
+    index = script_utils.get_frontmatter_index()
+
+    assert index.cache_path == script_utils.DEFAULT_FRONTMATTER_INDEX_PATH
+    assert script_utils.get_frontmatter_index() is index
+
+
+def test_build_html_to_md_map_uses_shared_index(tmp_path: Path) -> None:
+    _write_md(tmp_path / "a.md", "permalink: /a/\naliases: [old-a]\n")
+    index = script_utils.get_frontmatter_index()
+
+    assert script_utils.build_html_to_md_map(tmp_path) == {
+        "a": tmp_path / "a.md"
+    }
+    assert script_utils.collect_aliases(tmp_path) == {"old-a"}
+    assert (index.hits, index.misses) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "offset,expected",
+    [
+        (0, (1, 1)),
+        (2, (1, 3)),
+        # A newline belongs to the line it ends
+        (3, (1, 4)),
+        (4, (2, 1)),
+        (5, (3, 1)),
+        (9, (3, 5)),
+        # The end of the text
+        (10, (3, 6)),
+    ],
+)
+def test_line_index_line_col(offset: int, expected: tuple[int, int]) -> None:
+    line_index = script_utils.LineIndex("abc\n\nde{f}")
+
+    assert line_index.line_col(offset) == expected
+    assert line_index.location(offset) == f"{expected[0]}:{expected[1]}"
+
+
+@pytest.mark.parametrize(
+    "offset,expected", [(0, "abc"), (3, "abc"), (4, ""), (7, "de{f}")]
+)
+def test_line_index_line(offset: int, expected: str) -> None:
+    assert script_utils.LineIndex("abc\n\nde{f}").line(offset) == expected
+
+
+def test_line_index_empty_text() -> None:
+    line_index = script_utils.LineIndex("")
+
+    assert line_index.location(0) == "1:1"
+    assert line_index.line(0) == ""
@@ -0,0 +1,108 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from .. import scss_cache
+
+
+def _write_styles(styles_dir: Path) -> Path:
+    styles_dir.mkdir(exist_ok=True)
+    (styles_dir / "_mixins.scss").write_text("@use 'fonts';\n")
+    (styles_dir / "fonts.scss").write_text(
+        '@use "sass:math";\n@use "./variables.scss" as *;\n@use "mixins";\n'
+        "body { margin: $base-margin; }\n"
+    )
+    (styles_dir / "variables.scss").write_text("$base-margin: 8px;\n")
+    return styles_dir / "fonts.scss"
+
+
+def test_sources_hash_follows_imports(tmp_path: Path):
+    fonts = _write_styles(tmp_path)
+    original = scss_cache.sources_hash(fonts)
+
+    # Stable, even though fonts and mixins import each other
+    assert scss_cache.sources_hash(fonts) == original
+
+    (tmp_path / "variables.scss").write_text("$base-margin: 9px;\n")
+    edited = scss_cache.sources_hash(fonts)
+    assert edited != original
+
+    (tmp_path / "_mixins.scss").write_text("// No imports\n")
+    assert scss_cache.sources_hash(fonts) not in (original, edited)
+
+
+def test_sources_hash_notices_created_imports(tmp_path: Path):
+    fonts = _write_styles(tmp_path)
+    (tmp_path / "variables.scss").unlink()
+    before = scss_cache.sources_hash(fonts)
+
+    # e.g. the build generating the variables
+    (tmp_path / "variables.scss").write_text("")
+
+    assert scss_cache.sources_hash(fonts) != before
+
+
+def test_sources_hash_ignores_location(tmp_path: Path):
+    first = _write_styles(tmp_path / "first")
+    second = _write_styles(tmp_path / "second")
+
+    assert scss_cache.sources_hash(first) == scss_cache.sources_hash(second)
+
+
+def test_cache_compiles_unchanged_styles_once(tmp_path: Path):
+    fonts = _write_styles(tmp_path / "styles")
+    compile_scss = MagicMock(return_value="body{}")
+    cache = scss_cache.ScssCache(cache_dir=None)
+
+    assert cache.get(fonts, compile_scss) == "body{}"
+    assert cache.get(fonts, compile_scss) == "body{}"
+
+    compile_scss.assert_called_once_with(fonts)
+    assert cache.stats() == "Compiled SCSS cache: 1 hits, 1 misses"
+
+
+def test_cache_persists_between_runs(tmp_path: Path):
+    fonts = _write_styles(tmp_path / "styles")
+    cache_dir = tmp_path / "cache"
+    scss_cache.ScssCache(cache_dir).get(fonts, lambda _: "body{}")
+
+    compile_scss = MagicMock()
+    cache = scss_cache.ScssCache(cache_dir)
+
+    assert cache.get(fonts, compile_scss) == "body{}"
+    compile_scss.assert_not_called()
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert [path.suffix for path in cache_dir.iterdir()] == [".css"]
+
+
+def test_cache_recompiles_changed_imports(tmp_path: Path):
+    fonts = _write_styles(tmp_path / "styles")
+    cache = scss_cache.ScssCache(tmp_path / "cache")
+    cache.get(fonts, lambda _: "old")
+
+    (tmp_path / "styles" / "variables.scss").write_text("$base-margin: 0;")
+
+    assert cache.get(fonts, lambda _: "new") == "new"
+    assert cache.misses == 2
+
+
+def test_cache_skips_errors(tmp_path: Path):
+    fonts = _write_styles(tmp_path / "styles")
+    cache_dir = tmp_path / "cache"
+    cache = scss_cache.ScssCache(cache_dir)
+
+    with pytest.raises(ValueError):
+        cache.get(fonts, MagicMock(side_effect=ValueError("bad scss")))
+
+    assert cache.get(fonts, lambda _: "body{}") == "body{}"
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_shared_scss_cache():
+    scss_cache.set_scss_cache(None)
+
+    cache = scss_cache.get_scss_cache()
+
+    assert cache.cache_dir == scss_cache.DEFAULT_SCSS_CACHE_DIR
+    assert scss_cache.get_scss_cache() is cache
@@ -1,3 +1,4 @@
+import json
 import sys
 import tempfile
 from pathlib import Path
@@ -8,6 +9,7 @@ import git  # type: ignore[import]
 import pytest
 import requests  # type: ignore[import]
 
+from .. import check_profiler
 from .. import utils as script_utils
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -260,6 +262,9 @@ Another invalid: [Link](page.md)
 Valid external: [Link](https://example.com)
 """
     test_file.write_text(content)
+    assert source_file_checks.check_invalid_md_links(content, test_file) == [
+        "Invalid markdown link at 10:23: ](page.md)"
+    ]
 
     # Mock git root
     monkeypatch.setattr(
@@ -451,6 +456,74 @@ def test_compile_scss(tmp_path: Path) -> None:
     assert "red" in css
 
 
+def test_compile_scss_in_process(tmp_path: Path) -> None:
+    """
+    Stylesheets which `@use` others' members compile without the `sass`
+    binary.
+    """
+    (tmp_path / "variables.scss").write_text("$base-margin: 8px;")
+    scss_file = tmp_path / "fonts.scss"
+    scss_file.write_text(
+        '@use "./variables.scss" as *;\nbody { margin: $base-margin; }'
+    )
+
+    with patch("subprocess.run") as mock_run:
+        css = source_file_checks.compile_scss(scss_file)
+
+    mock_run.assert_not_called()
+    assert "margin: 8px;" in css
+
+
+def test_compile_scss_falls_back_to_binary(tmp_path: Path) -> None:
+    """
+    Stylesheets which libsass can't compile go to the `sass` binary.
+    """
+    scss_file = tmp_path / "modern.scss"
+    scss_file.write_text("body { color: red; }")
+
+    with (
+        patch.object(
+            source_file_checks.sass,
+            "compile",
+            side_effect=source_file_checks.sass.CompileError("unsupported"),
+        ),
+        patch("shutil.which", return_value="/usr/bin/sass"),
+        patch("subprocess.run") as mock_run,
+    ):
+        mock_run.return_value.stdout = "body { color: red; }"
+        css = source_file_checks.compile_scss(scss_file)
+
+    assert css == "body { color: red; }"
+    assert mock_run.call_args.args[0] == [
+        Path("/usr/bin/sass"),
+        f"--load-path={tmp_path}",
+        str(scss_file),
+    ]
+
+
+def test_check_scss_font_files_reuses_compilation(
+    scss_scenarios: Dict[str, Dict[str, Any]], setup_font_test: Callable
+) -> None:
+    """
+    Checking unchanged styles again doesn't recompile them.
+    """
+    test_case = scss_scenarios["missing"]
+    fonts_scss, tmp_path = setup_font_test(test_case["content"], [])
+
+    with patch.object(
+        source_file_checks.sass,
+        "compile",
+        wraps=source_file_checks.sass.compile,
+    ) as mock_compile:
+        for _ in range(2):
+            assert (
+                source_file_checks.check_scss_font_files(fonts_scss, tmp_path)
+                == test_case["expected_missing"]
+            )
+
+    mock_compile.assert_called_once()
+
+
 def test_check_font_files(tmp_path: Path) -> None:
     """
     Test font file checking.
@@ -529,7 +602,10 @@ Another invalid: $\\tag{eq:test}$
     # Test direct function
     errors = source_file_checks.check_latex_tags(content, test_file)
     assert len(errors) == 2
-    assert all("LaTeX \\tag{} found at line" in error for error in errors)
+    assert errors == [
+        "LaTeX \\tag{} found at 9:20",
+        "LaTeX \\tag{} found at 10:19",
+    ]
 
 
 @pytest.mark.parametrize(
@@ -937,13 +1013,19 @@ def test_build_sequence_data_no_files() -> None:
         # Test case 3: Valid URL with successful response
         (
             {"card_image": "https://example.com/image.jpg"},
-            type("Response", (), {"ok": True}),
+            type(
+                "Response", (), {"ok": True, "status_code": 200, "headers": {}}
+            ),
             [],
         ),
         # Test case 4: Valid URL with error response
         (
             {"card_image": "https://example.com/missing.jpg"},
-            type("Response", (), {"ok": False, "status_code": 404}),
+            type(
+                "Response",
+                (),
+                {"ok": False, "status_code": 404, "headers": {}},
+            ),
             [
                 "Card image URL 'https://example.com/missing.jpg' returned status 404"
             ],
@@ -956,7 +1038,7 @@ def test_check_card_image(
     """
     Test checking card image URLs in metadata.
     """
-    with patch("requests.head") as mock_head:
+    with patch.object(requests.Session, "head") as mock_head:
         if mock_response is not None:
             mock_head.return_value = mock_response
 
@@ -970,7 +1052,7 @@ def test_check_card_image_request_exception() -> None:
     """
     metadata = {"card_image": "https://example.com/image.jpg"}
 
-    with patch("requests.head") as mock_head:
+    with patch.object(requests.Session, "head") as mock_head:
         mock_head.side_effect = requests.RequestException("Connection error")
 
         errors = source_file_checks.check_card_image(metadata)
@@ -979,6 +1061,80 @@ def test_check_card_image_request_exception() -> None:
         ]
 
 
+def test_main_probes_card_images_together(tmp_path: Path, monkeypatch) -> None:
+    """
+    main() probes all remote card images in one batch, once per URL.
+    """
+    content_dir = tmp_path / "content"
+    content_dir.mkdir()
+    git.Repo.init(tmp_path)
+    for name, card_image in (
+        ("a", "https://example.com/shared.jpg"),
+        ("b", "https://example.com/shared.jpg"),
+        ("c", "local.jpg"),
+    ):
+        (content_dir / f"{name}.md").write_text(
+            f"""---
+title: {name}
+description: Test Description
+tags: [test]
+permalink: /{name}
+card_image: {card_image}
+---"""
+        )
+    (content_dir / "no-frontmatter.md").write_text("Just text")
+    monkeypatch.setattr(
+        script_utils, "get_git_root", lambda *args, **kwargs: tmp_path
+    )
+
+    with patch.object(requests.Session, "head") as mock_head:
+        mock_head.return_value = type(
+            "Response", (), {"ok": True, "status_code": 200, "headers": {}}
+        )
+        with pytest.raises(SystemExit, match="1"):
+            source_file_checks.main()
+
+    mock_head.assert_called_once_with(
+        "https://example.com/shared.jpg", timeout=10
+    )
+
+
+def test_main_profile(tmp_path: Path, monkeypatch, capsys) -> None:
+    """
+    With --profile, main() times each check on each file and exports the
+    spans.
+    """
+    content_dir = tmp_path / "content"
+    content_dir.mkdir()
+    git.Repo.init(tmp_path)
+    md_path = content_dir / "post.md"
+    md_path.write_text(
+        """---
+title: Post
+description: Test Description
+tags: [test]
+permalink: /post
+---
+Text
+"""
+    )
+    monkeypatch.setattr(
+        script_utils, "get_git_root", lambda *args, **kwargs: tmp_path
+    )
+    output_path = tmp_path / "profile.json"
+
+    source_file_checks.main(
+        ["--profile", "--profile-output", str(output_path)]
+    )
+
+    assert "Slowest checks:" in capsys.readouterr().out
+    exported = json.loads(output_path.read_text())
+    assert exported["script"] == "source_file_checks"
+    checks = {span["check"] for span in exported["spans"]}
+    assert {"read_frontmatter", "required_fields", "card_image"} <= checks
+    assert {span["path"] for span in exported["spans"]} == {str(md_path)}
+
+
 @pytest.mark.parametrize(
     "content,expected_errors",
     [
@@ -1001,7 +1157,7 @@ def test_check_card_image_request_exception() -> None:
 | Cell 1   | Cell 2   |
 """,
             [
-                "Table column at line 3 missing alignment (should be :---, ---:, or :---:)"
+                "Table column at 3:1 missing alignment (should be :---, ---:, or :---:)"
             ],
         ),
         # Test case 4: Multiple tables with mixed alignments
@@ -1016,7 +1172,7 @@ def test_check_card_image_request_exception() -> None:
 | Cell 3   | Cell 4   |
 """,
             [
-                "Table column at line 7 missing alignment (should be :---, ---:, or :---:)"
+                "Table column at 7:1 missing alignment (should be :---, ---:, or :---:)"
             ],
         ),
         # Test case 5: Table with partial alignments
@@ -1027,7 +1183,7 @@ def test_check_card_image_request_exception() -> None:
 | Cell 1   | Cell 2   | Cell 3    |
 """,
             [
-                "Table column at line 3 missing alignment (should be :---, ---:, or :---:)"
+                "Table column at 3:12 missing alignment (should be :---, ---:, or :---:)"
             ],
         ),
         # Test case 6: Table with all alignment types
@@ -1047,7 +1203,7 @@ def test_check_card_image_request_exception() -> None:
 | Cell 1   | Cell 2   |
 """,
             [
-                "Table column at line 3 missing alignment (should be :---, ---:, or :---:)"
+                "Table column at 3:1 missing alignment (should be :---, ---:, or :---:)"
             ],
         ),
         # Test case 8: Table with minimum dashes
@@ -1067,7 +1223,17 @@ def test_check_card_image_request_exception() -> None:
 | Cell 1   | Cell 2   |
 """,
             [
-                "Table column at line 3 missing alignment (should be :---, ---:, or :---:)"
+                "Table column at 3:1 missing alignment (should be :---, ---:, or :---:)"
+            ],
+        ),
+        # Test case 10: Several unaligned columns are reported once per line
+        (
+            """
+| H1 | H2 |
+|---||---|
+""",
+            [
+                "Table column at 3:1 missing alignment (should be :---, ---:, or :---:)"
             ],
         ),
     ],
@@ -1134,8 +1300,8 @@ permalink: /test
         ("Escaped \\{ and \\}", []),
         ("Multiple \\{escaped\\} braces", []),
         # Braces at start/end of line
-        ("{start of line", ["Unescaped brace found in: {start of line"]),
-        ("end of line}", ["Unescaped brace found in: end of line}"]),
+        ("{start of line", ["Unescaped brace at 1:1: {start of line"]),
+        ("end of line}", ["Unescaped brace at 1:12: end of line}"]),
         ("{entire line}", []),
         # Braces inside katex
         ("$x^2 + {y^2}$", []),
@@ -1150,9 +1316,9 @@ permalink: /test
         (
             "$math$ {text} $math$",
             [
-                "Unescaped brace found in: {text}",
-                "Unescaped brace found in: {text}",
-            ],  # Math blocks removed, braces remain
+                "Unescaped brace at 1:8: $math$ {text} $math$",
+                "Unescaped brace at 1:13: $math$ {text} $math$",
+            ],  # Braces outside math remain
         ),
         # Braces inside code block
         ("```\n{x: 1}\n```", []),
@@ -1160,41 +1326,39 @@ permalink: /test
         (
             "```\n{code}\n``` {text} text",
             [
-                "Unescaped brace found in: {text} text",  # Code block removed
-                "Unescaped brace found in: {text} text",
+                "Unescaped brace at 3:5: ``` {text} text",
+                "Unescaped brace at 3:10: ``` {text} text",
             ],
         ),
         (
             "`{code}` {text} text `code2`",
             [
-                "Unescaped brace found in: {text} text",  # Inline code removed
-                "Unescaped brace found in: {text} text",
+                "Unescaped brace at 1:10: `{code}` {text} text `code2`",
+                "Unescaped brace at 1:15: `{code}` {text} text `code2`",
             ],
         ),
         # Unescaped braces
         (
             "Text with {unclosed brace",
-            ["Unescaped brace found in: Text with {unclosed brace"],
+            ["Unescaped brace at 1:11: Text with {unclosed brace"],
         ),
         (
             "Text with unclosed} brace",
-            ["Unescaped brace found in: Text with unclosed} brace"],
+            ["Unescaped brace at 1:19: Text with unclosed} brace"],
         ),
         (
             "Multiple {braces} in {one} line",
             [
-                "Unescaped brace found in: Multiple {braces} in {one} line",
-                "Unescaped brace found in: Multiple {braces} in {one} line",
-                "Unescaped brace found in: Multiple {braces} in {one} line",
-                "Unescaped brace found in: Multiple {braces} in {one} line",
+                f"Unescaped brace at 1:{col}: Multiple {{braces}} in {{one}} line"
+                for col in (10, 17, 22, 26)
             ],
         ),
         # Multiple lines
         (
             "Line 1 with {brace\nLine 2 with} brace",
             [
-                "Unescaped brace found in: Line 1 with {brace",
-                "Unescaped brace found in: Line 2 with} brace",
+                "Unescaped brace at 1:13: Line 1 with {brace",
+                "Unescaped brace at 2:12: Line 2 with} brace",
             ],
         ),
         # Mixed content
@@ -1206,9 +1370,9 @@ permalink: /test
             ```
             """,
             [
-                # Math and code blocks removed
-                "Unescaped brace found in: {text} text",
-                "Unescaped brace found in: {text} text",
+                # Braces in math and code blocks are ignored
+                "Unescaped brace at 2:20: $math$ {text} text $math$",
+                "Unescaped brace at 2:25: $math$ {text} text $math$",
             ],
         ),
         # Table with class
@@ -1216,9 +1380,17 @@ permalink: /test
             """\n|--|--|\n|Col 1|Col 2|\n\n{.class}""",
             [],
         ),
+        # Code between end-of-line braces doesn't make them a group
+        (
+            "{a `x` b}",
+            [
+                "Unescaped brace at 1:1: {a `x` b}",
+                "Unescaped brace at 1:9: {a `x` b}",
+            ],
+        ),
         # Edge cases
-        ("{", ["Unescaped brace found in: {"]),
-        ("}", ["Unescaped brace found in: }"]),
+        ("{", ["Unescaped brace at 1:1: {"]),
+        ("}", ["Unescaped brace at 1:1: }"]),
         ("\\{text\\}", []),
         ("    {indented}", []),
         ("\t{indented}", []),
@@ -1243,8 +1415,8 @@ permalink: /test
         (
             "你好{text}你好",
             [
-                "Unescaped brace found in: 你好{text}你好",
-                "Unescaped brace found in: 你好{text}你好",
+                "Unescaped brace at 1:3: 你好{text}你好",
+                "Unescaped brace at 1:8: 你好{text}你好",
             ],
         ),
     ],
@@ -1530,7 +1702,7 @@ def test_validate_video_tag(video_tag: str, should_raise: bool):
 
     if should_raise:
         assert issues, f"Expected errors for tag: {video_tag}, but got none."
-        assert "forbidden 'src' or 'type' attribute" in issues[0]
+        assert issues[0].startswith("Video tag at 1:1 contains forbidden")
     else:
         assert (
             not issues
@@ -1541,7 +1713,7 @@ def test_validate_video_tag(video_tag: str, should_raise: bool):
     "text, expected_errors",
     [
         ('This is a test. "This is a test."', []),
-        ('Test " .', ['Forbidden pattern found: " .']),
+        ('Test " .', ['Forbidden pattern found at 1:6: " .']),
         ('Test " f', []),
         ('Test "".', []),
         ('Test ."', []),
@@ -1550,7 +1722,7 @@ def test_validate_video_tag(video_tag: str, should_raise: bool):
         ('Ignore in code block: ```python\nprint("Hello, world!" .)\n```', []),
         (
             "This is a test) . Betley et al.",
-            ["Forbidden pattern found: ) ."],
+            ["Forbidden pattern found at 1:15: ) ."],
         ),
     ],
 )
@@ -1558,3 +1730,110 @@ def test_check_no_forbidden_patterns(text: str, expected_errors: List[str]):
     """Test the check_no_forbidden_patterns function."""
     errors = source_file_checks.check_no_forbidden_patterns(text)
     assert errors == expected_errors
+
+
+def test_collect_url_owners_keeps_first_file() -> None:
+    first, second = Path("first.md"), Path("second.md")
+    url_owners = source_file_checks.collect_url_owners(
+        [
+            (first, {"permalink": "/a", "aliases": ["b"]}),
+            (Path("empty.md"), {}),
+            (second, {"permalink": "/b", "aliases": ["b", "c"]}),
+        ]
+    )
+
+    assert url_owners == {"/a": first, "b": first, "/b": second, "c": second}
+    assert source_file_checks.check_url_uniqueness(
+        {"/b", "b", "c"}, url_owners, second
+    ) == ["URL 'b' already used in: first.md"]
+    assert not source_file_checks.check_url_uniqueness(
+        {"/a", "b"}, url_owners, first
+    )
+
+
+def _write_posts(content_dir: Path, names: List[str]) -> List[Tuple]:
+    all_metadata = []
+    for name in names:
+        md_path = content_dir / f"{name}.md"
+        # Every post also claims the alias "shared"
+        md_path.write_text(
+            f"""---
+title: {name}
+description: Test Description
+tags: [test]
+permalink: /{name}
+aliases: [shared]
+---
+Text
+"""
+        )
+        all_metadata.append((md_path, script_utils.read_frontmatter(md_path)))
+    return all_metadata
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_files_matches_serial_order(tmp_path: Path, jobs: int) -> None:
+    all_metadata = _write_posts(tmp_path, ["d", "c", "b", "a"])
+    all_metadata.insert(1, (tmp_path / "no-frontmatter.md", {}))
+    sequence_data = source_file_checks.sequence_data_from_metadata(
+        metadata for _, metadata in all_metadata
+    )
+
+    results = list(
+        source_file_checks.check_files(all_metadata, sequence_data, jobs)
+    )
+
+    assert [path.name for path, _ in results] == [
+        "d.md",
+        "c.md",
+        "b.md",
+        "a.md",
+    ]
+    # The first file in order owns the alias, wherever it was checked
+    assert [issues["duplicate_urls"] for _, issues in results] == [
+        [],
+        *[[f"URL 'shared' already used in: {tmp_path / 'd.md'}"]] * 3,
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_files_collects_worker_spans(tmp_path: Path, jobs: int) -> None:
+    all_metadata = _write_posts(tmp_path, ["a", "b", "c"])
+    sequence_data = source_file_checks.sequence_data_from_metadata(
+        metadata for _, metadata in all_metadata
+    )
+    profiler = check_profiler.CheckProfiler()
+    check_profiler.set_active_profiler(profiler)
+
+    list(source_file_checks.check_files(all_metadata, sequence_data, jobs))
+
+    assert set(profiler.path_totals()) == {
+        str(path) for path, _ in all_metadata
+    }
+    assert profiler.check_totals()["required_fields"].calls == 3
+
+
+def test_worker_returns_spans_when_profiling(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        source_file_checks,
+        "_WORKER_SITE_DATA",
+        {"url_owners": {}, "sequence_data": {}},
+    )
+    [(md_path, metadata)] = _write_posts(tmp_path, ["post"])
+
+    source_file_checks._init_worker(
+        {},
+        source_file_checks.sequence_data_from_metadata([metadata]),
+        {},
+        profile=True,
+    )
+    issues, spans = source_file_checks._check_file_in_worker(
+        (md_path, metadata)
+    )
+
+    assert not any(issues.values())
+    assert spans[0].check == "required_fields"
+    # Spans are handed back once, not accumulated across files
+    assert not check_profiler.get_active_profiler().spans
@@ -704,3 +704,44 @@ def test_main_skips_invalid_file(temp_content_dir, mock_datetime, mock_git):
         # Assert write was called once (for the valid file), not twice
         mock_write.assert_called_once()
         assert mock_write.call_args[0][0].name == "valid.md"
+
+
+def test_main_skips_dated_unmodified_files(temp_content_dir, mock_datetime):
+    """
+    Files with both dates and no unpushed changes aren't parsed round-trip.
+    """
+    initial_date = create_timestamp(datetime(2024, 1, 1))
+    create_md_file(
+        temp_content_dir,
+        "dated.md",
+        {
+            "title": "Dated",
+            "date_published": initial_date,
+            "date_updated": initial_date,
+        },
+    )
+    create_md_file(
+        temp_content_dir,
+        "modified.md",
+        {
+            "title": "Modified",
+            "date_published": initial_date,
+            "date_updated": initial_date,
+        },
+    )
+
+    with (
+        patch.object(
+            update_lib,
+            "is_file_modified",
+            side_effect=lambda path: path.name == "modified.md",
+        ),
+        patch.object(
+            script_utils, "split_yaml", wraps=script_utils.split_yaml
+        ) as mock_split,
+    ):
+        update_lib.main(temp_content_dir)
+
+    assert [call.args[0].name for call in mock_split.call_args_list] == [
+        "modified.md"
+    ]
@@ -0,0 +1,229 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from .. import url_prober
+
+
+class _FakeServer(ThreadingHTTPServer):
+    """
+    Server which answers each HEAD request after a delay, recording how many
+    requests were in flight at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths: list[str] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _FakeServer
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        server = self.server
+        with server.lock:
+            server.paths.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        self.send_response(404 if self.path.startswith("/missing") else 200)
+        if self.path.startswith("/sized"):
+            self.send_header("Content-Length", "1234")
+        self.end_headers()
+
+    def log_message(self, *args) -> None:  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def fake_server() -> Iterator[_FakeServer]:
+    server = _FakeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _closed_port_url() -> str:
+    server = _FakeServer()
+    port = server.server_address[1]
+    server.server_close()
+    return f"http://127.0.0.1:{port}/"
+
+
+def test_probe_results(fake_server: _FakeServer):
+    prober = url_prober.UrlProber(cache_path=None)
+    closed_url = _closed_port_url()
+
+    results = prober.probe_all(
+        [f"{fake_server.base_url}/ok", f"{fake_server.base_url}/missing"]
+    )
+    error = prober.probe(closed_url)
+
+    assert results == {
+        f"{fake_server.base_url}/ok": url_prober.ProbeResult(True, 200),
+        f"{fake_server.base_url}/missing": url_prober.ProbeResult(False, 404),
+    }
+    assert not error.ok
+    assert error.status_code is None
+    assert error.error
+
+
+def test_probe_records_content_length(
+    fake_server: _FakeServer, tmp_path: Path
+):
+    cache_path = tmp_path / "probes.json"
+    url = f"{fake_server.base_url}/sized"
+    first_run = url_prober.UrlProber(cache_path=cache_path)
+
+    assert first_run.probe(url) == url_prober.ProbeResult(
+        True, 200, content_length=1234
+    )
+    first_run.save()
+    assert url_prober.UrlProber(cache_path=cache_path).probe(url) == (
+        url_prober.ProbeResult(True, 200, content_length=1234)
+    )
+
+
+def test_probe_all_deduplicates(fake_server: _FakeServer):
+    prober = url_prober.UrlProber(cache_path=None)
+    url = f"{fake_server.base_url}/page"
+
+    results = prober.probe_all([url, url, url])
+    prober.probe(url)
+
+    assert list(results) == [url]
+    assert fake_server.paths == ["/page"]
+    assert prober.requests_sent == 1
+
+
+def test_probe_all_empty():
+    prober = url_prober.UrlProber(cache_path=None)
+    assert prober.probe_all([]) == {}
+    assert prober.requests_sent == 0
+
+
+def test_per_host_concurrency_is_bounded(fake_server: _FakeServer):
+    fake_server.delay = 0.05
+    prober = url_prober.UrlProber(
+        cache_path=None, max_workers=8, max_per_host=2
+    )
+
+    prober.probe_all(f"{fake_server.base_url}/{i}" for i in range(8))
+
+    assert fake_server.max_in_flight == 2
+
+
+def test_successes_persist_between_runs(
+    fake_server: _FakeServer, tmp_path: Path
+):
+    cache_path = tmp_path / "nested" / "probes.json"
+    ok_url = f"{fake_server.base_url}/ok"
+    missing_url = f"{fake_server.base_url}/missing"
+    first_run = url_prober.UrlProber(cache_path=cache_path)
+    first_run.probe_all([ok_url, missing_url])
+    first_run.save()
+
+    second_run = url_prober.UrlProber(cache_path=cache_path)
+    results = second_run.probe_all([ok_url, missing_url])
+
+    # Failures are always retried
+    assert second_run.requests_sent == 1
+    assert sorted(fake_server.paths) == ["/missing", "/missing", "/ok"]
+    assert results[ok_url] == url_prober.ProbeResult(True, 200)
+    assert list(json.loads(cache_path.read_text())) == [ok_url]
+    assert not list(cache_path.parent.glob("*.tmp"))
+
+
+def test_expired_results_are_reprobed(
+    fake_server: _FakeServer, tmp_path: Path
+):
+    cache_path = tmp_path / "probes.json"
+    url = f"{fake_server.base_url}/ok"
+    cache_path.write_text(
+        json.dumps({url: {"checked_at": time.time() - 10, "status_code": 200}})
+    )
+
+    prober = url_prober.UrlProber(cache_path=cache_path, ttl_seconds=5)
+    prober.probe(url)
+
+    assert prober.requests_sent == 1
+
+
+def test_save_without_new_results_is_a_no_op(tmp_path: Path):
+    cache_path = tmp_path / "probes.json"
+    prober = url_prober.UrlProber(cache_path=cache_path)
+    prober.seed({"https://a.com": url_prober.ProbeResult(True, 200)})
+
+    prober.save()
+    url_prober.UrlProber(cache_path=None).save()
+
+    assert not cache_path.exists()
+
+
+@pytest.mark.parametrize("contents", ["not json", json.dumps(["a", "list"])])
+def test_unusable_cache_is_ignored(tmp_path: Path, contents: str):
+    cache_path = tmp_path / "probes.json"
+    cache_path.write_text(contents)
+
+    assert url_prober.UrlProber(cache_path=cache_path).results == {}
+
+
+def test_malformed_cache_entries_are_skipped(tmp_path: Path):
+    cache_path = tmp_path / "probes.json"
+    now = time.time()
+    cache_path.write_text(
+        json.dumps(
+            {
+                "https://ok.com": {"checked_at": now, "status_code": 200},
+                "https://no-status.com": {"checked_at": now},
+                "https://no-time.com": {"status_code": 200},
+                "https://not-a-dict.com": ["a", "list"],
+                "https://bad-length.com": {
+                    "checked_at": now,
+                    "status_code": 200,
+                    "content_length": "big",
+                },
+            }
+        )
+    )
+
+    assert url_prober.UrlProber(cache_path=cache_path).results == {
+        "https://ok.com": url_prober.ProbeResult(True, 200)
+    }
+
+
+def test_seed_skips_probing():
+    prober = url_prober.UrlProber(cache_path=None)
+    result = url_prober.ProbeResult(False, 500)
+    prober.seed({"https://a.com": result})
+
+    assert prober.probe("https://a.com") == result
+    assert prober.requests_sent == 0
+
+
+def test_default_prober_is_shared():
+    url_prober.set_default_prober(None)
+    prober = url_prober.get_default_prober()
+
+    assert url_prober.get_default_prober() is prober
+    assert prober.cache_path == url_prober.DEFAULT_CACHE_PATH
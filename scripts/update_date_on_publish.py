@@ -103,6 +103,16 @@ def update_publish_date(yaml_metadata: dict) -> None:
         yaml_metadata["date_updated"] = yaml_metadata["date_published"]
 
 
+def _has_timestamps(metadata: dict) -> bool:
+    """
+    Whether frontmatter already has both dates, as timestamps.
+    """
+    return all(
+        isinstance(metadata.get(key), datetime)
+        for key in ("date_published", "date_updated")
+    )
+
+
 def write_to_yaml(file_path: Path, metadata: dict, content: str) -> None:
     """
     Write updated metadata to a markdown file.
@@ -131,7 +141,13 @@ def main(content_dir: Path | None = None) -> None:
     if content_dir is None:
         content_dir = Path("content")
 
+    index = script_utils.get_frontmatter_index()
     for md_file_path in content_dir.glob("*.md"):
+        is_modified = is_file_modified(md_file_path)
+        if not is_modified and _has_timestamps(index.get(md_file_path)):
+            # Nothing would change, so skip the slow round-trip parse
+            continue
+
         metadata, content = script_utils.split_yaml(md_file_path)
         if not metadata and not content:
             continue
@@ -141,7 +157,7 @@ def main(content_dir: Path | None = None) -> None:
         update_publish_date(metadata)
 
         # # Check for unpushed changes and update date_updated if needed
-        if is_file_modified(md_file_path):
+        if is_modified:
             metadata["date_updated"] = current_date
 
         # Ensure that date fields are timestamps
@@ -151,6 +167,7 @@ def main(content_dir: Path | None = None) -> None:
         if metadata != original_metadata:
             print(f"Updated date information on {md_file_path}")
             write_to_yaml(md_file_path, metadata, content)
+    index.save()
 
 
 if __name__ == "__main__":
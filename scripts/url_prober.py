@@ -0,0 +1,240 @@
+"""
+Check whether remote URLs respond, probing each URL at most once per run.
+
+Requests share pooled connections, run concurrently with a bound on how many
+hit the same host at once, and successful results are remembered across runs
+for a while.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple
+from urllib.parse import urlparse
+
+import requests  # type: ignore[import]
+from requests.adapters import HTTPAdapter  # type: ignore[import]
+
+from scripts import utils as script_utils
+
+# skipcq: BAN-B108
+DEFAULT_CACHE_PATH = (
+    Path(tempfile.gettempdir()) / "quartz_checks" / "url_probes.json"
+)
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+_DEFAULT_MAX_WORKERS = 16
+_DEFAULT_MAX_PER_HOST = 4
+_DEFAULT_TIMEOUT_SECONDS = 10
+
+
+class ProbeResult(NamedTuple):
+    """
+    The outcome of sending a HEAD request to a URL.
+    """
+
+    ok: bool
+    # None if the request itself failed
+    status_code: int | None = None
+    error: str | None = None
+    # Size of the response body in bytes, if the server sent it
+    content_length: int | None = None
+
+
+def _cached_result(entry: Any) -> tuple[float, ProbeResult] | None:
+    """
+    Read when a persisted result was obtained, and the result, or None if
+    the entry is malformed.
+    """
+    if not isinstance(entry, dict):
+        return None
+    checked_at = entry.get("checked_at")
+    status_code = entry.get("status_code")
+    content_length = entry.get("content_length")
+    if (
+        not isinstance(checked_at, (int, float))
+        or not isinstance(status_code, int)
+        or not isinstance(content_length, (int, type(None)))
+    ):
+        return None
+    return checked_at, ProbeResult(
+        ok=True, status_code=status_code, content_length=content_length
+    )
+
+
+class UrlProber:  # pylint: disable=too-many-instance-attributes
+    """
+    Send HEAD requests to URLs, deduplicating and caching the results.
+
+    Only successful results are written to the persistent cache, so that
+    failures are always retried on the next run.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path | None = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+        max_per_host: int = _DEFAULT_MAX_PER_HOST,
+        timeout: float = _DEFAULT_TIMEOUT_SECONDS,
+    ) -> None:
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.requests_sent = 0
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._results: Dict[str, ProbeResult] = {}
+        # When each successful result was obtained, for the persistent cache
+        self._checked_at: Dict[str, float] = {}
+        self._unsaved = False
+        self._load()
+
+    def _load(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(entries, dict):
+            return
+
+        now = time.time()
+        for url, entry in entries.items():
+            cached = _cached_result(entry)
+            if cached is not None and now - cached[0] < self.ttl_seconds:
+                self._checked_at[url], self._results[url] = cached
+
+    def save(self) -> None:
+        """
+        Write successful results to the persistent cache, if any are new.
+        """
+        if self.cache_path is None or not self._unsaved:
+            return
+        with self._lock:
+            entries = {
+                url: {
+                    "checked_at": checked_at,
+                    "status_code": self._results[url].status_code,
+                    "content_length": self._results[url].content_length,
+                }
+                for url, checked_at in self._checked_at.items()
+            }
+            self._unsaved = False
+
+        script_utils.write_json_atomically(self.cache_path, entries)
+
+    def seed(self, results: Dict[str, ProbeResult]) -> None:
+        """
+        Reuse results probed elsewhere, e.g. by a parent process.
+        """
+        with self._lock:
+            self._results.update(results)
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(
+                    self.max_per_host
+                )
+            return self._host_slots[host]
+
+    def _fetch(self, url: str) -> ProbeResult:
+        with self._host_slot(url):
+            with self._lock:
+                self.requests_sent += 1
+            try:
+                response = self._session.head(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                return ProbeResult(ok=False, error=str(e))
+        content_length = response.headers.get("Content-Length", "")
+        return ProbeResult(
+            ok=response.ok,
+            status_code=response.status_code,
+            content_length=(
+                int(content_length) if content_length.isdigit() else None
+            ),
+        )
+
+    def _record(self, url: str, result: ProbeResult) -> None:
+        with self._lock:
+            self._results[url] = result
+            if result.ok:
+                self._checked_at[url] = time.time()
+                self._unsaved = True
+
+    def probe_all(self, urls: Iterable[str]) -> Dict[str, ProbeResult]:
+        """
+        Probe URLs concurrently, sending one request per distinct URL that
+        hasn't already been probed.
+
+        Returns:
+            Dictionary mapping each URL to its result
+        """
+        urls = list(dict.fromkeys(urls))
+        with self._lock:
+            to_fetch = [url for url in urls if url not in self._results]
+
+        if len(to_fetch) == 1:
+            self._record(to_fetch[0], self._fetch(to_fetch[0]))
+        elif to_fetch:
+            workers = min(self.max_workers, len(to_fetch))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for url, result in zip(
+                    to_fetch, executor.map(self._fetch, to_fetch)
+                ):
+                    self._record(url, result)
+
+        with self._lock:
+            return {url: self._results[url] for url in urls}
+
+    def probe(self, url: str) -> ProbeResult:
+        """
+        Probe a single URL.
+        """
+        return self.probe_all([url])[url]
+
+    @property
+    def results(self) -> Dict[str, ProbeResult]:
+        """
+        All results known to this prober.
+        """
+        with self._lock:
+            return dict(self._results)
+
+
+_DEFAULT_PROBER: Dict[str, UrlProber] = {}
+
+
+def get_default_prober() -> UrlProber:
+    """
+    Get the prober shared by all checks in this process.
+    """
+    if "prober" not in _DEFAULT_PROBER:
+        _DEFAULT_PROBER["prober"] = UrlProber()
+    return _DEFAULT_PROBER["prober"]
+
+
+def set_default_prober(prober: UrlProber | None) -> None:
+    """
+    Replace the shared prober, or reset it to be created on next use.
+    """
+    if prober is None:
+        _DEFAULT_PROBER.pop("prober", None)
+    else:
+        _DEFAULT_PROBER["prober"] = prober
@@ -2,11 +2,18 @@
 Utility functions for scripts/ directory.
 """
 
+import bisect
+import hashlib
+import json
+import os
 import subprocess
+import tempfile
+from datetime import date, datetime
 from pathlib import Path
-from typing import Collection, Dict, Optional, Set
+from typing import Any, Collection, Dict, Optional, Set
 
 import git
+import yaml as pyyaml
 from bs4 import BeautifulSoup, Tag
 from ruamel.yaml import YAML, YAMLError
 
@@ -36,6 +43,44 @@ def get_git_root(starting_dir: Optional[Path] = None) -> Path:
     raise RuntimeError("Failed to get Git root")
 
 
+def git_ignored_files(
+    repo_root: Path, relative_files: Collection[Path]
+) -> Set[str]:
+    """
+    Returns which of the given files git ignores, asking a single `git
+    check-ignore` process about all of them rather than starting one per file.
+
+    Args:
+        repo_root: The root of the Git repository.
+        relative_files: Paths relative to `repo_root`.
+
+    Returns:
+        Set[str]: The ignored paths, as given.
+
+    Raises:
+        subprocess.CalledProcessError: If git fails, e.g. outside a repository.
+    """
+    if not relative_files:
+        return set()
+    completed_process = subprocess.run(
+        ["git", "check-ignore", "--stdin", "-z"],
+        input="".join(f"{path}\0" for path in relative_files),
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=repo_root,
+    )
+    # Exits with 1 when none of the files are ignored
+    if completed_process.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(
+            completed_process.returncode,
+            completed_process.args,
+            completed_process.stdout,
+            completed_process.stderr,
+        )
+    return set(completed_process.stdout.split("\0")) - {""}
+
+
 def get_files(
     dir_to_search: Optional[Path] = None,
     filetypes_to_match: Collection[str] = (".md",),
@@ -71,17 +116,16 @@ def get_files(
         if use_git_ignore:
             try:
                 root = get_git_root(starting_dir=dir_to_search)
-                repo = git.Repo(root)
                 # Convert file paths to paths relative to the git root
                 relative_files = [file.relative_to(root) for file in files]
+                ignored = git_ignored_files(root, relative_files)
                 # Filter out ignored files
                 files = [
                     file
                     for file, rel_file in zip(files, relative_files)
-                    if not repo.ignored(rel_file)
+                    if str(rel_file) not in ignored
                 ]
             except (
-                git.GitCommandError,
                 ValueError,
                 RuntimeError,
                 subprocess.CalledProcessError,
@@ -116,10 +160,32 @@ def path_relative_to_quartz_parent(input_file: Path) -> Path:
         ) from e
 
 
+def _split_frontmatter(
+    file_path: Path, verbose: bool
+) -> Optional[tuple[str, str]]:
+    """
+    Split a markdown file into its raw YAML frontmatter and content, or
+    return None if it has no frontmatter.
+    """
+    with file_path.open("r", encoding="utf-8") as f:
+        content = f.read()
+
+    parts = content.split("---", 2)
+    if len(parts) < 3:
+        if verbose:
+            print(f"Skipping {file_path}: No valid frontmatter found")
+        return None
+    return parts[1], parts[2]
+
+
 def split_yaml(file_path: Path, verbose: bool = False) -> tuple[dict, str]:
     """
     Split a markdown file into its YAML frontmatter and content.
 
+    The frontmatter is loaded round-trip, keeping comments and formatting so
+    that it can be written back. Callers which only read it should use the
+    faster `read_frontmatter`.
+
     Args:
         file_path: Path to the markdown file
         verbose: Whether to print error messages
@@ -132,25 +198,283 @@ def split_yaml(file_path: Path, verbose: bool = False) -> tuple[dict, str]:
     )  # 'rt' means round-trip, preserving comments and formatting
     yaml.preserve_quotes = True  # Preserve quote style
 
-    with file_path.open("r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Split frontmatter and content
-    parts = content.split("---", 2)
-    if len(parts) < 3:
-        if verbose:
-            print(f"Skipping {file_path}: No valid frontmatter found")
+    parts = _split_frontmatter(file_path, verbose)
+    if parts is None:
         return {}, ""
 
     try:
-        metadata = yaml.load(parts[1])
+        metadata = yaml.load(parts[0])
         if not metadata:
             metadata = {}
     except YAMLError as e:
         print(f"Error parsing YAML in {file_path}: {str(e)}")
         return {}, ""
 
-    return metadata, parts[2]
+    return metadata, parts[1]
+
+
+def read_frontmatter(file_path: Path, verbose: bool = False) -> dict:
+    """
+    Read a markdown file's YAML frontmatter as plain Python objects, using
+    libyaml's C loader.
+
+    Much faster than `split_yaml`, but the result can't be written back
+    with its formatting intact.
+
+    Args:
+        file_path: Path to the markdown file
+        verbose: Whether to print error messages
+
+    Returns:
+        The metadata, or an empty dict if there is none or it doesn't parse
+    """
+    parts = _split_frontmatter(file_path, verbose)
+    if parts is None:
+        return {}
+
+    try:
+        metadata = pyyaml.load(parts[0], Loader=pyyaml.CSafeLoader)
+    except pyyaml.YAMLError as e:
+        print(f"Error parsing YAML in {file_path}: {str(e)}")
+        return {}
+    return metadata or {}
+
+
+def write_text_atomically(path: Path, text: str) -> None:
+    """
+    Write `text` to `path`. The file is replaced atomically, so an
+    interrupted run can't corrupt it, and through a uniquely named temporary
+    file, so that processes writing it at once don't clobber each other.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def write_json_atomically(path: Path, data: Any) -> None:
+    """
+    Write `data` to `path` as JSON, like `write_text_atomically`.
+    """
+    write_text_atomically(path, json.dumps(data))
+
+
+# Bump when the format of the frontmatter index file changes
+FRONTMATTER_INDEX_FORMAT_VERSION = 1
+
+# skipcq: BAN-B108
+DEFAULT_FRONTMATTER_INDEX_PATH = (
+    Path(tempfile.gettempdir()) / "quartz_checks" / "frontmatter_index.json"
+)
+
+# Tags for the values in frontmatter which JSON can't represent
+_DATETIME_TAG = "!datetime"
+_DATE_TAG = "!date"
+
+
+def _frontmatter_to_json(value: Any) -> Any:
+    """
+    Convert frontmatter into a form which `json` can write.
+
+    Raises:
+        TypeError: If the frontmatter holds a value which can't be converted.
+    """
+    if isinstance(value, datetime):
+        return {_DATETIME_TAG: value.isoformat()}
+    if isinstance(value, date):
+        return {_DATE_TAG: value.isoformat()}
+    if isinstance(value, list):
+        return [_frontmatter_to_json(item) for item in value]
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError("Frontmatter keys must be strings to be indexed")
+        return {key: _frontmatter_to_json(item) for key, item in value.items()}
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f"Can't index frontmatter of type {type(value)}")
+
+
+def _frontmatter_from_json(value: Any) -> Any:
+    """
+    Convert frontmatter written by `_frontmatter_to_json` back.
+    """
+    if isinstance(value, list):
+        return [_frontmatter_from_json(item) for item in value]
+    if isinstance(value, dict):
+        if _DATETIME_TAG in value:
+            return datetime.fromisoformat(value[_DATETIME_TAG])
+        if _DATE_TAG in value:
+            return date.fromisoformat(value[_DATE_TAG])
+        return {
+            key: _frontmatter_from_json(item) for key, item in value.items()
+        }
+    return value
+
+
+class FrontmatterIndex:
+    """
+    Persistent index of each markdown file's frontmatter, as read by
+    `read_frontmatter`, so that scripts which only read frontmatter don't
+    re-parse files which haven't changed.
+
+    Files are keyed by path. An entry is used while the file's mtime and size
+    are unchanged, or, if they changed, while its contents hash the same.
+    """
+
+    def __init__(
+        self, cache_path: Path | None = DEFAULT_FRONTMATTER_INDEX_PATH
+    ) -> None:
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._changed = False
+        if cache_path is not None:
+            self._entries = _load_frontmatter_entries(cache_path)
+
+    def get(self, file_path: Path, verbose: bool = False) -> dict:
+        """
+        Get a markdown file's frontmatter, parsing the file if it changed.
+        Each call returns a new copy, which callers may modify.
+
+        Args:
+            file_path: Path to the markdown file
+            verbose: Whether to print error messages when parsing
+        """
+        key = str(file_path.resolve())
+        stat = file_path.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        entry = self._entries.get(key)
+        if entry is not None and entry["stamp"] == stamp:
+            self.hits += 1
+            return _frontmatter_from_json(entry["metadata"])
+
+        file_hash = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        self._changed = True
+        if entry is not None and entry["hash"] == file_hash:
+            # Touched but not edited
+            self.hits += 1
+            entry["stamp"] = stamp
+            return _frontmatter_from_json(entry["metadata"])
+
+        self.misses += 1
+        metadata = read_frontmatter(file_path, verbose)
+        try:
+            self._entries[key] = {
+                "stamp": stamp,
+                "hash": file_hash,
+                "metadata": _frontmatter_to_json(metadata),
+            }
+        except TypeError:
+            # Parsed afresh on every lookup instead
+            self._entries.pop(key, None)
+        return metadata
+
+    def save(self) -> None:
+        """
+        Write the index to disk if it changed, dropping files which no longer
+        exist. Does nothing if the index has no `cache_path`.
+        """
+        if self.cache_path is None:
+            return
+        existing = {
+            key: entry
+            for key, entry in self._entries.items()
+            if os.path.exists(key)
+        }
+        if not self._changed and len(existing) == len(self._entries):
+            return
+
+        write_json_atomically(
+            self.cache_path,
+            {"version": FRONTMATTER_INDEX_FORMAT_VERSION, "files": existing},
+        )
+        self._entries = existing
+        self._changed = False
+
+    def stats(self) -> str:
+        """
+        Describe how often the index avoided a parse.
+        """
+        return (
+            f"Frontmatter index: {self.hits} hits, {self.misses} misses, "
+            f"{len(self._entries)} files indexed"
+        )
+
+
+def _load_frontmatter_entries(cache_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the entries of an index file, or none if it is missing, unreadable
+    or in an old format.
+    """
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (
+        isinstance(data, dict)
+        and data.get("version") == FRONTMATTER_INDEX_FORMAT_VERSION
+    ):
+        return data.get("files", {})
+    return {}
+
+
+_FRONTMATTER_INDEX: Dict[str, FrontmatterIndex] = {}
+
+
+def get_frontmatter_index() -> FrontmatterIndex:
+    """
+    Get the frontmatter index shared by this process, loading it on first
+    use.
+    """
+    if "index" not in _FRONTMATTER_INDEX:
+        _FRONTMATTER_INDEX["index"] = FrontmatterIndex()
+    return _FRONTMATTER_INDEX["index"]
+
+
+def set_frontmatter_index(index: FrontmatterIndex | None) -> None:
+    """
+    Replace the shared frontmatter index, or reset it to be loaded on next
+    use if None.
+    """
+    if index is None:
+        _FRONTMATTER_INDEX.pop("index", None)
+    else:
+        _FRONTMATTER_INDEX["index"] = index
+
+
+def get_changed_files(since_ref: str, repo_root: Path) -> Set[Path]:
+    """
+    Get the files which differ from `since_ref`, including uncommitted changes
+    and untracked files.
+
+    Args:
+        since_ref: Git reference to compare the working tree with
+        repo_root: Path to the root of the repository
+
+    Returns:
+        Resolved paths of the changed files, including deleted ones
+
+    Raises:
+        ValueError: If `since_ref` can't be compared with the working tree.
+    """
+    repo = git.Repo(repo_root)
+    try:
+        changed = repo.git.diff("--name-only", since_ref, "--").splitlines()
+    except git.GitCommandError as e:
+        raise ValueError(
+            f"Can't compare the working tree with '{since_ref}'"
+        ) from e
+    changed.extend(repo.untracked_files)
+    return {(repo_root / name).resolve() for name in changed}
 
 
 def build_html_to_md_map(md_dir: Path) -> Dict[str, Path]:
@@ -169,7 +493,7 @@ def build_html_to_md_map(md_dir: Path) -> Dict[str, Path]:
     md_files = list(md_dir.glob("*.md")) + list(md_dir.glob("drafts/*.md"))
 
     for md_file in md_files:
-        front_matter, _ = split_yaml(md_file, verbose=False)
+        front_matter = get_frontmatter_index().get(md_file)
         permalink = front_matter.get("permalink")
         if permalink:
             permalink = permalink.strip("/")
@@ -186,7 +510,7 @@ def collect_aliases(md_dir: Path) -> Set[str]:
     for md_file in get_files(
         md_dir, filetypes_to_match=(".md",), use_git_ignore=True
     ):
-        front_matter, _ = split_yaml(md_file, verbose=True)
+        front_matter = get_frontmatter_index().get(md_file, verbose=True)
         if front_matter:
             aliases_list = front_matter.get("aliases", [])
             if isinstance(aliases_list, list):
@@ -227,12 +551,42 @@ def body_is_empty(soup: BeautifulSoup) -> bool:
     )
 
 
-def parse_html_file(file_path: Path) -> BeautifulSoup:
+# Environment variable which selects the BeautifulSoup tree builder
+HTML_PARSER_ENV_VAR = "SCRIPTS_HTML_PARSER"
+# "lxml" is C-accelerated but must be installed separately
+HTML_PARSERS = ("html.parser", "lxml")
+_DEFAULT_HTML_PARSER = "html.parser"
+
+
+def get_html_parser() -> str:
+    """
+    Get the BeautifulSoup parser backend to use, as set by the
+    `SCRIPTS_HTML_PARSER` environment variable.
+
+    Raises:
+        ValueError: If the environment variable names an unsupported parser.
+    """
+    html_parser = os.environ.get(HTML_PARSER_ENV_VAR, _DEFAULT_HTML_PARSER)
+    if html_parser not in HTML_PARSERS:
+        raise ValueError(
+            f"Unsupported HTML parser '{html_parser}' in "
+            f"{HTML_PARSER_ENV_VAR}; choose from {', '.join(HTML_PARSERS)}"
+        )
+    return html_parser
+
+
+def parse_html_file(
+    file_path: Path, html_parser: Optional[str] = None
+) -> BeautifulSoup:
     """
     Parse an HTML file and return a BeautifulSoup object.
+
+    Args:
+        file_path: Path to the HTML file
+        html_parser: Parser backend to use. Defaults to `get_html_parser()`.
     """
     with open(file_path, encoding="utf-8") as file:
-        return BeautifulSoup(file.read(), "html.parser")
+        return BeautifulSoup(file.read(), html_parser or get_html_parser())
 
 
 _SLUGS_WITHOUT_MD_PATH = ("404", "all-tags", "recent")
@@ -267,3 +621,46 @@ def get_non_code_text(soup: BeautifulSoup | Tag) -> str:
         element.decompose()
 
     return soup.get_text()
+
+
+class LineIndex:
+    """
+    Maps offsets in a text to line and column numbers, by bisecting over the
+    offsets at which lines start. Building it scans the text once, so each
+    lookup is logarithmic rather than rescanning the text before the offset.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._line_starts = [0]
+        start = text.find("\n")
+        while start != -1:
+            self._line_starts.append(start + 1)
+            start = text.find("\n", start + 1)
+
+    def line_col(self, offset: int) -> tuple[int, int]:
+        """
+        The 1-based line and column of the character at `offset`.
+        """
+        line = bisect.bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def location(self, offset: int) -> str:
+        """
+        Describe the position of `offset` as "line:col", e.g. "12:5".
+        """
+        line, col = self.line_col(offset)
+        return f"{line}:{col}"
+
+    def line(self, offset: int) -> str:
+        """
+        The line containing `offset`, without its newline.
+        """
+        line_number, _ = self.line_col(offset)
+        start = self._line_starts[line_number - 1]
+        end = (
+            self._line_starts[line_number] - 1
+            if line_number < len(self._line_starts)
+            else len(self.text)
+        )
+        return self.text[start:end]